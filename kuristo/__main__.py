@@ -1,3 +1,4 @@
+import contextlib
 import sys
 import traceback
 
@@ -7,36 +8,45 @@ import kuristo.cli as cli
 import kuristo.config as config
 import kuristo.ui as ui
 from kuristo.exceptions import UserException
+from kuristo.profiling import Profiler
 
 
 def main():
     parser = cli.build_parser()
-    args = parser.parse_args()
+    args = parser.parse_args(cli.expand_profile_arg(sys.argv[1:]))
+    profiler = Profiler(args.profile) if args.profile else contextlib.nullcontext()
 
     try:
         config.construct(args)
 
-        if args.command == "run":
-            exit_code = cli.run_jobs(args)
-            sys.exit(exit_code)
-        elif args.command == "doctor":
-            cli.print_diag(args)
-        elif args.command == "list":
-            cli.list_jobs(args)
-        elif args.command == "batch":
-            cli.batch(args)
-        elif args.command == "status":
-            cli.status(args)
-        elif args.command == "log":
-            cli.log(args)
-        elif args.command == "show":
-            cli.show(args)
-        elif args.command == "report":
-            cli.report(args)
-        elif args.command == "tag":
-            cli.tag(args)
-        elif args.command == "diff":
-            cli.diff(args)
+        with profiler:
+            if args.command == "run":
+                exit_code = cli.run_jobs(args)
+                sys.exit(exit_code)
+            elif args.command == "doctor":
+                cli.print_diag(args)
+            elif args.command == "list":
+                cli.list_jobs(args)
+            elif args.command == "batch":
+                cli.batch(args)
+            elif args.command == "status":
+                cli.status(args)
+            elif args.command == "log":
+                cli.log(args)
+            elif args.command == "show":
+                cli.show(args)
+            elif args.command == "report":
+                cli.report(args)
+            elif args.command == "tag":
+                cli.tag(args)
+            elif args.command == "diff":
+                sys.exit(cli.diff(args))
+            elif args.command == "perf":
+                sys.exit(cli.perf(args))
+            elif args.command == "flaky":
+                cli.flaky(args)
+            elif args.command == "trace":
+                cli.trace(args)
     except UserException as e:
         ui.console().print(Text(f"{e}", style="red"))
         if args.debug:
@@ -1,7 +1,7 @@
 from kuristo.actions.shell_action import ShellAction
 from kuristo.exceptions import UserException
 from kuristo.registry import get_action
-from kuristo.utils import interpolate_value
+from kuristo.utils import check_threads_per_proc, interpolate_value
 
 
 class ActionFactory:
@@ -20,6 +20,7 @@ class ActionFactory:
                     working_directory = context.defaults.run.working_directory
         if step.working_directory:
             working_directory = step.working_directory
+        threads_per_proc = check_threads_per_proc(step.threads_per_proc, step.name)
 
         if step.uses is None:
             commands = step.run
@@ -34,6 +35,7 @@ class ActionFactory:
                 continue_on_error=step.continue_on_error,
                 commands=commands,
                 num_cores=step.num_cores,
+                threads_per_proc=threads_per_proc,
                 env=step.env,
             )
         elif get_action(step.uses):
@@ -41,6 +43,8 @@ class ActionFactory:
             params = step.params
             if context is not None:
                 params = interpolate_value(params, context.vars)
+            if threads_per_proc is not None:
+                params = {"threads_per_proc": threads_per_proc, **params}
             return cls(
                 step.name,
                 context,
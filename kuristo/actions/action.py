@@ -20,6 +20,11 @@ class Action(ABC):
             else:
                 self._name = interpolate_str(name, context.vars)
         self._output = None
+        self._output_listener = None
+        self._output_streamed = False
+        self._max_output = None
+        self._output_dropped = 0
+        self._resource_usage = None
         self._context = context
         self._timeout_minutes = kwargs.get("timeout_minutes", 60)
         self._continue_on_error = kwargs.get("continue_on_error", False)
@@ -42,6 +47,13 @@ class Action(ABC):
     def num_cores(self) -> int:
         return 1
 
+    @property
+    def multi_host(self) -> bool:
+        """
+        Return `True` if the action can run its cores on several hosts
+        """
+        return False
+
     @property
     def output(self):
         """
@@ -61,6 +73,59 @@ class Action(ABC):
         else:
             self._output = str(out)
 
+    @property
+    def output_listener(self):
+        """
+        Return function that is called with each line of output while the action runs
+        """
+        return self._output_listener
+
+    @output_listener.setter
+    def output_listener(self, listener):
+        self._output_listener = listener
+
+    @property
+    def output_streamed(self):
+        """
+        Return `True` if the output was passed to the output listener while the action ran
+        """
+        return self._output_streamed
+
+    @property
+    def max_output(self):
+        """
+        Return maximum number of bytes of output that is kept (`None` means unlimited)
+        """
+        return self._max_output
+
+    @max_output.setter
+    def max_output(self, n_bytes: int | None):
+        self._max_output = n_bytes
+
+    @property
+    def output_dropped(self):
+        """
+        Return number of bytes of output that were dropped because of `max_output`
+        """
+        return self._output_dropped
+
+    @property
+    def resource_usage(self):
+        """
+        Return resources used by the processes this action ran (`None` if not known)
+        """
+        return self._resource_usage
+
+    def stream_output(self, line: str):
+        """
+        Pass a line of output to the output listener
+
+        @param line Line of output (without the trailing newline)
+        """
+        if self._output_listener is not None:
+            self._output_listener(line)
+            self._output_streamed = True
+
     @property
     def timeout_minutes(self):
         """
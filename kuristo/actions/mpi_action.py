@@ -1,7 +1,24 @@
+import os
+
 import kuristo.config as config
 from kuristo.actions.process_action import ProcessAction
 from kuristo.context import Context
 from kuristo.registry import action
+from kuristo.utils import check_threads_per_proc
+
+# Launcher flags that bind each rank to `threads` cores
+THREAD_FLAGS = {
+    "srun": "--cpus-per-task={threads}",
+    "mpirun": "--map-by slot:PE={threads} --bind-to core",
+    "mpiexec": "--map-by slot:PE={threads} --bind-to core",
+}
+
+# Launcher flags that place ranks on allocated hosts
+HOST_FLAGS = {
+    "srun": "--exclusive --nodelist={nodes}",
+    "mpirun": "--host {hosts}",
+    "mpiexec": "--host {hosts}",
+}
 
 
 @action("core/mpi-run")
@@ -18,10 +35,17 @@ class MPIAction(ProcessAction):
         )
         self._commands = kwargs.get("run", "")
         self._n_ranks = kwargs.get("num-procs", 1)
+        self._n_threads = check_threads_per_proc(
+            kwargs.get("threads-per-proc", self._n_threads), name
+        )
 
     @property
     def num_cores(self):
-        return self._n_ranks
+        return self._n_ranks * self.threads_per_proc
+
+    @property
+    def multi_host(self):
+        return True
 
     def create_sub_command(self) -> str:
         return self._commands
@@ -29,5 +53,45 @@ class MPIAction(ProcessAction):
     def create_command(self):
         cfg = config.get()
         launcher = cfg.mpi_launcher
-        cmd = self.create_sub_command()
-        return f"{launcher} -np {self._n_ranks} {cmd}"
+        parts = [launcher, f"-np {self._n_ranks}"]
+        hosts = getattr(self.context, "hosts", None)
+        if hosts:
+            parts.append(self._host_flags(launcher, cfg.mpi_host_flags, hosts))
+        if self._n_threads is not None:
+            parts.append(self._thread_flags(launcher, cfg.mpi_thread_flags))
+        parts.append(self.create_sub_command())
+        return " ".join(parts)
+
+    def create_remote_command(self, cmd, hosts: dict):
+        # MPI launcher starts the ranks on the remote hosts by itself
+        return cmd
+
+    def _thread_flags(self, launcher: str, flags: str | None) -> str:
+        """
+        Build launcher flags for binding ranks to their threads
+
+        @param launcher MPI launcher command
+        @param flags User-specified flags (from config) or `None`
+        """
+        if flags is None:
+            name = os.path.basename(launcher.split()[0])
+            flags = THREAD_FLAGS.get(name, THREAD_FLAGS["mpirun"])
+        return flags.format(threads=self._n_threads)
+
+    def _host_flags(self, launcher: str, flags: str | None, hosts: dict) -> str:
+        """
+        Build launcher flags for placing ranks on the allocated hosts
+
+        @param launcher MPI launcher command
+        @param flags User-specified flags (from config) or `None`
+        @param hosts Allocated hosts ({host: n_cores})
+        """
+        if flags is None:
+            name = os.path.basename(launcher.split()[0])
+            flags = HOST_FLAGS.get(name, HOST_FLAGS["mpirun"])
+        # each rank occupies `threads_per_proc` cores
+        slots = {h: max(1, n // self.threads_per_proc) for h, n in hosts.items()}
+        return flags.format(
+            hosts=",".join(f"{h}:{n}" for h, n in slots.items()),
+            nodes=",".join(hosts),
+        )
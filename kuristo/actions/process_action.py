@@ -1,10 +1,80 @@
 import os
+import shlex
 import subprocess
+import threading
 from abc import abstractmethod
+from collections import deque
 
+import kuristo.config as config
 import kuristo.utils as utils
 from kuristo.actions.action import Action
 from kuristo.context import Context
+from kuristo.rusage import peak_rss, wait_with_usage
+
+
+class BoundedOutput:
+    """
+    Output of a process that keeps only its beginning and its end, if it grows too big
+    """
+
+    def __init__(self, limit: int | None):
+        """
+        @param limit Maximum number of bytes kept, half of it from the beginning and half
+               from the end (`None` means unlimited)
+        """
+        self._head_limit = None if limit is None else limit - limit // 2
+        self._tail_limit = None if limit is None else limit // 2
+        self._head = bytearray()
+        self._tail = deque()
+        self._tail_size = 0
+        self._total = 0
+
+    @property
+    def head(self):
+        """
+        Return the beginning of the output
+        """
+        return self._head
+
+    @property
+    def dropped(self):
+        """
+        Return number of bytes that were dropped
+        """
+        if self._tail_limit is None:
+            return 0
+        return self._total - len(self._head) - min(self._tail_size, self._tail_limit)
+
+    def write(self, data: bytes):
+        self._total += len(data)
+        if self._head_limit is None:
+            self._head += data
+            return
+        n = min(len(data), self._head_limit - len(self._head))
+        if n > 0:
+            self._head += data[:n]
+            data = data[n:]
+        if not data:
+            return
+        self._tail.append(data)
+        self._tail_size += len(data)
+        # drop whole chunks, the rest is trimmed when the output is assembled
+        while len(self._tail) > 1 and self._tail_size - len(self._tail[0]) >= self._tail_limit:
+            self._tail_size -= len(self._tail.popleft())
+
+    def getvalue(self) -> bytes:
+        """
+        Return the kept output, with a note about dropped output in the middle
+        """
+        tail = b"".join(self._tail)
+        if self._tail_limit is not None and len(tail) > self._tail_limit:
+            tail = tail[len(tail) - self._tail_limit :]
+        dropped = self.dropped
+        if dropped == 0:
+            return bytes(self._head) + tail
+        sep = b"" if self._head.endswith(b"\n") else b"\n"
+        marker = f"... {dropped} bytes of output dropped ...\n".encode()
+        return bytes(self._head) + sep + marker + tail
 
 
 class ProcessAction(Action):
@@ -16,21 +86,55 @@ class ProcessAction(Action):
         super().__init__(name, context, **kwargs)
         self._process = None
         self._env = kwargs.get("env", {})
+        self._n_threads = kwargs.get("threads_per_proc", None)
+        self._parent_peak_rss = None
+
+    @property
+    def threads_per_proc(self) -> int:
+        """
+        Return number of threads each process of this step spawns
+        """
+        if self._n_threads is None:
+            return 1
+        return self._n_threads
 
     @property
     def command(self) -> str | list:
         """
         Return command
         """
-        return self.create_command()
+        cmd = self.create_command()
+        hosts = getattr(self.context, "hosts", None)
+        if hosts:
+            return self.create_remote_command(cmd, hosts)
+        return cmd
+
+    def create_remote_command(self, cmd: str | list, hosts: dict) -> str | list:
+        """
+        Wrap `cmd` so that it runs on the host allocated to this step
+
+        @param cmd Command to run
+        @param hosts Allocated hosts ({host: n_cores})
+        @return Command launched through the remote launcher
+        """
+        cfg = config.get()
+        host, n_cores = next(iter(hosts.items()))
+        prefix = cfg.remote_launcher.format(host=host, cores=n_cores)
+        if isinstance(cmd, list):
+            return shlex.split(prefix) + cmd
+        else:
+            return f"{prefix} sh -c {shlex.quote(cmd)}"
 
     def run(self) -> int:
         timeout = self.timeout_minutes
         env = os.environ.copy()
         if self.context is not None:
             env.update(self.context.env)
+        if self._n_threads is not None:
+            env["OMP_NUM_THREADS"] = str(self._n_threads)
         env.update((var, str(val)) for var, val in self._env.items())
         cmd, use_shell = utils.determine_shell_use(self.command)
+        self._parent_peak_rss = peak_rss()
         self._process = subprocess.Popen(
             cmd,
             shell=use_shell,
@@ -40,23 +144,80 @@ class ProcessAction(Action):
             stderr=subprocess.STDOUT,
         )
         try:
-            stdout, _ = self._process.communicate(timeout=timeout * 60)
+            stdout, timed_out = self._read_output(timeout * 60)
+            if timed_out:
+                self.stream_output("Step timed out")
+                self.output = stdout + b"\nStep timed out"
+                return 124
             if self.id is not None:
                 self.context.vars["steps"][self.id] = {"output": stdout.decode()}
             self.output = stdout
             return self._process.returncode
 
-        except subprocess.TimeoutExpired:
-            self.terminate()
-            outs, _ = self._process.communicate()
-            outs += b"\n"
-            outs += "Step timed out".encode()
-            self.output = outs
-            return 124
         except subprocess.SubprocessError:
             self.output = b""
             return -1
 
+    def _read_output(self, timeout: float):
+        """
+        Read output of the running process as it is produced
+
+        Complete lines are passed to the output listener right away. If the output exceeds
+        `max_output`, only its beginning and end are kept; the end is passed to the listener
+        once the process finishes.
+
+        @param timeout Time limit [s]
+        @return Output of the process and whether the process was killed for running too long
+        """
+        timed_out = threading.Event()
+
+        def on_timeout():
+            timed_out.set()
+            self.terminate()
+
+        timer = threading.Timer(timeout, on_timeout)
+        timer.start()
+        out = BoundedOutput(self.max_output)
+        # how much of the output was passed to the listener
+        n_streamed = 0
+        try:
+            while chunk := self._process.stdout.read1(65536):
+                n_head = len(out.head)
+                out.write(chunk)
+                # only look at what was just added, a long line must not be scanned repeatedly
+                end = out.head.rfind(b"\n", n_head) + 1
+                if end > n_streamed:
+                    self._stream_lines(out.head[n_streamed:end])
+                    n_streamed = end
+            self._wait()
+        finally:
+            timer.cancel()
+        self._output_dropped = out.dropped
+        stdout = out.getvalue()
+        self._stream_lines(stdout[n_streamed:])
+        return stdout, timed_out.is_set()
+
+    def _wait(self):
+        """
+        Wait for the process to finish and collect the resources it used
+        """
+        if not hasattr(os, "wait4"):
+            self._process.wait()
+            return
+        try:
+            status, self._resource_usage = wait_with_usage(self._process.pid, self._parent_peak_rss)
+        except ChildProcessError:
+            # reaped by someone else, the exit code is all that is left
+            self._process.wait()
+            return
+        self._process.returncode = os.waitstatus_to_exitcode(status)
+
+    def _stream_lines(self, data: bytes):
+        if self.output_listener is None:
+            return
+        for line in data.decode(errors="replace").splitlines():
+            self.stream_output(line)
+
     def terminate(self):
         if self._process is not None:
             self._process.kill()
@@ -17,4 +17,4 @@ class ShellAction(ProcessAction):
 
     @property
     def num_cores(self):
-        return self._n_cores
+        return self._n_cores * self.threads_per_proc
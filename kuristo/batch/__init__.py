@@ -1,9 +1,11 @@
 from kuristo.batch.backend import BatchBackend
+from kuristo.batch.local import LocalBackend
 from kuristo.batch.slurm import SlurmBackend
 from kuristo.exceptions import UserException
 
 BACKENDS = {
     "slurm": SlurmBackend,
+    "local": LocalBackend,
 }
 
 
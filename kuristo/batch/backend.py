@@ -1,8 +1,10 @@
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Optional
 
+from kuristo.exceptions import UserException
+
 
 @dataclass
 class ScriptParameters:
@@ -10,8 +12,8 @@ class ScriptParameters:
     run_id: str
     # Job number we start numbering from
     first_job_num: int
-    # Workflow file to execute
-    workflow_file: Path
+    # Workflow file to execute (`None` for job arrays)
+    workflow_file: Optional[Path]
     # Job name
     name: str
     # Working directory
@@ -22,6 +24,12 @@ class ScriptParameters:
     max_time: int
     # Partition name
     partition: Optional[str] = None
+    # Number of tasks in a job array (`None` if this is not a job array)
+    array_size: Optional[int] = None
+    # Index of the first array task in the run's task list
+    array_offset: int = 0
+    # Queue jobs (`<id>`) or array tasks (`<id>_<index>`) that must succeed before this one starts
+    dependencies: list[str] = field(default_factory=list)
 
 
 class BatchBackend(ABC):
@@ -51,3 +59,26 @@ class BatchBackend(ABC):
         Return job status.
         """
         pass
+
+    def status_many(self, job_ids: list[str]) -> dict[str, str]:
+        """
+        Return status of several jobs. Backends should override this to query the queue only once.
+
+        @param job_ids Job IDs from the queue
+        @return Mapping of job ID to its status
+        """
+        return {job_id: self.status(job_id) for job_id in job_ids}
+
+    def is_active(self, status: str) -> bool:
+        """
+        Check if a status (as returned by `status`) means the job is still queued or running
+        """
+        return False
+
+    def cancel(self, job_id: str):
+        """
+        Remove a job from the queue (stopping it if it is running)
+
+        @param job_id Job ID from the queue
+        """
+        raise UserException(f"Backend '{self.name}' does not support cancelling jobs")
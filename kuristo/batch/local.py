@@ -0,0 +1,310 @@
+import fcntl
+import os
+import signal
+import subprocess
+import sys
+import time
+from collections import Counter
+from importlib.resources import files
+from pathlib import Path
+
+from jinja2 import Environment, FileSystemLoader
+
+import kuristo.config as config
+from kuristo.batch.backend import BatchBackend, ScriptParameters
+
+PENDING = "PENDING"
+RUNNING = "RUNNING"
+COMPLETED = "COMPLETED"
+FAILED = "FAILED"
+CANCELLED = "CANCELLED"
+
+# How often the worker looks at the queue [s]
+POLL_INTERVAL = 0.2
+
+
+def _write_file(path: Path, text: str):
+    """
+    Write a file atomically
+    """
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_text(text)
+    os.replace(tmp_path, path)
+
+
+def _read_file(path: Path, default=None):
+    try:
+        return path.read_text().strip()
+    except FileNotFoundError:
+        return default
+
+
+class LocalBackend(BatchBackend):
+    """
+    Batch backend that runs job scripts in a pool of local worker processes.
+
+    Submitted jobs are spooled into a queue directory. A detached worker process runs
+    them while the sum of their cores does not exceed the capacity of the pool, so
+    `batch status` and `batch cancel` keep working after `batch submit` exited.
+    """
+
+    def __init__(self, queue_dir: Path | None = None, capacity: int | None = None, spawn=True):
+        """
+        @param queue_dir Directory with queued jobs (default: `<log dir>/local-queue`)
+        @param capacity Number of cores of the pool (default: `batch.local-cores`)
+        @param spawn Start the worker process on submission
+        """
+        super().__init__(name="local")
+        cfg = config.get()
+        self._queue_dir = Path(queue_dir or cfg.log_dir / "local-queue")
+        self._capacity = capacity or cfg.batch_local_cores
+        self._spawn = spawn
+        template_dir = files("kuristo").joinpath("templates")
+        self._env = Environment(
+            loader=FileSystemLoader(str(template_dir)), trim_blocks=True, lstrip_blocks=True
+        )
+
+    @property
+    def queue_dir(self):
+        """
+        Return directory with queued jobs
+        """
+        return self._queue_dir
+
+    def submit(self, params: ScriptParameters) -> str:
+        script = self._render_job_script(params)
+        n_cores = min(params.n_cores, self._capacity)
+        job_id = self.enqueue(script, n_cores, params.array_size, params.dependencies)
+        if self._spawn:
+            self._start_worker()
+        return job_id
+
+    def enqueue(
+        self, script: str, n_cores: int, n_tasks: int | None = None, needs: list[str] | None = None
+    ) -> str:
+        """
+        Put a job script into the queue
+
+        @param script Job script
+        @param n_cores Number of cores the script uses
+        @param n_tasks Number of array tasks (`None` if this is not a job array)
+        @param needs Jobs (`<id>`) or array tasks (`<id>_<index>`) that must complete first
+        @return Job ID
+        """
+        self._queue_dir.mkdir(parents=True, exist_ok=True)
+        num = self._reserve_id()
+        if n_tasks is None:
+            tasks = [(f"{num:06d}", {})]
+        else:
+            tasks = [
+                (f"{num:06d}_{i:06d}", {"KURISTO_ARRAY_TASK_ID": str(i)}) for i in range(n_tasks)
+            ]
+        for name, env in tasks:
+            tmp_dir = self._queue_dir / f".{name}"
+            tmp_dir.mkdir()
+            (tmp_dir / "script.sh").write_text(script)
+            (tmp_dir / "cores").write_text(str(n_cores))
+            (tmp_dir / "env").write_text("".join(f"{k}={v}\n" for k, v in env.items()))
+            (tmp_dir / "needs").write_text("".join(f"{n}\n" for n in needs or []))
+            (tmp_dir / "state").write_text(PENDING)
+            # job becomes visible to the worker only once it is complete
+            os.rename(tmp_dir, self._queue_dir / name)
+        return str(num)
+
+    def status(self, job_id: str) -> str:
+        states = [_read_file(d / "state", "UNKNOWN") for d in self._entries(job_id)]
+        if not states:
+            return "UNKNOWN"
+        counts = Counter(states)
+        if len(counts) == 1:
+            return states[0]
+        return ", ".join(f"{state}: {n}" for state, n in counts.items())
+
+    def is_active(self, status: str) -> bool:
+        return PENDING in status or RUNNING in status
+
+    def cancel(self, job_id: str):
+        for entry in self._entries(job_id):
+            (entry / "cancel").touch()
+            if _read_file(entry / "state") == PENDING:
+                _write_file(entry / "state", CANCELLED)
+
+    def _entries(self, job_id: str) -> list[Path]:
+        return _entries(self._queue_dir, job_id)
+
+    def _reserve_id(self) -> int:
+        with open(self._queue_dir / ".lock-id", "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            num = int(f.read().strip() or 0) + 1
+            f.seek(0)
+            f.truncate()
+            f.write(str(num))
+        return num
+
+    def _start_worker(self):
+        log = open(self._queue_dir / "worker.log", "a")
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "kuristo.batch.local",
+                str(self._queue_dir),
+                str(self._capacity),
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            start_new_session=True,
+        )
+        log.close()
+
+    def _render_job_script(self, params: ScriptParameters):
+        template = self._env.get_template("local_job.sh.j2")
+        job = {
+            "name": params.name,
+            "workdir": params.work_dir,
+            "workflow_file": params.workflow_file.resolve() if params.workflow_file else None,
+            "run_id": params.run_id,
+            "first_job_num": params.first_job_num,
+            "array_size": params.array_size,
+            "array_offset": params.array_offset,
+            "kuristo": f"{sys.executable} -m kuristo",
+        }
+        return template.render({"job": job})
+
+
+def _entries(queue_dir: Path, job_id: str) -> list[Path]:
+    """
+    Find queue entries of a job (`<id>`) or of a single array task (`<id>_<index>`)
+    """
+    if not queue_dir.exists():
+        return []
+    num, _, task = job_id.partition("_")
+    if task:
+        entry = queue_dir / f"{int(num):06d}_{int(task):06d}"
+        return [entry] if entry.exists() else []
+    prefix = f"{int(num):06d}"
+    return sorted(d for d in queue_dir.iterdir() if d.name.split("_", 1)[0] == prefix)
+
+
+def _dependency_state(entry: Path) -> str:
+    """
+    Check dependencies of a queue entry
+
+    @return `COMPLETED` if the entry can start, `PENDING` if it has to wait and
+            `CANCELLED` if a dependency can never be satisfied
+    """
+    result = COMPLETED
+    for dep in (entry / "needs").read_text().split():
+        entries = _entries(entry.parent, dep)
+        states = [_read_file(d / "state") for d in entries]
+        if not entries or any(st in (FAILED, CANCELLED) for st in states):
+            return CANCELLED
+        if any(st != COMPLETED for st in states):
+            result = PENDING
+    return result
+
+
+def run_worker(queue_dir: Path, capacity: int):
+    """
+    Run queued jobs until the queue is empty. Only one worker runs per queue.
+
+    @param queue_dir Directory with queued jobs
+    @param capacity Number of cores available to the jobs
+    """
+    queue_dir = Path(queue_dir)
+    lock = open(queue_dir / ".lock-worker", "a")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        # another worker is serving this queue
+        lock.close()
+        return
+
+    running = {}
+    while True:
+        _reap(running)
+        _cancel_running(running)
+        pending = [
+            d
+            for d in sorted(queue_dir.iterdir())
+            if not d.name.startswith(".") and d.is_dir() and _read_file(d / "state") == PENDING
+        ]
+        used = sum(n for _, n in running.values())
+        for entry in pending:
+            if (entry / "cancel").exists():
+                _write_file(entry / "state", CANCELLED)
+                continue
+            dep_state = _dependency_state(entry)
+            if dep_state == CANCELLED:
+                _write_file(entry / "state", CANCELLED)
+                continue
+            if dep_state == PENDING:
+                continue
+            n_cores = int(_read_file(entry / "cores", "1"))
+            # a job bigger than the pool runs once the pool is empty
+            if used + n_cores > capacity and running:
+                break
+            running[entry] = (_start(entry, n_cores), n_cores)
+            used += n_cores
+
+        if not running and not pending:
+            # jobs may have been added while we were deciding to quit
+            fcntl.flock(lock, fcntl.LOCK_UN)
+            lock.close()
+            if any(
+                _read_file(d / "state") == PENDING
+                for d in queue_dir.iterdir()
+                if not d.name.startswith(".") and d.is_dir()
+            ):
+                run_worker(queue_dir, capacity)
+            return
+        time.sleep(POLL_INTERVAL)
+
+
+def _start(entry: Path, n_cores: int) -> subprocess.Popen:
+    env = os.environ.copy()
+    for line in (entry / "env").read_text().splitlines():
+        k, v = line.split("=", 1)
+        env[k] = v
+    # kuristo inside the job must stay within the cores it was given
+    env["KURISTO_NUM_CORES"] = str(n_cores)
+    with open(entry / "output", "w") as out:
+        proc = subprocess.Popen(
+            ["bash", str(entry / "script.sh")],
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=out,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+    (entry / "pid").write_text(str(proc.pid))
+    _write_file(entry / "state", RUNNING)
+    return proc
+
+
+def _reap(running: dict):
+    for entry, (proc, _) in list(running.items()):
+        rc = proc.poll()
+        if rc is None:
+            continue
+        del running[entry]
+        (entry / "returncode").write_text(str(rc))
+        if (entry / "cancel").exists():
+            _write_file(entry / "state", CANCELLED)
+        else:
+            _write_file(entry / "state", COMPLETED if rc == 0 else FAILED)
+
+
+def _cancel_running(running: dict):
+    for entry, (proc, _) in running.items():
+        if (entry / "cancel").exists() and proc.poll() is None:
+            try:
+                os.killpg(proc.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+
+if __name__ == "__main__":
+    run_worker(Path(sys.argv[1]), int(sys.argv[2]))
@@ -1,4 +1,5 @@
 import subprocess
+from collections import Counter
 from importlib.resources import files
 from pathlib import Path
 
@@ -8,12 +9,68 @@ from kuristo.batch.backend import BatchBackend, ScriptParameters
 from kuristo.exceptions import UserException
 from kuristo.utils import minutes_to_hhmmss
 
+# States of jobs that are still in the queue
+ACTIVE_STATES = {
+    "PENDING",
+    "RUNNING",
+    "CONFIGURING",
+    "COMPLETING",
+    "SUSPENDED",
+    "REQUEUED",
+    "RESIZING",
+}
+
+
+def _summarize(states: list[str]) -> str:
+    """
+    Summarize states of a job (job arrays have one state per task)
+    """
+    counts = Counter(states)
+    if len(counts) == 1:
+        return states[0]
+    return ", ".join(f"{state}: {n}" for state, n in counts.items())
+
+
+def _parse_states(output: str, job_ids: list[str]) -> dict[str, list[str]]:
+    """
+    Parse lines of `<job id> <state>` into states per requested job ID.
+    Array tasks (i.e. `123_4` or `123_[5-10]`) are attributed to their array job ID.
+    """
+    states = {}
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) < 2:
+            continue
+        job_id = parts[0].split("_", 1)[0].split(".", 1)[0]
+        if job_id in job_ids:
+            states.setdefault(job_id, []).append(parts[1])
+    return states
+
+
+def _sacct_states(job_ids: list[str]) -> dict[str, list[str]] | None:
+    """
+    Ask the accounting for states of jobs that are not in the queue
+
+    @param job_ids Job IDs
+    @return States by job ID or `None` if sacct failed
+    """
+    result = subprocess.run(
+        ["sacct", "-n", "-X", "-P", "-j", ",".join(job_ids), "-o", "JobID,State"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        return None
+    return _parse_states(result.stdout.replace("|", " "), job_ids)
+
 
 class SlurmBackend(BatchBackend):
     def __init__(self):
         super().__init__(name="slurm")
         template_dir = files("kuristo").joinpath("templates")
-        self._env = Environment(loader=FileSystemLoader(str(template_dir)))
+        self._env = Environment(
+            loader=FileSystemLoader(str(template_dir)), trim_blocks=True, lstrip_blocks=True
+        )
 
     def submit(self, params: ScriptParameters) -> str:
         script = self._render_job_script(params)
@@ -33,9 +90,50 @@ class SlurmBackend(BatchBackend):
             ["squeue", "-j", job_id, "-h", "-o", "%T"], capture_output=True, text=True
         )
         if result.returncode != 0:
-            return "UNKNOWN"
-        state = result.stdout.strip()
-        return state or "COMPLETED"
+            # squeue fails for jobs it does not know anymore, ask the accounting
+            states = _sacct_states([job_id])
+            if states is None:
+                return "UNKNOWN"
+            return _summarize(states[job_id]) if job_id in states else "COMPLETED"
+        # job arrays report one line per task
+        states = result.stdout.split()
+        if not states:
+            return "COMPLETED"
+        return _summarize(states)
+
+    def status_many(self, job_ids: list[str]) -> dict[str, str]:
+        if not job_ids:
+            return {}
+        result = subprocess.run(
+            ["squeue", "-h", "-j", ",".join(job_ids), "-o", "%i %T"],
+            capture_output=True,
+            text=True,
+        )
+        # squeue fails when none of the jobs is known to it anymore, i.e. none is queued
+        in_queue = result.returncode == 0
+        states = _parse_states(result.stdout, job_ids) if in_queue else {}
+
+        # jobs that left the queue, ask the accounting for their final state
+        finished = [job_id for job_id in job_ids if job_id not in states]
+        if finished:
+            accounted = _sacct_states(finished)
+            if accounted is None and not in_queue:
+                # neither squeue nor sacct answered
+                return {job_id: "UNKNOWN" for job_id in job_ids}
+            states.update(accounted or {})
+
+        return {
+            job_id: _summarize(states[job_id]) if job_id in states else "COMPLETED"
+            for job_id in job_ids
+        }
+
+    def is_active(self, status: str) -> bool:
+        return any(state.rstrip(":") in ACTIVE_STATES for state in status.split())
+
+    def cancel(self, job_id: str):
+        result = subprocess.run(["scancel", job_id], capture_output=True, text=True)
+        if result.returncode != 0:
+            raise UserException(f"scancel failed: {result.stderr.strip()}")
 
     def _render_job_script(self, params: ScriptParameters):
         template = self._env.get_template("slurm_job.sh.j2")
@@ -45,8 +143,11 @@ class SlurmBackend(BatchBackend):
             "num_tasks": params.n_cores,
             "walltime": minutes_to_hhmmss(params.max_time),
             "partition": params.partition,
-            "workflow_file": params.workflow_file.resolve(),
+            "workflow_file": params.workflow_file.resolve() if params.workflow_file else None,
             "run_id": params.run_id,
             "first_job_num": params.first_job_num,
+            "array_size": params.array_size,
+            "array_offset": params.array_offset,
+            "dependencies": params.dependencies,
         }
         return template.render({"job": job})
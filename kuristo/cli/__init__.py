@@ -5,13 +5,17 @@ from kuristo._version import __version__
 from kuristo.cli._batch import batch
 from kuristo.cli._diff import diff
 from kuristo.cli._doctor import print_diag
+from kuristo.cli._flaky import flaky
 from kuristo.cli._list import list_jobs
 from kuristo.cli._log import log
+from kuristo.cli._perf import perf
 from kuristo.cli._report import report
 from kuristo.cli._run import run_jobs
 from kuristo.cli._show import show
 from kuristo.cli._status import status
 from kuristo.cli._tag import tag
+from kuristo.cli._trace import trace
+from kuristo.profiling import PROFILE_FILE
 
 __all__ = [
     "__version__",
@@ -25,9 +29,42 @@ __all__ = [
     "report",
     "tag",
     "diff",
+    "perf",
+    "flaky",
+    "trace",
 ]
 
 
+def add_perf_arguments(parser):
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        metavar="FRAC",
+        help="Relative change of duration that is reported (i.e. 0.2 for 20%%)",
+    )
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        metavar="SEC",
+        help="Ignore changes of duration smaller than this [s]",
+    )
+    parser.add_argument(
+        "--fail-on-regression",
+        action="store_true",
+        help="Exit with non-zero code when a regression is found",
+    )
+
+
+def expand_profile_arg(argv: list[str]) -> list[str]:
+    """
+    Fill in the default file of `--profile` given without one
+
+    Otherwise the argument following `--profile` (i.e. the command) would be taken for the file.
+    Use `--profile=FILE` to choose the file.
+    """
+    return [f"--profile={PROFILE_FILE}" if arg == "--profile" else arg for arg in argv]
+
+
 def build_parser():
     parser = argparse.ArgumentParser(prog="kuristo", description="Kuristo automation framework")
     parser.add_argument("--version", action="version", version=f"%(prog)s {__version__}")
@@ -36,6 +73,13 @@ def build_parser():
         action="store_true",
         help="Enable debug mode (print tracebacks for errors)",
     )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=PROFILE_FILE,
+        metavar="FILE",
+        help=f"Profile kuristo itself and write the statistics into FILE (default: {PROFILE_FILE})",
+    )
     parser.add_argument(
         "--no-ansi",
         action="store_true",
@@ -66,6 +110,24 @@ def build_parser():
         action="store_true",
         help="Run jobs that failed in the last run first, then the rest",
     )
+    run_parser.add_argument(
+        "--flaky",
+        choices=["include", "exclude", "last"],
+        default="include",
+        help="How --rerun-failed and --failed-first treat known flaky jobs (default: include)",
+    )
+    run_parser.add_argument(
+        "--resume",
+        type=str,
+        metavar="RUN_ID",
+        help="Resume an interrupted run (only unfinished jobs are run)",
+    )
+    run_parser.add_argument(
+        "--trace",
+        type=str,
+        metavar="FILE",
+        help="Record timeline of the run and write it in Chrome Trace Event format into FILE",
+    )
     run_parser.add_argument("locations", nargs="*", help="Locations to scan for workflow files")
 
     # Doctor command
@@ -87,18 +149,57 @@ def build_parser():
     batch_subparsers = batch_parser.add_subparsers(dest="batch_command")
 
     batch_submit_parser = batch_subparsers.add_parser("submit", help="Submit jobs to HPC queue")
-    batch_submit_parser.add_argument("--backend", type=str, help="Batch backend to use: ['slurm']")
+    batch_submit_parser.add_argument(
+        "--backend", type=str, help="Batch backend to use: ['slurm', 'local']"
+    )
     batch_submit_parser.add_argument("--partition", type=str, help="Partition name to use")
+    batch_submit_parser.add_argument(
+        "--no-array",
+        action="store_true",
+        help="Submit every workflow file as a separate job instead of a single job array",
+    )
+    batch_submit_parser.add_argument(
+        "--pack",
+        action="store_true",
+        help="Pack workflow files into fewer allocations (uses durations from previous runs)",
+    )
+    batch_submit_parser.add_argument(
+        "--pack-cores", type=int, metavar="N", help="Number of cores of a packed allocation"
+    )
+    batch_submit_parser.add_argument(
+        "--pack-walltime", type=int, metavar="MIN", help="Walltime of a packed allocation [mins]"
+    )
     batch_submit_parser.add_argument(
         "locations", nargs="*", help="Locations to scan for workflow files"
     )
 
-    batch_subparsers.add_parser("status", help="Check HPC job status")
+    batch_status_parser = batch_subparsers.add_parser("status", help="Check HPC job status")
+    batch_status_parser.add_argument(
+        "--watch", action="store_true", help="Keep polling until all jobs left the queue"
+    )
+    batch_status_parser.add_argument(
+        "--interval", type=int, metavar="SEC", help="Polling interval for --watch [s]"
+    )
+
+    batch_subparsers.add_parser("cancel", help="Cancel HPC jobs of the latest run")
 
     batch_run_parser = batch_subparsers.add_parser("run", help="Run job in a batch system")
     batch_run_parser.add_argument("run_id", help="ID of the run")
-    batch_run_parser.add_argument("first_job_id", type=int, help="First job ID to start from")
-    batch_run_parser.add_argument("workflow_file", help="Workflow file to run")
+    batch_run_parser.add_argument(
+        "first_job_id", type=int, nargs="?", help="First job ID to start from"
+    )
+    batch_run_parser.add_argument("workflow_file", nargs="?", help="Workflow file to run")
+    batch_run_parser.add_argument(
+        "--task", type=int, help="Index of the array task to run (from the run's task list)"
+    )
+    batch_run_parser.add_argument(
+        "--multi-node",
+        action="store_true",
+        help="Use all nodes of the allocation (from SLURM_JOB_NODELIST or --hostfile)",
+    )
+    batch_run_parser.add_argument(
+        "--hostfile", type=Path, metavar="FILE", help="File with hosts of the allocation"
+    )
 
     # Status command
     status_parser = subparsers.add_parser("status", help="Display status of runs")
@@ -115,6 +216,15 @@ def build_parser():
     show_parser = subparsers.add_parser("show", help="Show job log")
     show_parser.add_argument("--run-id", type=str, help="Run ID to display results for")
     show_parser.add_argument("--job", required=True, type=int, help="Job ID")
+    show_parser.add_argument(
+        "--step", type=int, metavar="N", help="Show only the output of N-th step of the job"
+    )
+    show_parser.add_argument(
+        "-f",
+        "--follow",
+        action="store_true",
+        help="Show output of a running job as it is produced, until the job ends",
+    )
 
     # Report command
     report_parser = subparsers.add_parser("report", help="Create report")
@@ -147,5 +257,48 @@ def build_parser():
     diff_parser = subparsers.add_parser("diff", help="Compare two runs")
     diff_parser.add_argument("run1", type=str, help="First run ID or tag")
     diff_parser.add_argument("run2", type=str, help="Second run ID or tag")
+    diff_parser.add_argument(
+        "--perf", action="store_true", help="Also compare job durations (run1 is the baseline)"
+    )
+    add_perf_arguments(diff_parser)
+
+    # Perf command
+    perf_parser = subparsers.add_parser("perf", help="Detect performance regressions")
+    perf_parser.add_argument("--run-id", type=str, help="Run ID to check (default: latest)")
+    perf_parser.add_argument(
+        "--baseline", type=str, metavar="RUN", help="Run ID or tag to compare against"
+    )
+    perf_parser.add_argument(
+        "--window",
+        type=int,
+        metavar="N",
+        help="Compare against the median of the last N runs (when no --baseline is given)",
+    )
+    add_perf_arguments(perf_parser)
+
+    # Flaky command
+    flaky_parser = subparsers.add_parser("flaky", help="Find jobs that pass and fail at random")
+    flaky_parser.add_argument(
+        "--window", type=int, metavar="N", help="Look at the last N outcomes of each job"
+    )
+    flaky_parser.add_argument(
+        "--min-score",
+        type=float,
+        metavar="SCORE",
+        help="Only report jobs with at least this flakiness score (0 to 1)",
+    )
+
+    # Trace command
+    trace_parser = subparsers.add_parser(
+        "trace", help="Export timeline of a run in Chrome Trace Event format"
+    )
+    trace_parser.add_argument("--run-id", type=str, help="Run ID to export (default: latest)")
+    trace_parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        metavar="FILE",
+        help="Output file (default: trace-<run-id>.json)",
+    )
 
     return parser
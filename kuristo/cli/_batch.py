@@ -1,7 +1,9 @@
-import fcntl
+import dataclasses
+import math
 import os
 import re
 import threading
+import time
 from datetime import datetime
 from pathlib import Path
 
@@ -15,12 +17,18 @@ from kuristo.action_factory import ActionFactory
 from kuristo.batch import get_backend
 from kuristo.batch.backend import ScriptParameters
 from kuristo.context import Context
+from kuristo.exceptions import UserException
 from kuristo.job import Job
 from kuristo.plugin_loader import load_user_steps_from_kuristo_dir
-from kuristo.resources import Resources
+from kuristo.resources import NodeResources, Resources, detect_nodes
 from kuristo.scanner import scan_locations
 from kuristo.scheduler import Scheduler, create_jobs
-from kuristo.workflow import Workflow, parse_workflow_files, workflow_from_file
+from kuristo.workflow import (
+    Workflow,
+    order_workflows,
+    parse_workflow_files,
+    workflow_from_file,
+)
 
 
 def build_actions(spec, context):
@@ -86,31 +94,196 @@ def create_script_params(
     )
 
 
-def update_report_atomic(yaml_path: Path, new_results: list):
+def create_array_params(
+    job_name: str,
+    run_id: str,
+    tasks: list[ScriptParameters],
+    offset: int,
+    workdir: Path,
+) -> ScriptParameters:
+    """
+    Create a specification for submitting tasks as a single job array
+
+    @param job_name Name of the job array
+    @param run_id Kuristo run ID
+    @param tasks Script parameters of the individual tasks in the array
+    @param offset Index of the first task in the run's task list
+    @param workdir Working directory of the job array
+    @return Script parameters
     """
-    Append new results into a yaml file
+    cfg = config.get()
+    return ScriptParameters(
+        name=job_name,
+        n_cores=max(t.n_cores for t in tasks),
+        max_time=max(t.max_time for t in tasks),
+        work_dir=workdir,
+        partition=cfg.batch_partition,
+        run_id=run_id,
+        first_job_num=tasks[0].first_job_num,
+        workflow_file=None,
+        array_size=len(tasks),
+        array_offset=offset,
+    )
 
-    @param yaml_path File we want to update
-    @param new_results Results to add
+
+def load_historical_durations(log_dir: Path) -> dict[str, float]:
     """
-    yaml_path = Path(yaml_path)
-    yaml_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(yaml_path, "a+") as f:
-        fcntl.flock(f, fcntl.LOCK_EX)
+    Collect durations of workflow files from previous runs (newer runs take precedence)
 
-        f.seek(0)
+    @param log_dir Base log directory
+    @return Mapping of workflow file to the total duration of its jobs [s]
+    """
+    durations = {}
+    for run_dir in utils.get_latest_run_dirs(log_dir):
+        utils.merge_result_fragments(run_dir)
+        report_path = run_dir / "report.yaml"
+        if not report_path.exists():
+            continue
         try:
-            report = yaml.safe_load(f) or {"results": []}
-            results = report["results"]
+            report = utils.read_report(report_path) or {}
         except yaml.YAMLError:
-            results = []
+            continue
+        per_file = {}
+        for r in report.get("results", []):
+            if "duration" in r and r.get("workflow-file"):
+                key = str(Path(r["workflow-file"]).resolve())
+                per_file[key] = per_file.get(key, 0.0) + float(r["duration"])
+        for key, duration in per_file.items():
+            durations.setdefault(key, duration)
+    return durations
+
+
+def pack_tasks(
+    tasks: list[ScriptParameters], n_cores: int, walltime: int, durations: dict[str, float]
+) -> list[list[ScriptParameters]]:
+    """
+    Bin-pack tasks into bundles, so that each bundle fits into an allocation of
+    `n_cores` cores and `walltime` minutes (first fit decreasing on core-minutes).
+    A task is added to a bundle only if the bundle can still finish within `walltime`,
+    see `estimate_makespan`.
+
+    @param tasks Script parameters of the individual workflow files
+    @param n_cores Number of cores of one allocation
+    @param walltime Walltime of one allocation [mins]
+    @param durations Historical durations of workflow files [s]
+    @return List of bundles
+    """
+
+    def estimate(t):
+        duration = durations.get(str(Path(t.workflow_file).resolve()))
+        if duration is None:
+            return t.max_time
+        return max(1, math.ceil(duration / 60))
+
+    capacity = n_cores * walltime
+    bins = []
+    for t in sorted(tasks, key=lambda t: t.n_cores * estimate(t), reverse=True):
+        area = t.n_cores * estimate(t)
+        if t.n_cores > n_cores or estimate(t) > walltime:
+            # too big for the allocation, so it gets one for itself
+            bins.append([capacity, [t]])
+            continue
+        for b in bins:
+            if b[0] + area <= capacity and (
+                estimate_makespan(b[1] + [t], n_cores, estimate) <= walltime
+            ):
+                b[0] += area
+                b[1].append(t)
+                break
+        else:
+            bins.append([area, [t]])
+    return [b[1] for b in bins]
+
+
+def estimate_makespan(tasks: list[ScriptParameters], n_cores: int, estimate) -> float:
+    """
+    Estimate how long a bundle of tasks runs in an allocation of `n_cores` cores
+
+    Tasks are placed widest first, each on the cores that become free the earliest, so
+    tasks that can not run side by side add up.
+
+    @param tasks Script parameters of the tasks in the bundle
+    @param n_cores Number of cores of the allocation
+    @param estimate Function returning the estimated run time of a task [mins]
+    @return Estimated run time of the bundle [mins]
+    """
+    free_at = [0.0] * n_cores
+    for t in sorted(tasks, key=lambda t: (t.n_cores, estimate(t)), reverse=True):
+        free_at.sort()
+        k = min(max(t.n_cores, 1), n_cores)
+        start = free_at[k - 1]
+        for i in range(k):
+            free_at[i] = start + estimate(t)
+    return max(free_at)
+
+
+def create_bundle_params(
+    bundle: list[ScriptParameters], n_cores: int, walltime: int
+) -> ScriptParameters:
+    """
+    Create a specification for running a bundle of workflow files in a single allocation
+
+    @param bundle Script parameters of the workflow files in the bundle
+    @param n_cores Number of cores of one allocation
+    @param walltime Walltime of one allocation [mins]
+    """
+    if len(bundle) == 1:
+        return bundle[0]
+    return dataclasses.replace(bundle[0], n_cores=n_cores, max_time=walltime)
+
+
+def write_task_list(out_dir: Path, tasks: list[list[ScriptParameters]], cores: list[int]):
+    """
+    Write the list of tasks, so array tasks can find their workflow files
+
+    @param out_dir Run output directory
+    @param tasks Tasks, each being a bundle of workflow files that run together
+    @param cores Number of cores requested for each task
+    """
+    entries = [
+        {
+            "workflow-files": [str(Path(t.workflow_file).resolve()) for t in bundle],
+            "first-job-num": bundle[0].first_job_num,
+            # every workflow file keeps its own working directory, even when packed
+            "workdirs": [str(t.work_dir) for t in bundle],
+            "num-cores": n_cores,
+        }
+        for bundle, n_cores in zip(tasks, cores)
+    ]
+    with open(out_dir / "tasks.yaml", "w") as f:
+        yaml.safe_dump({"tasks": entries}, f, sort_keys=False)
+
+
+def read_task(out_dir: Path, task: int) -> dict:
+    """
+    Read a task from the run's task list
+
+    @param out_dir Run output directory
+    @param task Index of the task
+    """
+    with open(out_dir / "tasks.yaml", "r") as f:
+        tasks = yaml.safe_load(f)["tasks"]
+    if task < 0 or task >= len(tasks):
+        raise UserException(f"Task {task} does not exist (run has {len(tasks)} tasks)")
+    return tasks[task]
 
-        results.extend(new_results)
 
-        tmp_path = yaml_path.with_suffix(".tmp")
-        cli_run.write_report_yaml(tmp_path, results, 0.0)
+def anchor_working_directories(workflow: Workflow, workdir: str):
+    """
+    Make relative working directories of a workflow's steps relative to `workdir`, so
+    they do not depend on the directory the task runs in
 
-        os.replace(tmp_path, yaml_path)
+    @param workflow Workflow
+    @param workdir Working directory of the workflow
+    """
+    for spec in workflow.jobs.values():
+        if spec.defaults is not None and spec.defaults.run.working_directory:
+            spec.defaults.run.working_directory = os.path.join(
+                workdir, spec.defaults.run.working_directory
+            )
+        for step in spec.steps:
+            if step.working_directory:
+                step.working_directory = os.path.join(workdir, step.working_directory)
 
 
 def write_job_metadata(batch_job_id, backend_name, workdir):
@@ -142,15 +315,20 @@ def batch_submit(args):
         cfg.batch_backend = args.backend
 
     backend = get_backend(cfg.batch_backend)
+    durations = load_historical_durations(cfg.log_dir) if args.pack else {}
     run_id = datetime.now().strftime("%Y%m%d-%H%M%S")
     out_dir = utils.create_run_output_dir(cfg.log_dir, sub_dir=run_id)
     utils.prune_old_runs(cfg.log_dir, cfg.log_history)
     utils.update_latest_symlink(cfg.log_dir, out_dir)
     load_user_steps_from_kuristo_dir()
 
+    # packed bundles are always submitted as job arrays
+    use_array = args.pack or (cfg.batch_array and not args.no_array)
+
     cond = threading.Event()
     n_jobs = 0
     job_num = 0
+    entries = []
     workflow_files = scan_locations(locations)
     for f in workflow_files:
         n_jobs += 1
@@ -162,24 +340,118 @@ def batch_submit(args):
             job_name = f"kuristo-job-{n_jobs}"
             s = create_script_params(job_name, run_id, job_num, workflow, workdir)
 
-            batch_job_id = backend.submit(s)
-            write_job_metadata(batch_job_id, backend.name, workdir)
-
+            n_wf_jobs = 0
             for sp in workflow.jobs.values():
                 jobs = create_jobs(sp, out_dir, cond)
-                job_num += len(jobs)
+                n_wf_jobs += len(jobs)
+            job_num += n_wf_jobs
+            entries.append((workflow, s, n_wf_jobs))
+
+    order, needs, outside = order_workflows([wf for wf, _, _ in entries])
+    ui.needs_outside_selection(outside)
+
+    if not use_array:
+        batch_job_ids = {}
+        for i in order:
+            s = entries[i][1]
+            s.dependencies = [batch_job_ids[d] for d in needs[i]]
+            batch_job_ids[i] = backend.submit(s)
+            write_job_metadata(batch_job_ids[i], backend.name, s.work_dir)
+    elif entries:
+        independent = [entries[i][1] for i in range(len(entries)) if not needs[i]]
+        if args.pack:
+            pack_cores = args.pack_cores or cfg.batch_pack_cores
+            pack_walltime = args.pack_walltime or cfg.batch_pack_walltime
+            # workflows others depend on are not packed, so the dependents wait only for
+            # them and not for everything else in the bundle
+            depended_on = {id(entries[d][1]) for deps in needs.values() for d in deps}
+            packable = [s for s in independent if id(s) not in depended_on]
+            bundles = pack_tasks(packable, pack_cores, pack_walltime, durations)
+            summaries = [create_bundle_params(b, pack_cores, pack_walltime) for b in bundles]
+            singles = [s for s in independent if id(s) in depended_on]
+            bundles += [[s] for s in singles]
+            summaries += singles
+        else:
+            bundles = [[s] for s in independent]
+            summaries = list(independent)
+        n_independent = len(bundles)
+        # workflows with dependencies run as tasks of their own, so they can start as soon
+        # as the tasks they depend on are done
+        dependent = [i for i in order if needs[i]]
+        bundles += [[entries[i][1]] for i in dependent]
+
+        # renumber, so jobs in a bundle are numbered contiguously
+        counts = {id(s): n for _, s, n in entries}
+        job_num = 0
+        for bundle in bundles:
+            for s in bundle:
+                s.first_job_num = job_num
+                job_num += counts[id(s)]
+        cores = [s.n_cores for s in summaries] + [entries[i][1].n_cores for i in dependent]
+        write_task_list(out_dir, bundles, cores)
+
+        task_of = {id(s): t for t, bundle in enumerate(bundles) for s in bundle}
+        task_refs = {}
+        n_arrays = 0
+        chunk = cfg.batch_max_array_size
+        for offset in range(0, n_independent, chunk):
+            n_arrays += 1
+            array_dir = out_dir / f"array-{n_arrays}"
+            array_dir.mkdir()
+            s = create_array_params(
+                f"kuristo-array-{n_arrays}",
+                run_id,
+                summaries[offset : offset + chunk],
+                offset,
+                array_dir,
+            )
+            batch_job_id = backend.submit(s)
+            write_job_metadata(batch_job_id, backend.name, array_dir)
+            for t in range(offset, min(offset + chunk, n_independent)):
+                task_refs[t] = f"{batch_job_id}_{t - offset}"
+
+        for i in dependent:
+            n_arrays += 1
+            array_dir = out_dir / f"array-{n_arrays}"
+            array_dir.mkdir()
+            t = task_of[id(entries[i][1])]
+            s = create_array_params(
+                f"kuristo-array-{n_arrays}", run_id, [entries[i][1]], t, array_dir
+            )
+            s.dependencies = [task_refs[task_of[id(entries[d][1])]] for d in needs[i]]
+            batch_job_id = backend.submit(s)
+            write_job_metadata(batch_job_id, backend.name, array_dir)
+            task_refs[t] = f"{batch_job_id}_0"
 
     ui.console().print(f"Submitted {n_jobs} jobs")
 
 
-def batch_status(args):
+def query_batch_status(metadata: list) -> list[tuple[str, str, bool]]:
     """
-    Get job status in queue
+    Query status of jobs in the queue (one query per backend)
+
+    @param metadata Metadata of submitted jobs
+    @return List of (job ID, status, still active)
     """
-    cfg = config.get()
-    jobs_dir = cfg.log_dir / "runs" / "latest"
+    job_ids = {}
+    for m in metadata:
+        job_ids.setdefault(m["job"]["backend"], []).append(str(m["job"]["id"]))
+
+    statuses = []
+    for backend_name, ids in job_ids.items():
+        backend = get_backend(backend_name)
+        for batch_job_id, status in backend.status_many(ids).items():
+            statuses.append((batch_job_id, status, backend.is_active(status)))
+    return statuses
+
+
+def read_run_metadata(jobs_dir: Path) -> list:
+    """
+    Read metadata of all batch jobs submitted for a run
 
-    job_dir_pattern = re.compile(r"job-\d+")
+    @param jobs_dir Directory of the run
+    """
+    job_dir_pattern = re.compile(r"(job|array)-\d+")
     metadata = []
     for entry in os.listdir(jobs_dir):
         path = os.path.join(jobs_dir, entry)
@@ -187,36 +459,99 @@ def batch_status(args):
             metadata_path = os.path.join(path, "metadata.yaml")
             if os.path.isfile(metadata_path):
                 metadata.append(read_job_metadata(Path(metadata_path)))
+    return metadata
+
+
+def batch_status(args):
+    """
+    Get job status in queue
+    """
+    cfg = config.get()
+    metadata = read_run_metadata(cfg.log_dir / "runs" / "latest")
+
+    interval = args.interval or cfg.batch_watch_interval
+    while True:
+        statuses = query_batch_status(metadata)
+        if args.watch:
+            ui.console().print(f"-- {datetime.now().strftime('%H:%M:%S')} --")
+        for batch_job_id, status, _ in statuses:
+            ui.console().print(f"[{batch_job_id}] {status}")
+        if not args.watch or not any(active for _, _, active in statuses):
+            break
+        time.sleep(interval)
 
+
+def batch_cancel(args):
+    """
+    Cancel jobs of the latest run that are still in the queue
+    """
+    cfg = config.get()
+    metadata = read_run_metadata(cfg.log_dir / "runs" / "latest")
+    job_ids = {}
     for m in metadata:
-        batch_job_id = str(m["job"]["id"])
-        backend = get_backend(m["job"]["backend"])
-        status = backend.status(batch_job_id)
-        ui.console().print(f"[{batch_job_id}] {status}")
+        job_ids.setdefault(m["job"]["backend"], []).append(str(m["job"]["id"]))
+
+    # one status query per backend, not one per job
+    for backend_name, ids in job_ids.items():
+        backend = get_backend(backend_name)
+        for batch_job_id, status in backend.status_many(ids).items():
+            if backend.is_active(status):
+                backend.cancel(batch_job_id)
+                ui.console().print(f"[{batch_job_id}] CANCELLED")
 
 
 def batch_run(args):
     """
     Run a workflow
     """
-    Job.ID = args.first_job_id
-
     cfg = config.get()
     out_dir = utils.create_run_output_dir(cfg.log_dir, args.run_id)
     utils.update_latest_symlink(cfg.log_dir, out_dir)
 
+    workdirs = None
+    task_cores = None
+    if args.task is not None:
+        task = read_task(out_dir, args.task)
+        first_job_id = task["first-job-num"]
+        workflow_files = task["workflow-files"]
+        workdirs = dict(zip(workflow_files, task["workdirs"]))
+        task_cores = task.get("num-cores")
+        os.chdir(task["workdirs"][0])
+    elif args.first_job_id is not None and args.workflow_file is not None:
+        first_job_id = args.first_job_id
+        workflow_files = [args.workflow_file]
+    else:
+        raise UserException("Either --task or <first_job_id> and <workflow_file> are required")
+    Job.ID = first_job_id
+    # tasks of a run may share a node, each exports its own metrics
+    cfg.metrics_instance = f"{cfg.metrics_instance or out_dir.name}-job-{first_job_id}"
+
     load_user_steps_from_kuristo_dir()
 
-    specs = parse_workflow_files([args.workflow_file])
-    rcs = Resources()
+    specs = parse_workflow_files(workflow_files)
+    # dependencies between workflows were already enforced by the batch system
+    for wf in specs:
+        wf.needs_ = None
+        if workdirs is not None:
+            anchor_working_directories(wf, workdirs[wf.file_name])
+    if args.multi_node or args.hostfile or cfg.batch_multi_node:
+        rcs = NodeResources(detect_nodes(args.hostfile))
+    else:
+        # use the cores that were requested for the task, not all cores of the node
+        rcs = Resources(task_cores)
     scheduler = Scheduler(specs, rcs, out_dir)
     scheduler.check()
     scheduler.run_all_jobs()
 
     results = cli_run.create_results(scheduler.jobs)
-    yaml_path = out_dir / "report.yaml"
-
-    update_report_atomic(yaml_path, results)
+    # first job number is unique among the tasks of a run
+    utils.write_result_fragment(
+        out_dir,
+        f"job-{first_job_id}",
+        results,
+        scheduler.total_runtime,
+        scheduler.metrics.to_dict(),
+    )
 
     return scheduler.exit_code()
 
@@ -226,5 +561,7 @@ def batch(args):
         batch_submit(args)
     elif args.batch_command == "status":
         batch_status(args)
+    elif args.batch_command == "cancel":
+        batch_cancel(args)
     elif args.batch_command == "run":
         batch_run(args)
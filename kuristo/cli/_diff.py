@@ -5,8 +5,10 @@ from rich.table import Table
 from rich.text import Text
 
 import kuristo.config as config
+import kuristo.history as history
 import kuristo.ui as ui
 import kuristo.utils as utils
+from kuristo.cli._perf import find_changes, print_changes, step_baseline
 from kuristo.exceptions import UserException
 
 STATUS_LABELS = {
@@ -20,12 +22,14 @@ STATUS_LABELS = {
 def _load_report(run_identifier: str, log_dir: Path) -> dict:
     run_id = utils.resolve_run_id(log_dir, run_identifier)
     run_dir = utils.get_run_output_dir(log_dir, run_id)
+    # runs submitted as batch jobs have only result fragments until they are merged
+    utils.merge_result_fragments(run_dir)
     report_path = run_dir / "report.yaml"
 
     if not report_path.exists():
         raise UserException(f"Report file not found for run '{run_identifier}' at {report_path}")
 
-    report_data = utils.read_report(report_path)
+    report_data = history.load_report(log_dir, run_dir)
 
     report_version = report_data.get("version")
     if report_version is None:
@@ -119,4 +123,21 @@ def diff(args):
     else:
         console.print(Text("No difference"))
 
+    if args.perf:
+        threshold = args.threshold if args.threshold is not None else cfg.perf_threshold
+        min_time = args.min_time if args.min_time is not None else cfg.perf_min_time
+        baseline = {
+            key: [float(job["duration"])]
+            for key, job in jobs1.items()
+            if job.get("status") == "success" and job.get("duration") is not None
+        }
+        baseline_steps = step_baseline(report1.get("results", []))
+        changes = find_changes(
+            report2.get("results", []), baseline, threshold, min_time, baseline_steps
+        )
+        console.print("")
+        print_changes(changes)
+        if args.fail_on_regression and any(c.is_regression for c in changes):
+            return 1
+
     return 0
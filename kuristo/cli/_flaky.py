@@ -0,0 +1,110 @@
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+
+from rich.table import Table
+from rich.text import Text
+
+import kuristo.config as config
+import kuristo.history as history
+import kuristo.ui as ui
+from kuristo.exceptions import UserException
+
+
+@dataclass
+class FlakyJob:
+    # Workflow file the job is defined in
+    workflow_file: str
+    # Job name
+    job_name: str
+    # Number of runs the job passed/failed in
+    n_runs: int
+    # Number of runs the job failed in
+    n_failed: int
+    # Number of outcome changes between consecutive runs with the same job definition
+    n_flips: int
+
+    @property
+    def score(self):
+        """
+        Flakiness score: 0 = stable, 1 = outcome changes with every run
+        """
+        if self.n_runs < 2:
+            return 0.0
+        return self.n_flips / (self.n_runs - 1)
+
+
+def find_flaky(outcomes: dict[tuple[str, str], list[tuple]], min_score: float) -> list[FlakyJob]:
+    """
+    Find jobs whose outcome flips between pass and fail although the job did not change
+
+    @param outcomes Mapping of (workflow file, job name) to (run ID, status, spec hash)
+    @param min_score Only report jobs with at least this flakiness score
+    @return Flaky jobs, the flakiest first
+    """
+    jobs = []
+    for (workflow_file, job_name), runs in outcomes.items():
+        n_flips = 0
+        for (_, status1, hash1), (_, status2, hash2) in zip(runs, runs[1:]):
+            # a changed definition explains a changed outcome
+            if status1 != status2 and hash1 == hash2:
+                n_flips += 1
+        if n_flips == 0:
+            continue
+        n_failed = sum(status == "failed" for _, status, _ in runs)
+        job = FlakyJob(workflow_file, job_name, len(runs), n_failed, n_flips)
+        if job.score >= min_score:
+            jobs.append(job)
+    jobs.sort(key=lambda j: (j.score, j.n_flips), reverse=True)
+    return jobs
+
+
+def flaky_job_keys(log_dir: Path, window: int, min_score: float) -> set[tuple[str, str]]:
+    """
+    Get (workflow file, job name) of known flaky jobs
+    """
+    history.index_runs(log_dir)
+    try:
+        outcomes = history.job_outcomes(log_dir, window)
+    except (sqlite3.Error, OSError):
+        # without a history no job is known to be flaky
+        return set()
+    return {(j.workflow_file, j.job_name) for j in find_flaky(outcomes, min_score)}
+
+
+def flaky(args):
+    """
+    Report jobs whose outcome flips between pass and fail
+    """
+    cfg = config.get()
+    console = ui.console()
+
+    window = args.window or cfg.flaky_window
+    min_score = args.min_score if args.min_score is not None else cfg.flaky_min_score
+    history.index_runs(cfg.log_dir)
+    try:
+        outcomes = history.job_outcomes(cfg.log_dir, window)
+    except (sqlite3.Error, OSError) as e:
+        raise UserException(f"Run history is not available: {e}")
+    jobs = find_flaky(outcomes, min_score)
+    if not jobs:
+        console.print(Text("No flaky jobs"))
+        return
+
+    table = Table(show_lines=False, box=None)
+    table.add_column("Job name")
+    table.add_column("Workflow file")
+    table.add_column("Runs", justify="right")
+    table.add_column("Failed", justify="right")
+    table.add_column("Flips", justify="right")
+    table.add_column("Score", justify="right")
+    for j in jobs:
+        table.add_row(
+            Text(j.job_name, style="bold cyan"),
+            Text(str(j.workflow_file)),
+            str(j.n_runs),
+            Text(str(j.n_failed), style="red"),
+            str(j.n_flips),
+            Text(f"{j.score:.2f}", style="yellow"),
+        )
+    console.print(table)
@@ -1,6 +1,7 @@
 from rich.table import Table
 
 import kuristo.config as config
+import kuristo.history as history
 import kuristo.ui as ui
 import kuristo.utils as utils
 from kuristo.exceptions import UserException
@@ -33,17 +34,14 @@ def log(args):
     table.add_column("Tag", style="green")
 
     for run_dir in run_dirs:
-        report_file = run_dir / "report.yaml"
-        if report_file.exists():
-            try:
-                report = utils.read_report(report_file)
-                results = report.get("results", [])
-                duration = report.get("total-runtime", 0)
-                duration_str = f"{duration:.3f}s"
-                job_count = str(len(results))
-            except Exception:
-                duration_str = "error"
-                job_count = "?"
+        try:
+            # summaries come from the history index, only new runs are parsed
+            summary = history.load_run(cfg.log_dir, run_dir)
+        except Exception:
+            summary = None
+        if summary is not None:
+            duration_str = f"{summary['total_runtime'] or 0:.3f}s"
+            job_count = str(summary["n_jobs"])
         else:
             duration_str = "error"
             job_count = "?"
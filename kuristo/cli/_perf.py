@@ -0,0 +1,222 @@
+import sqlite3
+import statistics
+from dataclasses import dataclass
+
+from rich.table import Table
+from rich.text import Text
+
+import kuristo.config as config
+import kuristo.history as history
+import kuristo.ui as ui
+import kuristo.utils as utils
+from kuristo.exceptions import UserException
+
+# How many (robust) standard deviations a change must exceed to be reported
+NOISE_SIGMAS = 3.0
+
+
+@dataclass
+class DurationChange:
+    # Workflow file the job is defined in
+    workflow_file: str
+    # Job name
+    job_name: str
+    # Baseline duration (median of the baseline samples) [s]
+    baseline: float
+    # Current duration [s]
+    current: float
+    # Number of baseline samples
+    n_samples: int
+    # Step whose duration changed the most in the direction of the change
+    step: str | None = None
+    # Change of the step duration [s]
+    step_delta: float = 0.0
+
+    @property
+    def ratio(self):
+        return self.current / self.baseline if self.baseline > 0 else float("inf")
+
+    @property
+    def is_regression(self):
+        return self.current > self.baseline
+
+
+def step_baseline(results: list[dict]) -> dict[tuple[str, str], dict[str, list[float]]]:
+    """
+    Get step durations of successful jobs to be used as a baseline
+
+    @param results Results of the baseline run
+    @return Mapping of (workflow file, job name) to step name and its durations
+    """
+    return {
+        (r.get("workflow-file"), r.get("job-name")): {
+            name: [duration] for name, duration in utils.step_durations(r["steps"]).items()
+        }
+        for r in results
+        if r.get("status") == "success" and r.get("steps")
+    }
+
+
+def find_step(
+    result: dict, baseline: dict[str, list[float]], regression: bool
+) -> tuple[str | None, float]:
+    """
+    Find the step that contributed most to a change of job duration
+
+    @param result Result of the job in the current run
+    @param baseline Mapping of step name to baseline durations [s]
+    @param regression Look for the step that slowed down (`True`) or sped up (`False`) the most
+    @return Step name (`None` if no step changed in that direction) and its change [s]
+    """
+    step, step_delta = None, 0.0
+    for name, current in utils.step_durations(result.get("steps", [])).items():
+        samples = baseline.get(name)
+        if not samples:
+            continue
+        delta = current - statistics.median(samples)
+        if (delta > step_delta) if regression else (delta < step_delta):
+            step, step_delta = name, delta
+    return step, step_delta
+
+
+def find_changes(
+    results: list[dict],
+    baseline: dict[tuple[str, str], list[float]],
+    threshold: float,
+    min_time: float,
+    baseline_steps: dict[tuple[str, str], dict[str, list[float]]] | None = None,
+) -> list[DurationChange]:
+    """
+    Compare durations of jobs against a baseline
+
+    A change is reported when the duration changed by more than `threshold` (relative)
+    and by more than `min_time` and the noise of the baseline (absolute).
+
+    @param results Results of the current run
+    @param baseline Mapping of (workflow file, job name) to baseline durations [s]
+    @param threshold Relative change that is considered significant (i.e. 0.2 = 20%)
+    @param min_time Changes smaller than this are ignored [s]
+    @param baseline_steps Mapping of (workflow file, job name) to step name and its baseline
+           durations [s], used to find the step responsible for a change
+    @return Significant changes, biggest relative change first
+    """
+    changes = []
+    for r in results:
+        if r.get("status") != "success" or r.get("duration") is None:
+            continue
+        key = (r.get("workflow-file"), r.get("job-name"))
+        samples = baseline.get(key)
+        if not samples:
+            continue
+
+        median = statistics.median(samples)
+        noise = 0.0
+        if len(samples) >= 3:
+            # median absolute deviation scaled to be comparable with a standard deviation
+            mad = statistics.median(abs(x - median) for x in samples)
+            noise = NOISE_SIGMAS * 1.4826 * mad
+
+        current = float(r["duration"])
+        delta = current - median
+        if abs(delta) <= max(min_time, noise):
+            continue
+        if delta > 0 and current < median * (1.0 + threshold):
+            continue
+        if delta < 0 and current > median / (1.0 + threshold):
+            continue
+        change = DurationChange(r["workflow-file"], r["job-name"], median, current, len(samples))
+        if baseline_steps and key in baseline_steps:
+            change.step, change.step_delta = find_step(r, baseline_steps[key], delta > 0)
+        changes.append(change)
+
+    changes.sort(key=lambda c: abs(c.ratio - 1.0), reverse=True)
+    return changes
+
+
+def print_changes(changes: list[DurationChange]):
+    """
+    Print table of regressions and improvements
+    """
+    console = ui.console()
+    if not changes:
+        console.print(Text("No performance changes"))
+        return
+
+    table = Table(show_lines=False, box=None)
+    table.add_column("Job name")
+    table.add_column("Baseline", justify="right")
+    table.add_column("Current", justify="right")
+    table.add_column("Change", justify="right")
+    show_steps = any(c.step is not None for c in changes)
+    if show_steps:
+        table.add_column("Step")
+    for c in changes:
+        style = "red" if c.is_regression else "green"
+        row = [
+            Text(c.job_name, style="bold cyan"),
+            Text(utils.human_time(c.baseline)),
+            Text(utils.human_time(c.current), style=style),
+            Text(f"{c.ratio:.2f}x", style=style),
+        ]
+        if show_steps:
+            row.append(Text(_step_change(c)))
+        table.add_row(*row)
+    console.print(table)
+
+    n_regressions = sum(c.is_regression for c in changes)
+    console.print(
+        Text.from_markup(
+            f"[grey46]Regressions:[/] [red]{n_regressions}[/]     "
+            f"[grey46]Improvements:[/] [green]{len(changes) - n_regressions}[/]"
+        )
+    )
+
+
+def _step_change(change: DurationChange) -> str:
+    if change.step is None:
+        return ""
+    sign = "+" if change.step_delta > 0 else "-"
+    return f"{change.step} ({sign}{utils.human_time(abs(change.step_delta))})"
+
+
+def perf(args):
+    """
+    Compare job durations of a run against a baseline tag or the preceding runs
+    """
+    cfg = config.get()
+    run_id = utils.resolve_run_id(cfg.log_dir, args.run_id or "latest")
+    run_dir = utils.get_run_output_dir(cfg.log_dir, run_id)
+    report = history.load_report(cfg.log_dir, run_dir)
+    if report is None:
+        raise UserException(f"No report found for run '{run_id}'.")
+
+    threshold = args.threshold if args.threshold is not None else cfg.perf_threshold
+    min_time = args.min_time if args.min_time is not None else cfg.perf_min_time
+
+    if args.baseline:
+        baseline_id = utils.resolve_run_id(cfg.log_dir, args.baseline)
+        baseline_dir = utils.get_run_output_dir(cfg.log_dir, baseline_id)
+        baseline_report = history.load_report(cfg.log_dir, baseline_dir)
+        if baseline_report is None:
+            raise UserException(f"No report found for baseline '{args.baseline}'.")
+        baseline = {
+            (r.get("workflow-file"), r.get("job-name")): [float(r["duration"])]
+            for r in baseline_report.get("results", [])
+            if r.get("status") == "success" and r.get("duration") is not None
+        }
+        baseline_steps = step_baseline(baseline_report.get("results", []))
+    else:
+        history.index_runs(cfg.log_dir)
+        window = args.window or cfg.perf_window
+        try:
+            baseline = history.recent_durations(cfg.log_dir, run_id, window)
+            baseline_steps = history.recent_step_durations(cfg.log_dir, run_id, window)
+        except (sqlite3.Error, OSError) as e:
+            raise UserException(f"Run history is not available: {e}")
+
+    changes = find_changes(report.get("results", []), baseline, threshold, min_time, baseline_steps)
+    print_changes(changes)
+
+    if args.fail_on_regression and any(c.is_regression for c in changes):
+        return 1
+    return 0
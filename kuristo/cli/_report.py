@@ -40,11 +40,22 @@ def generate_junit(results, xml_filename: Path, stat):
             time=f"{float(r.get('duration', 0)):.3f}",
         )
 
+        steps = r.get("steps", [])
+        if steps:
+            properties = ET.SubElement(testcase, "properties")
+            for st in steps:
+                ET.SubElement(
+                    properties,
+                    "property",
+                    name=f"step:{st.get('name')}",
+                    value=f"{float(st.get('duration', 0)):.3f}",
+                )
+
         if r.get("status") == "failed":
             ET.SubElement(
                 testcase,
                 "failure",
-                message=f"Process completed with exit code {r.get('return-code')}",
+                message=_failure_message(r),
             ).text = "Failed"
         elif r.get("status") == "skipped":
             ET.SubElement(testcase, "skipped", message=f"{r.get('reason')}")
@@ -53,12 +64,21 @@ def generate_junit(results, xml_filename: Path, stat):
     tree.write(xml_filename, encoding="utf-8", xml_declaration=True)
 
 
+def _failure_message(result):
+    failed = [st for st in result.get("steps", []) if st.get("return-code") != 0]
+    if failed:
+        step = failed[-1]
+        return f"Step '{step.get('name')}' completed with exit code {step.get('return-code')}"
+    return f"Process completed with exit code {result.get('return-code')}"
+
+
 def report(args):
     cfg = config.get()
 
     run_name = args.run_id or "latest"
     run_name = utils.resolve_run_id(cfg.log_dir, run_name)
     runs_dir = cfg.log_dir / "runs" / run_name
+    utils.merge_result_fragments(runs_dir)
     report_path = Path(runs_dir / "report.yaml")
     if not report_path.exists():
         raise UserException("No report found. Did you run any jobs yet?")
@@ -86,7 +106,7 @@ def report(args):
     else:
         # write to terminal
         for entry in filtered:
-            log_path = Path(runs_dir / f"job-{entry['id']}.log")
+            log_path = utils.job_log_path(runs_dir, entry["id"])
             if len(filters) == 0:
                 ui.job_header_line(entry["id"], cfg.console_width)
                 show.display_job_log(log_path)
@@ -1,9 +1,12 @@
+import os
+import time
 from pathlib import Path
 
-import yaml
-
 import kuristo.config as config
+import kuristo.history as history
 import kuristo.utils as utils
+from kuristo.cli._flaky import flaky_job_keys
+from kuristo.cli._trace import write_trace
 from kuristo.exceptions import UserException
 from kuristo.job import Job
 from kuristo.plugin_loader import load_user_steps_from_kuristo_dir
@@ -13,20 +16,72 @@ from kuristo.scheduler import Scheduler
 from kuristo.workflow import parse_workflow_files
 
 
-def _get_failed_job_nums(log_dir):
+def _get_failed_job_nums(log_dir, flaky="include"):
     """
     Read the latest run's report and return a set of failed job numbers (job.num).
     Raises UserException if no previous run exists or no jobs failed.
     Uses the 'id' field (job.num) which is stable when the same workflows are scanned in the same order.
+
+    @param flaky How to treat known flaky jobs: `include`, `exclude` or `last`
+    @return Failed job numbers and the subset of them that are known to be flaky
     """
     report_path = log_dir / "runs" / "latest" / "report.yaml"
     if not report_path.exists():
         raise UserException("No previous run found. Cannot use --rerun-failed.")
     report = utils.read_report(report_path)
-    failed = {r["id"] for r in report.get("results", []) if r.get("status") == "failed"}
+    failed = {
+        r["id"]: (r.get("workflow-file"), r.get("job-name"))
+        for r in report.get("results", [])
+        if r.get("status") == "failed"
+    }
     if not failed:
         raise UserException("No failed jobs found in the last run.")
-    return failed
+
+    flaky_nums = set()
+    if flaky != "include":
+        cfg = config.get()
+        keys = flaky_job_keys(log_dir, cfg.flaky_window, cfg.flaky_min_score)
+        flaky_nums = {num for num, key in failed.items() if key in keys}
+    if flaky == "exclude":
+        if not failed.keys() - flaky_nums:
+            raise UserException("All failed jobs in the last run are known to be flaky.")
+        return failed.keys() - flaky_nums, set()
+    return set(failed), flaky_nums
+
+
+def create_result(job: Job) -> dict:
+    """
+    Build result of a single job. Job must be finished.
+
+    @param job Job to produce the result from
+    @return Job result
+    """
+    if job.is_skipped:
+        return {
+            "id": job.num,
+            "job-name": job.name,
+            "workflow-file": str(job.spec.file_name),
+            "status": "skipped",
+            "reason": job.skip_reason,
+            "spec-hash": job.spec_hash,
+        }
+    else:
+        result = {
+            "id": job.num,
+            "job-name": job.name,
+            "workflow-file": str(job.spec.file_name),
+            "return-code": job.return_code,
+            "status": "success" if job.return_code == 0 else "failed",
+            "duration": round(job.elapsed_time, 3),
+            "spec-hash": job.spec_hash,
+        }
+        if job.output_dropped:
+            result["output-dropped"] = job.output_dropped
+        if job.resource_usage is not None:
+            result["resources"] = job.resource_usage.to_dict()
+        if job.step_results:
+            result["steps"] = job.step_results
+        return result
 
 
 def create_results(jobs):
@@ -36,56 +91,83 @@ def create_results(jobs):
     @param jobs Jobs to produce results from. Pulled from `Scheduler`
     @return List of job results
     """
-    results = []
-    for job in jobs:
-        if isinstance(job, Job):
-            if job.is_skipped:
-                results.append(
-                    {
-                        "id": job.num,
-                        "job-name": job.name,
-                        "workflow-file": str(job.spec.file_name),
-                        "status": "skipped",
-                        "reason": job.skip_reason,
-                    }
-                )
-            else:
-                results.append(
-                    {
-                        "id": job.num,
-                        "job-name": job.name,
-                        "workflow-file": str(job.spec.file_name),
-                        "return-code": job.return_code,
-                        "status": "success" if job.return_code == 0 else "failed",
-                        "duration": round(job.elapsed_time, 3),
-                    }
-                )
-    return results
-
-
-def write_report_yaml(yaml_path: Path, results, total_runtime):
-    from kuristo import __version__
-
-    with open(yaml_path, "w") as f:
-        yaml.safe_dump(
-            {"version": __version__, "results": results, "total-runtime": total_runtime},
-            f,
-            sort_keys=False,
-        )
+    return [create_result(job) for job in jobs if isinstance(job, Job)]
+
+
+def _read_run_info(run_id: str, log_dir: Path):
+    """
+    Find a run that can be resumed
+
+    @return Run directory and the information the run was started with
+    """
+    out_dir = log_dir / "runs" / run_id
+    if not out_dir.is_dir():
+        raise UserException(f"Run '{run_id}' does not exist.")
+    if (out_dir / "report.yaml").exists():
+        raise UserException(f"Run '{run_id}' already finished, nothing to resume.")
+    info = utils.read_run_info(out_dir)
+    if info is None:
+        raise UserException(f"Run '{run_id}' can not be resumed.")
+    return out_dir.resolve(), info
+
+
+def _interrupted_runtime(out_dir: Path, info: dict) -> float:
+    """
+    Find how long an interrupted run ran, up to when its last job finished
+
+    @param out_dir Run directory
+    @param info Information the run was started with
+    @return Run time [s]
+    """
+    runtime = info.get("runtime", 0.0)
+    started = info.get("started")
+    try:
+        last_finished = (out_dir / "journal.jsonl").stat().st_mtime
+    except FileNotFoundError:
+        return runtime
+    if started is not None:
+        runtime += max(0.0, last_finished - started)
+    return runtime
 
 
 def run_jobs(args):
     locations = args.locations or ["."]
+    labels = args.labels
 
     cfg = config.get()
-    out_dir = utils.create_run_output_dir(cfg.log_dir)
+    if args.trace:
+        cfg.trace_enabled = True
+    resume = args.resume
+    if resume:
+        if args.rerun_failed or args.failed_first:
+            raise UserException(
+                "--resume can not be combined with --rerun-failed or --failed-first"
+            )
+        out_dir, info = _read_run_info(resume, cfg.log_dir)
+        # locations are relative to where the run was started, keep the workflow file
+        # names (and so the job keys in the report) the same as in the interrupted run
+        if info.get("cwd"):
+            os.chdir(info["cwd"])
+        locations = info["locations"]
+        labels = info["labels"]
+        # before the journal is touched, its modification time tells when the run stopped
+        previous_runtime = _interrupted_runtime(out_dir, info)
+        utils.truncate_journal(out_dir)
+    else:
+        out_dir = utils.create_run_output_dir(cfg.log_dir)
+        previous_runtime = 0.0
 
     # Get failed job numbers before updating the "latest" symlink
     failed_job_nums = None
+    flaky_job_nums = set()
+    priority_job_nums = None
     if args.rerun_failed or args.failed_first:
-        failed_job_nums = _get_failed_job_nums(cfg.log_dir)
+        failed_job_nums, flaky_job_nums = _get_failed_job_nums(cfg.log_dir, args.flaky)
+        # known flaky jobs are run after the jobs that are more likely to really fail
+        priority_job_nums = failed_job_nums - flaky_job_nums
 
-    utils.prune_old_runs(cfg.log_dir, cfg.log_history)
+    if not resume:
+        utils.prune_old_runs(cfg.log_dir, cfg.log_history)
 
     # Only update latest symlink and write report for full runs (not --rerun-failed)
     if not args.rerun_failed:
@@ -96,22 +178,55 @@ def run_jobs(args):
     workflow_files = scan_locations(locations)
     workflows = parse_workflow_files(workflow_files)
 
+    # results of jobs that finished before the run was interrupted
+    previous_results = utils.read_journal(out_dir) if resume else []
+
     rcs = Resources()
     scheduler = Scheduler(
         workflows,
         rcs,
         out_dir,
-        labels=args.labels,
+        labels=labels,
         job_nums=failed_job_nums if args.rerun_failed else None,
-        priority_job_nums=failed_job_nums if args.failed_first else None,
+        priority_job_nums=priority_job_nums if args.failed_first or flaky_job_nums else None,
+        finished_results=previous_results,
+        previous_runtime=previous_runtime,
+        on_job_done=None if args.rerun_failed else lambda job: _journal(out_dir, job),
     )
     scheduler.check()
+
+    if not args.rerun_failed:
+        # remember what the run was started with, so it can be resumed and its progress shown
+        n_jobs = len(previous_results) + sum(isinstance(j, Job) for j in scheduler.jobs)
+        info = {
+            "cwd": str(Path.cwd()),
+            "locations": [str(loc) for loc in locations],
+            "labels": labels,
+            "num-jobs": n_jobs,
+            # time the run ran before it was resumed and when this part of it started
+            "runtime": previous_runtime,
+            "started": time.time(),
+        }
+        utils.write_run_info(out_dir, info)
+
     scheduler.run_all_jobs()
 
     # Only write report for full runs (not --rerun-failed)
     if not args.rerun_failed:
-        results = create_results(scheduler.jobs)
+        # report is derived from the journal the results were streamed into
+        results = utils.read_journal(out_dir)
         yaml_path = out_dir / "report.yaml"
-        write_report_yaml(yaml_path, results, scheduler.total_runtime)
+        utils.write_report_yaml(
+            yaml_path, results, scheduler.total_runtime, scheduler.metrics.to_dict()
+        )
+        history.index_run(cfg.log_dir, out_dir)
+
+    if args.trace:
+        write_trace(out_dir, Path(args.trace))
 
     return scheduler.exit_code()
+
+
+def _journal(out_dir: Path, job):
+    if isinstance(job, Job):
+        utils.append_journal(out_dir, create_result(job))
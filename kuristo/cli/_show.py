@@ -1,35 +1,118 @@
+import json
+import time
 from datetime import datetime
 from pathlib import Path
 
+import yaml
 from rich.text import Text
 
+import kuristo.compression as compression
 import kuristo.config as config
 import kuristo.ui as ui
 import kuristo.utils as utils
 from kuristo.exceptions import UserException
 
 
+def parse_timestamp(timestamp_str):
+    """
+    Decode a timestamp written by the job logger (`YYYY-mm-dd HH:MM:SS,fff`)
+
+    Equivalent to `datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S,%f")` for this
+    fixed format, but a lot cheaper.
+
+    @return The timestamp or `None` if the string is not a valid timestamp
+    """
+    s = timestamp_str
+    if (
+        len(s) != 23
+        or s[4] != "-"
+        or s[7] != "-"
+        or s[10] != " "
+        or s[13] != ":"
+        or s[16] != ":"
+        or s[19] != ","
+    ):
+        return None
+    try:
+        return datetime(
+            int(s[0:4]),
+            int(s[5:7]),
+            int(s[8:10]),
+            int(s[11:13]),
+            int(s[14:16]),
+            int(s[17:19]),
+            int(s[20:23]) * 1000,
+        )
+    except ValueError:
+        return None
+
+
 def parse_log_line(line):
     parts = line.strip().split(" - ", 2)
     if len(parts) != 3:
         return None
     timestamp_str, tag, msg = parts
-    try:
-        timestamp = datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S,%f")
-    except ValueError:
+    timestamp = parse_timestamp(timestamp_str)
+    if timestamp is None:
         return None
     return timestamp, tag.strip(), msg
 
 
-def parse_sections(lines):
+def parse_json_line(line):
+    """
+    Parse a record of a structured (JSON Lines) job log
+    """
+    try:
+        rec = json.loads(line)
+        timestamp = parse_timestamp(rec["time"])
+        tag, msg = rec["tag"], rec["msg"]
+    except (json.JSONDecodeError, KeyError, TypeError):
+        return None
+    if timestamp is None:
+        return None
+    return timestamp, tag, msg
+
+
+def line_parser(log_path: Path):
+    """
+    Get function for parsing lines of a job log, based on the log format
+    """
+    if compression.strip_suffix(log_path).suffix == ".jsonl":
+        return parse_json_line
+    return parse_log_line
+
+
+def parse_log_lines(f, parse=parse_log_line):
+    """
+    Parse lines of a job log, skipping lines that are not log records
+
+    @param f Iterable with lines (i.e. an open file)
+    @param parse Function parsing a single line
+    """
+    for line in f:
+        parsed = parse(line)
+        if parsed is not None:
+            yield parsed
+
+
+def iter_sections(lines, job_end_time=None):
+    """
+    Group parsed log lines into sections, yielding each section as soon as it is complete
+
+    @param lines Iterable of parsed log lines (timestamp, tag, message)
+    @param job_end_time End time of the job, if known up front. The title section is yielded
+           when the job starts, so this is the only way to give it an end time before it is
+           rendered.
+    """
     title = None
-    sections = []
     current = None
+    n_steps = 0
 
     for timestamp, tag, msg in lines:
         if tag == "TASK_START":
             if current:
-                sections.append(current)
+                yield current
+            n_steps += 1
             current = {
                 "type": "section",
                 "title": msg[2:].strip(),
@@ -37,6 +120,7 @@ def parse_sections(lines):
                 "return_code": None,
                 "start_time": timestamp,
                 "end_time": None,
+                "step": n_steps,
             }
         elif tag == "TASK_END":
             s = msg.split("exit code")
@@ -55,7 +139,7 @@ def parse_sections(lines):
 
         elif tag == "ENV":
             if current:
-                sections.append(current)
+                yield current
             current = {
                 "type": "section",
                 "title": msg.strip(),
@@ -72,9 +156,9 @@ def parse_sections(lines):
                 "type": "title",
                 "title": msg,
                 "start_time": timestamp,
-                "end_time": None,
+                "end_time": job_end_time,
             }
-            sections.append(title)
+            yield title
         elif tag == "JOB_END":
             if title:
                 title["end_time"] = timestamp
@@ -83,9 +167,43 @@ def parse_sections(lines):
                 current["lines"].append((tag, msg))
 
     if current:
-        sections.append(current)
+        yield current
+
 
-    return sections
+def parse_sections(lines):
+    return list(iter_sections(lines))
+
+
+def read_tail(f, block_size, compressed=False):
+    """
+    Read the last `block_size` bytes of a file opened in binary mode
+    """
+    if not compressed:
+        size = f.seek(0, 2)
+        f.seek(max(0, size - block_size))
+        return f.read()
+    # compressed stream: seeking to the end would decompress it anyway
+    tail = b""
+    while chunk := f.read(1024 * 1024):
+        tail = (tail + chunk)[-block_size:]
+    return tail
+
+
+def find_job_end_time(log_path: Path, block_size=4096):
+    """
+    Find when the job ended by looking at the end of its log only
+
+    @return Time stamp of the `JOB_END` record or `None` if there is none
+    """
+    with compression.open_binary(log_path) as f:
+        tail = read_tail(f, block_size, compression.is_compressed(log_path))
+    tail = tail.decode(errors="replace")
+    parse = line_parser(log_path)
+    for line in reversed(tail.splitlines()):
+        parsed = parse(line)
+        if parsed is not None and parsed[1] == "JOB_END":
+            return parsed[0]
+    return None
 
 
 def render_title(sec, max_label_len):
@@ -175,11 +293,231 @@ def display_job_log(log_path: Path, filters=None):
     if not log_path.exists():
         raise UserException(f"Log file not found: {log_path}")
 
-    with open(log_path) as f:
-        lines = [parse_log_line(line) for line in f if parse_log_line(line)]
-    sections = parse_sections(lines)
+    job_end_time = find_job_end_time(log_path)
+    with compression.open_text(log_path) as f:
+        lines = parse_log_lines(f, line_parser(log_path))
+        render_sections(iter_sections(lines, job_end_time), filters)
+
+
+def read_step_section(log_path: Path, step: int):
+    """
+    Read the log section of a single step
+
+    Structured logs come with an index of step offsets, so only the step's part of the log
+    is read. Other logs are parsed until the step is found.
+
+    @param log_path Job log
+    @param step Step number (starting from 1)
+    @return The section or `None` if the job has no such step
+    """
+    index_path = utils.job_log_index_path(log_path)
+    if line_parser(log_path) is parse_json_line and index_path.exists():
+        with open(index_path) as f:
+            steps = json.load(f)["steps"]
+        if not 1 <= step <= len(steps):
+            return None
+        entry = steps[step - 1]
+        with compression.open_binary(log_path) as f:
+            # compressed streams can seek forward, they just decompress what they skip
+            f.seek(entry["start"])
+            data = f.read(entry["end"] - entry["start"]).decode(errors="replace")
+        lines = parse_log_lines(data.splitlines(), parse_json_line)
+        return next(iter_sections(lines), None)
+
+    with compression.open_text(log_path) as f:
+        for sec in iter_sections(parse_log_lines(f, line_parser(log_path))):
+            if sec.get("step") == step:
+                return sec
+    return None
+
+
+def display_job_step(log_path: Path, step: int):
+    if not log_path.exists():
+        raise UserException(f"Log file not found: {log_path}")
+
+    sec = read_step_section(log_path, step)
+    if sec is None:
+        raise UserException(f"Step {step} not found in {log_path}")
+    render_section(sec, config.get().console_width)
 
-    render_sections(sections, filters)
+
+def render_record(tag, msg):
+    """
+    Print a single log record the way it is shown in sections
+    """
+    console = ui.console()
+    if tag == "JOB_START":
+        console.print(Text.from_markup(f"Name: [white]{msg}[/]"))
+        console.print()
+    elif tag == "TASK_START":
+        console.print(Text.from_markup(f"[white]*[/] {msg[2:].strip()}"))
+    elif tag == "TASK_END":
+        s = msg.split("exit code")
+        if len(s) > 1:
+            rc = int(s[1].strip())
+            style = "green" if rc == 0 else "red"
+            console.print(Text.from_markup(f"  Finished with return code [{style}]{rc}[/]"))
+        else:
+            console.print(Text(f"  {msg.strip()}"))
+        console.print()
+    elif tag == "SCRIPT":
+        console.print(Text(f"  {msg}", style="grey46"))
+    elif tag == "ENV":
+        console.print(Text.from_markup("[white]*[/] Environment variables:"))
+    elif tag == "INFO" and msg.startswith("|"):
+        console.print(Text(f"  {msg[2:].strip()}", style="grey63"))
+    else:
+        console.print(Text(f"  {msg}"))
+
+
+class _JobWatch:
+    """
+    Tell whether a followed job can not write into its log anymore, because it or the whole
+    run ended. Only what was added to the run since the last check is read.
+
+    A run that was killed may not leave any trace of it, so a run where nothing happens
+    (no new log output, journal records or result fragments) for `idle_timeout` seconds is
+    taken as over, too.
+    """
+
+    def __init__(self, run_dir: Path, num: int, idle_timeout: float):
+        self._run_dir = run_dir
+        self._num = num
+        self._idle_timeout = idle_timeout
+        self._journal_offset = 0
+        self._journal_partial = b""
+        self._fragments = set()
+        self._last_activity = time.monotonic()
+
+    def activity(self):
+        """
+        Record that the run is alive (i.e. the job's log grew)
+        """
+        self._last_activity = time.monotonic()
+
+    def over(self) -> bool:
+        if (self._run_dir / "report.yaml").exists():
+            return True
+        if self._journal_has_job() or self._fragments_have_job():
+            return True
+        if time.monotonic() - self._last_activity > self._idle_timeout:
+            ui.console().print(
+                Text(
+                    f"Nothing happened in the run for {utils.human_time(self._idle_timeout)}, "
+                    "it does not seem to be running anymore",
+                    style="grey46",
+                )
+            )
+            return True
+        return False
+
+    def _journal_has_job(self) -> bool:
+        try:
+            with open(self._run_dir / "journal.jsonl", "rb") as f:
+                if f.seek(0, 2) < self._journal_offset:
+                    # the journal was repaired (i.e. the run was resumed), start over
+                    self._journal_offset = 0
+                    self._journal_partial = b""
+                f.seek(self._journal_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return False
+        if not data:
+            return False
+        self._journal_offset += len(data)
+        self.activity()
+        lines = (self._journal_partial + data).split(b"\n")
+        # the last record may still be being written
+        self._journal_partial = lines.pop()
+        for line in lines:
+            try:
+                r = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if r.get("id") == self._num:
+                return True
+        return False
+
+    def _fragments_have_job(self) -> bool:
+        fragments_dir = self._run_dir / "results"
+        if not fragments_dir.is_dir():
+            return False
+        new = set(fragments_dir.glob("*.yaml")) - self._fragments
+        if not new:
+            return False
+        self._fragments |= new
+        self.activity()
+        for path in new:
+            try:
+                report = utils.read_report(path) or {}
+            except yaml.YAMLError:
+                continue
+            if any(r.get("id") == self._num for r in report.get("results", [])):
+                return True
+        return False
+
+
+def _find_job_log(run_dir: Path, num: int) -> Path | None:
+    log_path = utils.job_log_path(run_dir, num)
+    return log_path if log_path.exists() else None
+
+
+def follow_job_log(run_dir: Path, num: int, poll_interval=0.25, idle_timeout=600.0):
+    """
+    Print a job log as it is being written, until the job ends
+
+    The log is polled for new data; only what was appended since the last poll is read.
+    Following stops when the job ends, or when the job or the run is over without the log
+    saying so (i.e. the run was killed).
+
+    @param run_dir Run output directory
+    @param num Job number
+    @param poll_interval How often to look for new output [s]
+    @param idle_timeout How long nothing may happen in the run before it is taken as over [s]
+    """
+    watch = _JobWatch(run_dir, num, idle_timeout)
+    log_path = _find_job_log(run_dir, num)
+    if log_path is None:
+        if not run_dir.exists() or watch.over():
+            raise UserException(f"Log file not found: {utils.job_log_path(run_dir, num)}")
+        # the run is in progress and the log is created when the job starts; its format
+        # is not known until then
+        ui.console().print(Text("Waiting for the job to start...", style="grey46"))
+        while (log_path := _find_job_log(run_dir, num)) is None:
+            if watch.over():
+                raise UserException(f"Job {num} ended without writing a log")
+            time.sleep(poll_interval)
+    if compression.is_compressed(log_path):
+        # only logs of finished jobs are compressed
+        display_job_log(log_path)
+        return
+
+    parse = line_parser(log_path)
+    partial = ""
+    ended = False
+    with open(log_path, encoding="utf-8", errors="replace") as f:
+        while not ended:
+            data = f.read()
+            if data:
+                watch.activity()
+            else:
+                if not watch.over():
+                    time.sleep(poll_interval)
+                    continue
+                # the job is over without the log saying so, print what is left and stop
+                data = f.read() + "\n"
+                ended = True
+            lines = (partial + data).split("\n")
+            # the last line may still be being written
+            partial = lines.pop()
+            for line in lines:
+                parsed = parse(line)
+                if parsed is None:
+                    continue
+                _, tag, msg = parsed
+                if tag == "JOB_END":
+                    return
+                render_record(tag, msg)
 
 
 def show(args):
@@ -188,5 +526,15 @@ def show(args):
     run_name = utils.resolve_run_id(cfg.log_dir, run_name)
     runs_dir = cfg.log_dir / "runs" / run_name
 
-    log_path = Path(runs_dir / f"job-{args.job}.log")
-    display_job_log(log_path)
+    log_path = utils.job_log_path(runs_dir, args.job)
+    if args.follow:
+        if args.step is not None:
+            raise UserException("--follow can not be combined with --step")
+        try:
+            follow_job_log(runs_dir, args.job)
+        except KeyboardInterrupt:
+            pass
+    elif args.step is not None:
+        display_job_step(log_path, args.step)
+    else:
+        display_job_log(log_path)
@@ -1,7 +1,11 @@
+import time
+
 import kuristo.config as config
+import kuristo.history as history
 import kuristo.ui as ui
 import kuristo.utils as utils
 from kuristo.exceptions import UserException
+from kuristo.metrics import RunMetrics
 
 STATUS_LABELS = {
     "success": "PASS",
@@ -57,6 +61,8 @@ def print_report(report, filters: list):
     ui.line(cfg.console_width)
     ui.stats(stats)
     ui.time(report.get("total-runtime", 0.0))
+    if "metrics" in report:
+        ui.metrics(RunMetrics.from_dict(report["metrics"], report.get("total-runtime", 0.0)))
 
 
 def status(args):
@@ -64,10 +70,26 @@ def status(args):
     run_name = args.run_id or "latest"
     run_name = utils.resolve_run_id(cfg.log_dir, run_name)
     runs_dir = cfg.log_dir / "runs" / run_name
-    report_path = runs_dir / "report.yaml"
-    if not report_path.exists():
-        raise UserException("No report found. Did you run any jobs yet?")
-
-    report = utils.read_report(report_path)
     filters = build_filters(args)
-    print_report(report, filters)
+    report = history.load_report(cfg.log_dir, runs_dir)
+    if report is not None:
+        print_report(report, filters)
+        return
+
+    info = utils.read_run_info(runs_dir)
+    if info is None:
+        raise UserException("No report found. Did you run any jobs yet?")
+    print_progress(runs_dir, info, filters)
+
+
+def print_progress(run_dir, info: dict, filters: list):
+    """
+    Print results of a run that did not finish (yet) from its journal
+    """
+    results = utils.read_journal(run_dir)
+    elapsed = time.time() - (run_dir / "run.yaml").stat().st_mtime
+    print_report({"results": results, "total-runtime": elapsed}, filters)
+    ui.console().print(
+        f"Run in progress or interrupted: {len(results)} of {info.get('num-jobs', '?')} jobs "
+        f"finished (resume with 'kuristo run --resume {run_dir.name}')"
+    )
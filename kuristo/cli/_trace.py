@@ -0,0 +1,36 @@
+from pathlib import Path
+
+import kuristo.config as config
+import kuristo.trace as trace_
+import kuristo.ui as ui
+import kuristo.utils as utils
+from kuristo.exceptions import UserException
+
+
+def write_trace(run_dir: Path, path: Path):
+    """
+    Export trace of a run and tell the user where it is
+    """
+    if not trace_.has_trace(run_dir):
+        raise UserException(
+            f"No trace recorded for run '{run_dir.name}'. Tracing is off by default, "
+            "enable it with 'kuristo run --trace <file>' or 'trace.enabled' in the config."
+        )
+    n_events = trace_.export(run_dir, path)
+    if n_events == 0:
+        raise UserException(f"No trace recorded for run '{run_dir.name}'.")
+    console = ui.console()
+    console.print(f"Trace written to [cyan]{path}[/] (open it in https://ui.perfetto.dev)")
+
+
+def trace(args):
+    """
+    Export timeline of a run in Chrome Trace Event format
+    """
+    cfg = config.get()
+    run_id = utils.resolve_run_id(cfg.log_dir, args.run_id or "latest")
+    run_dir = utils.get_run_output_dir(cfg.log_dir, run_id)
+    if not run_dir.exists():
+        raise UserException(f"Run '{run_id}' not found.")
+    output = Path(args.output or f"trace-{run_id}.json")
+    write_trace(run_dir, output)
@@ -0,0 +1,160 @@
+import gzip
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from kuristo.exceptions import UserException
+
+# Suffix of compressed files for each compression method
+SUFFIXES = {
+    "gzip": ".gz",
+    "zstd": ".zst",
+}
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise UserException("zstd compression requires the 'zstandard' package")
+    return zstandard
+
+
+def check_method(method: str):
+    """
+    Check that a compression method is known and available
+
+    @param method Compression method (`none`, `gzip` or `zstd`)
+    """
+    if method == "none":
+        return
+    if method not in SUFFIXES:
+        raise UserException(
+            f"Unknown compression method '{method}'. Use one of: none, {', '.join(SUFFIXES)}"
+        )
+    if method == "zstd":
+        _zstandard()
+
+
+def is_compressed(path: Path) -> bool:
+    return path.suffix in SUFFIXES.values()
+
+
+def strip_suffix(path: Path) -> Path:
+    """
+    Get path of a file without the suffix added by compression
+    """
+    if is_compressed(path):
+        return path.with_suffix("")
+    return path
+
+
+def find(path: Path) -> Path | None:
+    """
+    Find a file that may have been compressed
+
+    @param path Path of the uncompressed file
+    @return Path of the file (possibly compressed) or `None` if it does not exist
+    """
+    if path.exists():
+        return path
+    for suffix in SUFFIXES.values():
+        compressed = path.with_name(path.name + suffix)
+        if compressed.exists():
+            return compressed
+    return None
+
+
+def open_binary(path: Path):
+    """
+    Open a (possibly compressed) file for reading bytes
+    """
+    if path.suffix == SUFFIXES["gzip"]:
+        return gzip.open(path, "rb")
+    if path.suffix == SUFFIXES["zstd"]:
+        return _zstandard().open(path, "rb")
+    return open(path, "rb")
+
+
+def open_text(path: Path):
+    """
+    Open a (possibly compressed) file for reading text
+    """
+    if path.suffix == SUFFIXES["gzip"]:
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    if path.suffix == SUFFIXES["zstd"]:
+        return _zstandard().open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, encoding="utf-8", errors="replace")
+
+
+def compress_file(path: Path, method: str) -> Path:
+    """
+    Compress a file, replacing the original
+
+    @param path File to compress
+    @param method Compression method (`gzip` or `zstd`)
+    @return Path of the compressed file
+    """
+    compressed = path.with_name(path.name + SUFFIXES[method])
+    tmp_path = compressed.with_name(f".{compressed.name}.tmp")
+    with open(path, "rb") as src:
+        if method == "gzip":
+            dst = gzip.open(tmp_path, "wb", compresslevel=6)
+        else:
+            dst = _zstandard().open(tmp_path, "wb")
+        with dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+    # readers look for the original first, so the compressed file must be complete by then
+    os.replace(tmp_path, compressed)
+    path.unlink()
+    return compressed
+
+
+class BackgroundCompressor:
+    """
+    Compresses files on a background thread, so that jobs do not wait for it
+    """
+
+    def __init__(self, method: str):
+        """
+        @param method Compression method (`none`, `gzip` or `zstd`)
+        """
+        check_method(method)
+        self._method = method
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self._method != "none"
+
+    def submit(self, path: Path):
+        """
+        Schedule a file for compression
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="kuristo-compress"
+                )
+            self._executor.submit(self._compress, path)
+
+    def shutdown(self):
+        """
+        Wait until all scheduled files are compressed
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _compress(self, path: Path):
+        try:
+            compress_file(path, self._method)
+        except OSError:
+            # an uncompressed log is still a valid log
+            pass
@@ -24,15 +24,47 @@ class Config:
         self.log_history = self._get_int("log.history", 5)
         # Options: on_success, always, never
         self.log_cleanup = self._get("log.cleanup", "always")
+        # Options: text, jsonl
+        self.log_format = self._get("log.format", "text")
+        # Options: none, gzip, zstd
+        self.log_compress = self._get("log.compress", "none")
         self.num_cores = self._resolve_cores()
 
         self.mpi_launcher = os.getenv(
             "KURISTO_MPI_LAUNCHER", self._get("runner.mpi-launcher", "mpirun")
         )
+        self.mpi_thread_flags = self._get_str("runner.mpi-thread-flags")
+        self.mpi_host_flags = self._get_str("runner.mpi-host-flags")
+        self.remote_launcher = self._get(
+            "runner.remote-launcher",
+            "srun --exclusive --nodes=1 --ntasks=1 --cpus-per-task={cores} --nodelist={host}",
+        )
+        self.max_output = self._get("runner.max-output", None)
 
         self.batch_backend = self._get_str("batch.backend")
         self.batch_default_account = self._get_str("batch.default-account")
         self.batch_partition = self._get_str("batch.partition")
+        self.batch_multi_node = self._get("batch.multi-node", False)
+        self.batch_array = self._get("batch.array", True)
+        self.batch_max_array_size = self._get_int("batch.max-array-size", 1000)
+        self.batch_pack_cores = self._get_int("batch.pack-cores", self.num_cores)
+        self.batch_pack_walltime = self._get_int("batch.pack-walltime", 60)
+        self.batch_watch_interval = self._get_int("batch.watch-interval", 30)
+        self.batch_local_cores = self._get_int("batch.local-cores", self.num_cores)
+
+        self.perf_threshold = self._get_float("perf.threshold", 0.2)
+        self.perf_min_time = self._get_float("perf.min-time", 1.0)
+        self.perf_window = self._get_int("perf.window", 10)
+
+        self.flaky_window = self._get_int("flaky.window", 20)
+        self.flaky_min_score = self._get_float("flaky.min-score", 0.1)
+
+        textfile_dir = self._get_str("metrics.textfile-dir")
+        self.metrics_textfile_dir = Path(textfile_dir).expanduser() if textfile_dir else None
+        self.metrics_interval = self._get_int("metrics.interval", 30)
+        self.metrics_instance = self._get_str("metrics.instance")
+
+        self.trace_enabled = self._get("trace.enabled", False)
 
         self.console_width = self._get_int("base.console-width", 100)
 
@@ -58,6 +90,12 @@ class Config:
             raise UserException(f"{key} must be an integer")
         return val
 
+    def _get_float(self, key: str, default: float) -> float:
+        val = self._get(key, default)
+        if isinstance(val, bool) or not isinstance(val, (int, float)):
+            raise UserException(f"{key} must be a number")
+        return float(val)
+
     def _get_str(self, key: str) -> str | None:
         val = self._get(key)
         if val is None:
@@ -69,6 +107,10 @@ class Config:
     def _resolve_cores(self) -> int:
         system_default = utils.get_default_core_limit()
         value = self._get_int("resources.num-cores", system_default)
+        # set by batch backends that run several kuristo instances on one machine
+        env_value = os.getenv("KURISTO_NUM_CORES")
+        if env_value:
+            value = env_value
 
         try:
             value = int(value)
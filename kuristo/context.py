@@ -12,3 +12,5 @@ class Context:
         self.defaults = defaults
         # variables for substitution
         self.vars = {"matrix": matrix, "steps": {}}
+        # hosts allocated to the job ({host: n_cores}), `None` means local machine
+        self.hosts = None
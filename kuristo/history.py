@@ -0,0 +1,335 @@
+import json
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+import kuristo.utils as utils
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    version TEXT,
+    total_runtime REAL,
+    n_jobs INTEGER,
+    n_success INTEGER,
+    n_failed INTEGER,
+    n_skipped INTEGER,
+    report_mtime_ns INTEGER,
+    metrics TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id TEXT NOT NULL,
+    id INTEGER,
+    job_name TEXT,
+    workflow_file TEXT,
+    status TEXT,
+    return_code INTEGER,
+    duration REAL,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS results_run ON results (run_id);
+CREATE INDEX IF NOT EXISTS results_job ON results (workflow_file, job_name);
+"""
+
+RUN_COLUMNS = (
+    "run_id",
+    "version",
+    "total_runtime",
+    "n_jobs",
+    "n_success",
+    "n_failed",
+    "n_skipped",
+)
+
+
+def connect(log_dir: Path) -> sqlite3.Connection:
+    """
+    Open the run history database (`<log dir>/history.db`), creating it if needed.
+    If it can not be opened for writing (i.e. the log directory is read-only), an existing
+    database is opened read-only.
+
+    @param log_dir Base log directory
+    """
+    path = log_dir / "history.db"
+    db = None
+    try:
+        log_dir.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(path, timeout=30)
+        db.executescript(SCHEMA)
+        _migrate(db)
+        return db
+    except (sqlite3.Error, OSError):
+        if db is not None:
+            db.close()
+        if not path.exists():
+            raise
+    return sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True, timeout=30)
+
+
+def _migrate(db: sqlite3.Connection):
+    """
+    Bring a database created by an older version up to the current schema
+    """
+    columns = {row[1] for row in db.execute("PRAGMA table_info(runs)")}
+    if "metrics" not in columns:
+        with db:
+            db.execute("ALTER TABLE runs ADD COLUMN metrics TEXT")
+            # make stored runs be read again, so their metrics get stored
+            db.execute("UPDATE runs SET report_mtime_ns = NULL")
+
+
+def _record(db: sqlite3.Connection, run_id: str, report: dict, mtime_ns: int):
+    """
+    Store a report in the database, replacing what was stored for the run before
+    """
+    results = report.get("results", [])
+    counts = {"success": 0, "failed": 0, "skipped": 0}
+    for r in results:
+        if r.get("status") in counts:
+            counts[r["status"]] += 1
+    with db:
+        db.execute("DELETE FROM results WHERE run_id = ?", (run_id,))
+        db.execute(
+            "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                run_id,
+                report.get("version"),
+                report.get("total-runtime", 0.0),
+                len(results),
+                counts["success"],
+                counts["failed"],
+                counts["skipped"],
+                mtime_ns,
+                json.dumps(report["metrics"]) if "metrics" in report else None,
+            ),
+        )
+        db.executemany(
+            "INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    run_id,
+                    r.get("id"),
+                    r.get("job-name"),
+                    r.get("workflow-file"),
+                    r.get("status"),
+                    r.get("return-code"),
+                    r.get("duration"),
+                    json.dumps(r),
+                )
+                for r in results
+            ],
+        )
+
+
+def _refresh(db: sqlite3.Connection, run_dir: Path) -> dict | None:
+    """
+    Make sure the database is up to date with the run's report
+
+    @return The parsed report if it had to be read, `None` if the database was up to date
+    """
+    report_path = run_dir / "report.yaml"
+    mtime_ns = report_path.stat().st_mtime_ns
+    row = db.execute(
+        "SELECT report_mtime_ns FROM runs WHERE run_id = ?", (run_dir.name,)
+    ).fetchone()
+    if row is not None and row[0] == mtime_ns:
+        return None
+    report = utils.read_report(report_path) or {}
+    try:
+        _record(db, run_dir.name, report, mtime_ns)
+    except sqlite3.Error:
+        # history is only an index, reading a run must not depend on it
+        pass
+    return report
+
+
+def index_run(log_dir: Path, run_dir: Path):
+    """
+    Add a finished run into the history
+
+    @param log_dir Base log directory
+    @param run_dir Run output directory
+    """
+    utils.merge_result_fragments(run_dir)
+    if not (run_dir / "report.yaml").exists():
+        return
+    with closing(connect(log_dir)) as db:
+        _refresh(db, run_dir)
+
+
+def index_runs(log_dir: Path):
+    """
+    Bring the history up to date with all retained runs. If the history can not be
+    written (i.e. the log directory is read-only), it is left as it is.
+
+    @param log_dir Base log directory
+    """
+    run_dirs = utils.get_latest_run_dirs(log_dir)
+    if not run_dirs:
+        return
+    try:
+        with closing(connect(log_dir)) as db:
+            for run_dir in run_dirs:
+                utils.merge_result_fragments(run_dir)
+                if (run_dir / "report.yaml").exists():
+                    _refresh(db, run_dir)
+    except (sqlite3.Error, OSError):
+        pass
+
+
+def load_run(log_dir: Path, run_dir: Path) -> dict | None:
+    """
+    Get summary of a run (number of jobs per status, runtime)
+
+    @param log_dir Base log directory
+    @param run_dir Run output directory
+    @return Summary or `None` if the run has no report
+    """
+    utils.merge_result_fragments(run_dir)
+    if not (run_dir / "report.yaml").exists():
+        return None
+    with closing(connect(log_dir)) as db:
+        _refresh(db, run_dir)
+        row = db.execute(
+            f"SELECT {', '.join(RUN_COLUMNS)} FROM runs WHERE run_id = ?", (run_dir.name,)
+        ).fetchone()
+    return dict(zip(RUN_COLUMNS, row)) if row else None
+
+
+def load_report(log_dir: Path, run_dir: Path) -> dict | None:
+    """
+    Get report of a run
+
+    @param log_dir Base log directory
+    @param run_dir Run output directory
+    @return Report or `None` if the run has no report
+    """
+    utils.merge_result_fragments(run_dir)
+    report_path = run_dir / "report.yaml"
+    if not report_path.exists():
+        return None
+    try:
+        with closing(connect(log_dir)) as db:
+            report = _refresh(db, run_dir)
+            if report is not None:
+                return report
+            version, total_runtime, metrics = db.execute(
+                "SELECT version, total_runtime, metrics FROM runs WHERE run_id = ?",
+                (run_dir.name,),
+            ).fetchone()
+            rows = db.execute(
+                "SELECT data FROM results WHERE run_id = ? ORDER BY rowid", (run_dir.name,)
+            ).fetchall()
+    except (sqlite3.Error, OSError):
+        # history is only an index, the report itself is the source of truth
+        return utils.read_report(report_path) or {}
+    report = {
+        "version": version,
+        "results": [json.loads(data) for (data,) in rows],
+        "total-runtime": total_runtime,
+    }
+    if metrics is not None:
+        report["metrics"] = json.loads(metrics)
+    return report
+
+
+def job_history(log_dir: Path, workflow_file: str, job_name: str, limit: int = 20) -> list[dict]:
+    """
+    Get results of a job across runs
+
+    @param log_dir Base log directory
+    @param workflow_file Workflow file the job is defined in
+    @param job_name Job name
+    @param limit Maximum number of runs to return
+    @return Results (with `run-id` added) ordered from the newest run
+    """
+    with closing(connect(log_dir)) as db:
+        rows = db.execute(
+            "SELECT run_id, data FROM results WHERE workflow_file = ? AND job_name = ? "
+            "ORDER BY run_id DESC LIMIT ?",
+            (workflow_file, job_name, limit),
+        ).fetchall()
+    return [{"run-id": run_id, **json.loads(data)} for run_id, data in rows]
+
+
+def recent_durations(
+    log_dir: Path, before_run_id: str, window: int
+) -> dict[tuple[str, str], list[float]]:
+    """
+    Get durations of successful jobs from the runs preceding a run
+
+    @param log_dir Base log directory
+    @param before_run_id Only runs older than this one are considered
+    @param window Maximum number of most recent durations per job
+    @return Mapping of (workflow file, job name) to durations (newest first)
+    """
+    with closing(connect(log_dir)) as db:
+        rows = db.execute(
+            "SELECT workflow_file, job_name, duration FROM ("
+            "  SELECT workflow_file, job_name, duration, ROW_NUMBER() OVER ("
+            "    PARTITION BY workflow_file, job_name ORDER BY run_id DESC) AS n"
+            "  FROM results"
+            "  WHERE run_id < ? AND status = 'success' AND duration IS NOT NULL"
+            ") WHERE n <= ? ORDER BY n",
+            (before_run_id, window),
+        ).fetchall()
+    durations = {}
+    for workflow_file, job_name, duration in rows:
+        durations.setdefault((workflow_file, job_name), []).append(duration)
+    return durations
+
+
+def recent_step_durations(
+    log_dir: Path, before_run_id: str, window: int
+) -> dict[tuple[str, str], dict[str, list[float]]]:
+    """
+    Get durations of steps of successful jobs from the runs preceding a run
+
+    @param log_dir Base log directory
+    @param before_run_id Only runs older than this one are considered
+    @param window Maximum number of most recent runs per job
+    @return Mapping of (workflow file, job name) to step name and its durations (newest first)
+    """
+    with closing(connect(log_dir)) as db:
+        rows = db.execute(
+            "SELECT workflow_file, job_name, steps FROM ("
+            "  SELECT workflow_file, job_name, json_extract(data, '$.steps') AS steps,"
+            "    ROW_NUMBER() OVER ("
+            "      PARTITION BY workflow_file, job_name ORDER BY run_id DESC) AS n"
+            "  FROM results"
+            "  WHERE run_id < ? AND status = 'success'"
+            ") WHERE n <= ? AND steps IS NOT NULL ORDER BY n",
+            (before_run_id, window),
+        ).fetchall()
+    durations = {}
+    for workflow_file, job_name, steps in rows:
+        job_steps = durations.setdefault((workflow_file, job_name), {})
+        for name, duration in utils.step_durations(json.loads(steps)).items():
+            job_steps.setdefault(name, []).append(duration)
+    return durations
+
+
+def job_outcomes(log_dir: Path, window: int) -> dict[tuple[str, str], list[tuple]]:
+    """
+    Get pass/fail outcomes of jobs over the most recent runs
+
+    @param log_dir Base log directory
+    @param window Maximum number of most recent outcomes per job
+    @return Mapping of (workflow file, job name) to (run ID, status, spec hash) (newest first)
+    """
+    with closing(connect(log_dir)) as db:
+        rows = db.execute(
+            "SELECT workflow_file, job_name, run_id, status, spec_hash FROM ("
+            "  SELECT workflow_file, job_name, run_id, status,"
+            "    json_extract(data, '$.\"spec-hash\"') AS spec_hash,"
+            "    ROW_NUMBER() OVER ("
+            "      PARTITION BY workflow_file, job_name ORDER BY run_id DESC) AS n"
+            "  FROM results"
+            "  WHERE status IN ('success', 'failed')"
+            ") WHERE n <= ? ORDER BY n",
+            (window,),
+        ).fetchall()
+    outcomes = {}
+    for workflow_file, job_name, run_id, status, spec_hash in rows:
+        outcomes.setdefault((workflow_file, job_name), []).append((run_id, status, spec_hash))
+    return outcomes
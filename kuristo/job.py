@@ -1,13 +1,17 @@
-import logging
+import hashlib
+import json
 import os
 import threading
 import time
 from pathlib import Path
 
+import kuristo.config as config
 import kuristo.utils as utils
 from kuristo.action_factory import ActionFactory
 from kuristo.context import Context
 from kuristo.env import Env
+from kuristo.exceptions import UserException
+from kuristo.rusage import ResourceUsage
 from kuristo.workflow import JobSpec
 
 
@@ -23,36 +27,87 @@ class Job:
     RUNNING = 1
     FINISHED = 2
 
-    class TaggedFormatter(logging.Formatter):
-        def format(self, record):
-            if not hasattr(record, "tag"):
-                record.tag = "INFO"  # fallback if not tagged
-            return f"{self.formatTime(record)} - {record.tag:<12} - {record.getMessage()}"
-
     class Logger:
         """
         Simple encapsulation to simplify job logging into a file
-        """
-
-        def __init__(self, id, log_file):
-            self._logger = logging.getLogger(f"JobLogger-{id}")
-            self._logger.setLevel(logging.INFO)
-            formatter = Job.TaggedFormatter()
 
-            file_handler = logging.FileHandler(log_file, mode="w")
-            file_handler.setFormatter(formatter)
-            self._logger.addHandler(file_handler)
+        Records are written through a buffer that is flushed once per call, so that the log
+        can be followed while the job runs. The file is opened on the first record and must
+        be closed when the job ends.
+        """
+
+        def __init__(self, id, log_file, structured=False):
+            """
+            @param id Job number
+            @param log_file Log file
+            @param structured Write JSON records and an index of step offsets instead of text
+            """
+            self._id = id
+            self._log_file = Path(log_file)
+            self._structured = structured
+            self._file = None
+            self._closed = False
+            self._lock = threading.Lock()
+            # number of bytes written so far
+            self._offset = 0
+            # time stamp of the last record up to seconds (cached, because formatting is slow)
+            self._last_second = None
+            self._last_second_str = ""
+
+            self._index_file = utils.job_log_index_path(log_file) if structured else None
+            # (step name, start offset, end offset) of logged steps
+            self._steps = []
+
+        @property
+        def log_file(self):
+            return self._log_file
+
+        def close(self):
+            """
+            Close the log file. Records logged after this are dropped.
+            """
+            with self._lock:
+                self._closed = True
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
 
         def log(self, message, tag="INFO"):
-            self._logger.info(message, extra={"tag": tag})
+            self.log_lines([message], tag)
+
+        def log_lines(self, messages, tag="INFO"):
+            """
+            Log several records with the same tag at once
+
+            @param messages Messages, one per record
+            @param tag Tag of the records
+            """
+            with self._lock:
+                if self._closed or not messages:
+                    return
+                if self._file is None:
+                    self._file = open(self._log_file, "wb")
+                timestamp = self._timestamp()
+                data = "".join(self._format(timestamp, tag, msg) for msg in messages).encode(
+                    "utf-8", errors="replace"
+                )
+                self._file.write(data)
+                self._file.flush()
+                self._offset += len(data)
 
         def job_start(self, name):
             self.log(f"{name}", tag="JOB_START")
 
         def job_end(self):
+            self._end_step()
             self.log("Done", tag="JOB_END")
+            if self._index_file is not None:
+                self._write_index()
 
         def task_start(self, name):
+            self._end_step()
+            if self._index_file is not None:
+                self._steps.append([name, self._offset, None])
             self.log(f"* {name}", tag="TASK_START")
 
         def task_end(self, return_code):
@@ -73,9 +128,32 @@ class Job:
                 self._dump_env(what)
 
         def _dump_env(self, env: Env):
+            self._end_step()
             self.log("Environment variables:", tag="ENV")
-            for key, value in env.items():
-                self.env(key, value)
+            self.log_lines([f"| {key}={value}" for key, value in env.items()])
+
+        def _timestamp(self):
+            now = time.time()
+            second = int(now)
+            if second != self._last_second:
+                self._last_second = second
+                self._last_second_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+            return f"{self._last_second_str},{int((now - second) * 1000):03d}"
+
+        def _format(self, timestamp, tag, msg):
+            if self._structured:
+                rec = {"time": timestamp, "tag": tag, "msg": msg}
+                return json.dumps(rec, separators=(",", ":")) + "\n"
+            return f"{timestamp} - {tag:<12} - {msg}\n"
+
+        def _end_step(self):
+            if self._steps and self._steps[-1][2] is None:
+                self._steps[-1][2] = self._offset
+
+        def _write_index(self):
+            steps = [{"name": name, "start": start, "end": end} for name, start, end in self._steps]
+            with open(self._index_file, "w") as f:
+                json.dump({"steps": steps}, f)
 
     def __init__(
         self, id, event: threading.Event, job_spec: JobSpec, log_dir: Path, matrix=None
@@ -92,9 +170,13 @@ class Job:
         self._path_file = log_dir / f"job-{self._num}.path"
         self._thread = None
         self._process = None
-        self._logger = self.Logger(self._num, log_dir / f"job-{self._num}.log")
+        structured = config.get().log_format == "jsonl"
+        self._logger = self.Logger(
+            self._num, utils.job_log_path(log_dir, self._num, structured), structured
+        )
         self._return_code = None
         self._id = id
+        self._matrix = matrix
         self._name = self._create_job_name(job_spec, matrix)
         self._status = Job.WAITING
         self._skipped = False
@@ -109,6 +191,7 @@ class Job:
         if job_spec.skip:
             self.skip(job_spec.skip_reason)
         self._step_task_ids = {}
+        self._step_results = []
         self._elapsed_time = 0.0
         self._cancelled = threading.Event()
         self._timeout_timer = None
@@ -153,6 +236,16 @@ class Job:
         """
         return self._spec
 
+    @property
+    def spec_hash(self):
+        """
+        Return fingerprint of the job definition (changes whenever the job specification does)
+        """
+        data = json.dumps(
+            [self._spec.model_dump(by_alias=True), self._matrix], sort_keys=True, default=str
+        )
+        return hashlib.sha1(data.encode()).hexdigest()[:12]
+
     @property
     def name(self):
         """
@@ -195,6 +288,35 @@ class Job:
         """
         return self._num
 
+    @property
+    def output_dropped(self):
+        """
+        Return number of bytes of output dropped because of `max-output`
+        """
+        return sum(step.output_dropped for step in self._steps)
+
+    @property
+    def step_results(self) -> list[dict]:
+        """
+        Return name, times (relative to the job start) and exit code of each step that ran
+        """
+        return self._step_results
+
+    @property
+    def resource_usage(self) -> ResourceUsage | None:
+        """
+        Return resources used by the processes of all steps (`None` if not known)
+        """
+        usages = [step.resource_usage for step in self._steps if step.resource_usage is not None]
+        return ResourceUsage.combine(usages)
+
+    @property
+    def log_path(self):
+        """
+        Return path to the job log
+        """
+        return self._logger.log_file
+
     @property
     def status(self):
         """
@@ -230,6 +352,14 @@ class Job:
             n_cores = max(n_cores, s.num_cores)
         return n_cores
 
+    @property
+    def multi_host(self):
+        """
+        Return `True` if the job can be spread over several hosts, i.e. all its steps that
+        need more than a single core launch them on the hosts by themselves (MPI)
+        """
+        return all(s.multi_host for s in self._steps if s.num_cores > 1)
+
     @property
     def elapsed_time(self):
         """
@@ -237,6 +367,17 @@ class Job:
         """
         return self._elapsed_time
 
+    @property
+    def hosts(self):
+        """
+        Return hosts allocated to this job, `None` means the local machine
+        """
+        return self._context.hosts
+
+    @hosts.setter
+    def hosts(self, hosts):
+        self._context.hosts = hosts
+
     @property
     def num_steps(self):
         return len(self._steps)
@@ -277,7 +418,9 @@ class Job:
 
     def _run_process(self):
         self._return_code = 0
+        self._step_results = []
         self._logger.job_start(self.name)
+        job_start = time.perf_counter()
         for step in self._steps:
             with self._step_lock:
                 self._active_step = step
@@ -285,6 +428,8 @@ class Job:
             old_wd = os.getcwd()
             os.chdir(step.working_directory)
             self.on_step_start(self, step)
+            step.output_listener = self._logger.log
+            step_start = time.perf_counter()
             try:
                 if hasattr(step, "command"):
                     cmd = utils.make_shell_string(step.command)
@@ -294,13 +439,16 @@ class Job:
             except Exception as e:
                 self._logger.log(str(e))
                 exit_code = -1
+            step_end = time.perf_counter()
+            self._record_step(step, exit_code, step_start - job_start, step_end - job_start)
             self.on_step_finish(self, step)
             os.chdir(old_wd)
             self._load_env()
 
-            log_data = step.output
-            for line in log_data.splitlines():
-                self._logger.log(line)
+            if not step.output_streamed:
+                self._logger.log_lines(step.output.splitlines())
+            if step.resource_usage is not None:
+                self._logger.log(f"* {step.resource_usage}")
 
             if self._cancelled.is_set():
                 self._logger.log(
@@ -326,18 +474,33 @@ class Job:
         if self._context:
             self._logger.dump(self._context.env)
 
+    def _record_step(self, step, exit_code, start, end):
+        result = {
+            "name": step.name,
+            "start": round(start, 3),
+            "end": round(end, 3),
+            "duration": round(end - start, 3),
+            "return-code": exit_code,
+        }
+        if step.resource_usage is not None:
+            result["resources"] = step.resource_usage.to_dict()
+        self._step_results.append(result)
+
     def skip_process(self):
         self._logger.job_start(self.name)
         self._logger.log(f"* Skipped: {self.skip_reason}", tag="TASK_END")
         self._logger.job_end()
+        self._logger.close()
         self._status = Job.FINISHED
         self._elapsed_time = 0.0
         self._event.set()
 
     def _finish_process(self):
         self._status = Job.FINISHED
-        self.on_finish(self)
+        # the log is complete by the time anyone is told the job finished
         self._logger.job_end()
+        self._logger.close()
+        self.on_finish(self)
         self._event.set()
 
     def _on_timeout(self):
@@ -351,10 +514,22 @@ class Job:
         self._event.set()
 
     def _build_steps(self, spec):
+        default_max_output = spec.max_output
+        if default_max_output is None:
+            default_max_output = config.get().max_output
         steps = []
         for step in spec.steps:
             action = ActionFactory.create(step, self._context)
             if action is not None:
+                max_output = step.max_output
+                if max_output is None:
+                    max_output = default_max_output
+                action.max_output = utils.parse_size(max_output)
+                if action.max_output is not None and action.max_output < 1:
+                    raise UserException(
+                        f"Invalid max-output '{max_output}' in job '{self.name}'. "
+                        "Use a positive size, i.e. 512K, 10M or 1G."
+                    )
                 steps.append(action)
         return steps
 
@@ -486,6 +661,10 @@ class JobJoiner:
     def required_cores(self):
         return 0
 
+    @property
+    def multi_host(self):
+        return False
+
     @property
     def num_steps(self):
         return 0
@@ -0,0 +1,98 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class RunMetrics:
+    """
+    How well a run used the cores it had
+    """
+
+    # Number of cores available to the run
+    cores: int
+    # Wall time of the run [s]
+    runtime: float
+    # Sum of run times of all jobs [s]
+    job_seconds: float
+    # Sum of run times of all jobs weighted by the number of cores they used [core-s]
+    core_seconds: float
+    # Number of cores times the wall time [core-s]
+    core_seconds_available: float
+    # Total time jobs were ready to run, but waited for free cores [s]
+    queue_wait: float
+    # Run time of the longest chain of dependent jobs [s]
+    critical_path: float
+
+    @property
+    def utilisation(self) -> float:
+        """
+        Fraction of available core time that was used by jobs
+        """
+        if self.core_seconds_available <= 0:
+            return 0.0
+        return self.core_seconds / self.core_seconds_available
+
+    @property
+    def parallelism(self) -> float:
+        """
+        Average number of jobs running at the same time
+        """
+        if self.runtime <= 0:
+            return 0.0
+        return self.job_seconds / self.runtime
+
+    @property
+    def max_parallelism(self) -> float:
+        """
+        Parallelism the dependencies between jobs allow, i.e. with unlimited cores
+        """
+        if self.critical_path <= 0:
+            return 0.0
+        return self.job_seconds / self.critical_path
+
+    def to_dict(self) -> dict:
+        return {
+            "cores": self.cores,
+            "job-seconds": self.job_seconds,
+            "core-seconds": self.core_seconds,
+            "core-seconds-available": self.core_seconds_available,
+            "utilisation": self.utilisation,
+            "queue-wait": self.queue_wait,
+            "critical-path": self.critical_path,
+            "parallelism": self.parallelism,
+        }
+
+    @staticmethod
+    def from_dict(data: dict, runtime: float) -> "RunMetrics":
+        """
+        Create metrics from their form stored in `report.yaml`
+
+        @param data Stored metrics
+        @param runtime Wall time of the run
+        """
+        return RunMetrics(
+            cores=data.get("cores", 0),
+            runtime=runtime,
+            job_seconds=data.get("job-seconds", 0.0),
+            core_seconds=data.get("core-seconds", 0.0),
+            core_seconds_available=data.get("core-seconds-available", 0.0),
+            queue_wait=data.get("queue-wait", 0.0),
+            critical_path=data.get("critical-path", 0.0),
+        )
+
+    @staticmethod
+    def merge(metrics: list["RunMetrics"], runtime: float) -> "RunMetrics":
+        """
+        Combine metrics of parts of a run that ran concurrently (i.e. batch tasks)
+
+        @param metrics Metrics of the parts
+        @param runtime Wall time of the whole run
+        """
+        return RunMetrics(
+            cores=sum(m.cores for m in metrics),
+            runtime=runtime,
+            job_seconds=sum(m.job_seconds for m in metrics),
+            core_seconds=sum(m.core_seconds for m in metrics),
+            core_seconds_available=sum(m.core_seconds_available for m in metrics),
+            queue_wait=sum(m.queue_wait for m in metrics),
+            critical_path=max((m.critical_path for m in metrics), default=0.0),
+        )
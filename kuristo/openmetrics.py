@@ -0,0 +1,196 @@
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from kuristo.metrics import RunMetrics
+
+# Name of the file written into the textfile directory, one per instance (i.e. run)
+TEXTFILE_NAME = "kuristo-{instance}.prom"
+
+
+@dataclass
+class JobSample:
+    # Workflow file the job is defined in
+    workflow_file: str
+    # Job name
+    job_name: str
+    # Job status (`success`, `failed` or `skipped`)
+    status: str
+    # Duration [s]
+    duration: float
+
+
+@dataclass
+class RunSnapshot:
+    """
+    State of a run at the time metrics are exported
+    """
+
+    # Run ID
+    run_id: str
+    # Number of jobs by status (`success`, `failed`, `skipped`, `running`, `waiting`)
+    counts: dict[str, int]
+    # Core utilisation so far
+    metrics: RunMetrics
+    # Finished jobs
+    jobs: list[JobSample] = field(default_factory=list)
+    # Whether the run is over
+    finished: bool = False
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+class _Writer:
+    def __init__(self):
+        self._lines = []
+
+    def family(self, name: str, type: str, help: str, unit: str | None = None):
+        self._lines.append(f"# TYPE {name} {type}")
+        if unit is not None:
+            self._lines.append(f"# UNIT {name} {unit}")
+        self._lines.append(f"# HELP {name} {help}")
+
+    def sample(self, name: str, value, labels: str = ""):
+        if labels:
+            name = f"{name}{{{labels}}}"
+        if isinstance(value, float):
+            value = repr(value)
+        self._lines.append(f"{name} {value}")
+
+    def text(self) -> str:
+        return "\n".join(self._lines + ["# EOF"]) + "\n"
+
+
+def format_metrics(snapshot: RunSnapshot) -> str:
+    """
+    Format state of a run as OpenMetrics text
+
+    @param snapshot State of the run
+    @return Text in OpenMetrics exposition format
+    """
+    m = snapshot.metrics
+    w = _Writer()
+    # a gauge rather than an info metric, the textfile collector does not know the info type
+    w.family("kuristo_run_info", "gauge", "Run the metrics belong to")
+    w.sample("kuristo_run_info", 1, _labels(run_id=snapshot.run_id))
+    w.family("kuristo_run_finished", "gauge", "Whether the run is over (1) or in progress (0)")
+    w.sample("kuristo_run_finished", int(snapshot.finished))
+    w.family("kuristo_run_runtime_seconds", "gauge", "Wall time of the run", "seconds")
+    w.sample("kuristo_run_runtime_seconds", m.runtime)
+
+    w.family("kuristo_jobs", "gauge", "Number of jobs by status")
+    for status, n in snapshot.counts.items():
+        w.sample("kuristo_jobs", n, _labels(status=status))
+
+    w.family("kuristo_cores", "gauge", "Number of cores available to the run")
+    w.sample("kuristo_cores", m.cores)
+    w.family("kuristo_core_utilisation_ratio", "gauge", "Fraction of core time used by jobs")
+    w.sample("kuristo_core_utilisation_ratio", m.utilisation)
+    w.family("kuristo_parallelism", "gauge", "Average number of jobs running at the same time")
+    w.sample("kuristo_parallelism", m.parallelism)
+    w.family(
+        "kuristo_queue_wait_seconds",
+        "gauge",
+        "Total time jobs were ready to run, but waited for free cores",
+        "seconds",
+    )
+    w.sample("kuristo_queue_wait_seconds", m.queue_wait)
+    w.family(
+        "kuristo_critical_path_seconds",
+        "gauge",
+        "Run time of the longest chain of dependent jobs",
+        "seconds",
+    )
+    w.sample("kuristo_critical_path_seconds", m.critical_path)
+
+    w.family("kuristo_job_duration_seconds", "gauge", "Duration of finished jobs", "seconds")
+    for job in snapshot.jobs:
+        labels = _labels(workflow=job.workflow_file, job=job.job_name, status=job.status)
+        w.sample("kuristo_job_duration_seconds", job.duration, labels)
+    return w.text()
+
+
+def textfile_name(instance: str) -> str:
+    """
+    Get name of the file with metrics of an instance
+
+    @param instance Instance label (i.e. run ID), characters not allowed in file names
+           are replaced
+    """
+    return TEXTFILE_NAME.format(instance=re.sub(r"[^A-Za-z0-9_.-]", "_", instance))
+
+
+def write_textfile(directory: Path, instance: str, text: str):
+    """
+    Write metrics for a node_exporter textfile collector
+
+    Every instance writes its own file, so concurrent runs do not overwrite each other.
+    The file is replaced atomically, so the collector never reads a partial file.
+
+    @param directory Directory the collector reads
+    @param instance Instance label (i.e. run ID)
+    @param text Metrics
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    name = textfile_name(instance)
+    tmp_path = directory / f".{name}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, directory / name)
+
+
+class TextfileExporter:
+    """
+    Periodically exports metrics of a running run into a textfile directory
+    """
+
+    def __init__(self, directory: Path, instance: str, interval: float, snapshot):
+        """
+        @param directory Directory the collector reads
+        @param instance Instance label the file is named after (i.e. run ID)
+        @param interval Time between exports [s], exports only at the end of the run if 0
+        @param snapshot Function returning the current `RunSnapshot`
+        """
+        self._directory = Path(directory)
+        self._instance = instance
+        self._interval = interval
+        self._snapshot = snapshot
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._interval <= 0:
+            return
+        self._thread = threading.Thread(
+            target=self._loop, name="kuristo-metrics-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop exporting and export the final state of the run
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._export()
+
+    def _loop(self):
+        while not self._stop.wait(self._interval):
+            self._export()
+
+    def _export(self):
+        try:
+            write_textfile(self._directory, self._instance, format_metrics(self._snapshot()))
+        except OSError:
+            # metrics are best effort, they must not break the run
+            pass
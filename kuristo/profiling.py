@@ -0,0 +1,126 @@
+import cProfile
+import pstats
+import resource
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from rich.text import Text
+
+import kuristo.ui as ui
+from kuristo.utils import human_time
+
+# Default file the profile is written into
+PROFILE_FILE = "kuristo.prof"
+
+# Functions in which the main thread blocks, i.e. waits for jobs to finish
+WAIT_FUNCTIONS = (
+    "acquire",
+    "time.sleep",
+    "select",
+    "poll",
+    "waitpid",
+    "wait4",
+    "waitid",
+)
+
+
+@dataclass
+class ProfileSummary:
+    # Wall time [s]
+    wall_time: float
+    # Time the main thread (scheduler, UI) spent running Python code [s]
+    main_busy: float
+    # Time the main thread spent blocked, waiting for jobs [s]
+    main_waiting: float
+    # CPU time used by kuristo itself, all threads [s]
+    self_cpu: float
+    # CPU time used by child processes (the jobs) [s]
+    children_cpu: float
+
+
+def _cpu_time(who) -> float:
+    usage = resource.getrusage(who)
+    return usage.ru_utime + usage.ru_stime
+
+
+def waiting_time(stats: pstats.Stats) -> float:
+    """
+    Get time spent in functions that block
+
+    @param stats Profile statistics
+    @return Time [s]
+    """
+    total = 0.0
+    for (file_name, _, func_name), (_, _, tottime, _, _) in stats.stats.items():
+        if file_name == "~" and any(name in func_name for name in WAIT_FUNCTIONS):
+            total += tottime
+    return total
+
+
+class Profiler:
+    """
+    Profiles kuristo running a command
+
+    The main thread is profiled with cProfile, so the statistics show where the scheduler
+    and the UI spend their time. CPU time of kuristo and of its child processes is measured
+    separately, so the overhead of kuristo can be told apart from the jobs themselves.
+    """
+
+    def __init__(self, path: Path):
+        """
+        @param path File the profile statistics are written into
+        """
+        self._path = Path(path)
+        self._profile = cProfile.Profile()
+        self._summary = None
+
+    @property
+    def summary(self) -> ProfileSummary | None:
+        """
+        Return summary of the profile (available once profiling stopped)
+        """
+        return self._summary
+
+    def __enter__(self):
+        self._start_time = time.perf_counter()
+        self._start_self_cpu = _cpu_time(resource.RUSAGE_SELF)
+        self._start_children_cpu = _cpu_time(resource.RUSAGE_CHILDREN)
+        self._profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._profile.disable()
+        wall_time = time.perf_counter() - self._start_time
+        stats = pstats.Stats(self._profile)
+        waiting = waiting_time(stats)
+        self._summary = ProfileSummary(
+            wall_time=wall_time,
+            main_busy=max(stats.total_tt - waiting, 0.0),
+            main_waiting=waiting,
+            self_cpu=_cpu_time(resource.RUSAGE_SELF) - self._start_self_cpu,
+            children_cpu=_cpu_time(resource.RUSAGE_CHILDREN) - self._start_children_cpu,
+        )
+        self._profile.dump_stats(self._path)
+        print_summary(self._summary, self._path)
+        return False
+
+
+def print_summary(summary: ProfileSummary, path: Path):
+    consol = ui.console()
+    consol.print(
+        Text.from_markup(
+            f"[grey46]Wall time:[/] {human_time(summary.wall_time)}     "
+            f"[grey46]Scheduler/UI:[/] {human_time(summary.main_busy)}     "
+            f"[grey46]Waiting for jobs:[/] {human_time(summary.main_waiting)}"
+        )
+    )
+    consol.print(
+        Text.from_markup(
+            f"[grey46]CPU time of kuristo:[/] {human_time(summary.self_cpu)}     "
+            f"[grey46]CPU time of jobs:[/] {human_time(summary.children_cpu)}"
+        )
+    )
+    consol.print(
+        Text.from_markup(f"Profile written to [cyan]{path}[/] (inspect with 'python -m pstats')")
+    )
@@ -1,4 +1,9 @@
+import os
+import re
+from pathlib import Path
+
 import kuristo.config as config
+from kuristo.exceptions import UserException
 
 
 class Resources:
@@ -6,9 +11,12 @@ class Resources:
     Provides resources available to the framework
     """
 
-    def __init__(self) -> None:
+    def __init__(self, n_cores: int | None = None) -> None:
+        """
+        @param n_cores Number of cores to use (default: number of cores from the configuration)
+        """
         cfg = config.get()
-        self._max_cores = cfg.num_cores
+        self._max_cores = cfg.num_cores if n_cores is None else n_cores
         self._n_cores_available = self._max_cores
 
     @property
@@ -19,14 +27,216 @@ class Resources:
     def total_cores(self):
         return self._max_cores
 
-    def allocate_cores(self, n):
+    def max_job_cores(self, multi_host=False):
+        """
+        Return the largest number of cores a single job can get
+
+        @param multi_host Whether the job can run on several hosts
+        """
+        return self._max_cores
+
+    def can_allocate(self, n, multi_host=False):
+        """
+        Check if `n` cores can be allocated right now
+
+        @param multi_host Whether the cores can be spread over several hosts
+        """
+        return self._n_cores_available >= n
+
+    def allocate_cores(self, n, multi_host=False):
+        """
+        Allocate `n` cores
+
+        @param multi_host Whether the cores can be spread over several hosts
+        @return Hosts the cores were allocated on, `None` means the local machine
+        """
         if self._n_cores_available >= n:
             self._n_cores_available = self._n_cores_available - n
         else:
             raise RuntimeError("Trying to allocate more core then is available")
+        return None
 
-    def free_cores(self, n):
+    def free_cores(self, n, hosts=None):
         if self._n_cores_available + n <= self._max_cores:
             self._n_cores_available = self._n_cores_available + n
         else:
             raise RuntimeError("Trying to free more cores then maximum available cores")
+
+
+class NodeResources(Resources):
+    """
+    Provides resources of a multi-node allocation (e.g. inside a Slurm job)
+
+    Cores are tracked per node. A job is placed on a single node whenever it fits,
+    otherwise it is spread over several nodes, if it can use several hosts (i.e. MPI jobs).
+    """
+
+    def __init__(self, nodes: dict[str, int]) -> None:
+        """
+        @param nodes Mapping of host name to number of cores on that host
+        """
+        if not nodes:
+            raise UserException("No nodes available in the allocation")
+        self._nodes = dict(nodes)
+        self._free = dict(nodes)
+        self._max_cores = sum(nodes.values())
+        self._n_cores_available = self._max_cores
+
+    @property
+    def nodes(self):
+        """
+        Return mapping of host name to number of cores
+        """
+        return dict(self._nodes)
+
+    def max_job_cores(self, multi_host=False):
+        if multi_host:
+            return self._max_cores
+        return max(self._nodes.values())
+
+    def can_allocate(self, n, multi_host=False):
+        if multi_host:
+            return self._n_cores_available >= n
+        return any(free >= n for free in self._free.values())
+
+    def allocate_cores(self, n, multi_host=False):
+        if not self.can_allocate(n, multi_host):
+            raise RuntimeError("Trying to allocate more core then is available")
+
+        fits = [host for host, free in self._free.items() if free >= n]
+        if fits:
+            # best fit, so we keep large chunks of free nodes for large jobs
+            host = min(fits, key=lambda h: self._free[h])
+            hosts = {host: n}
+        else:
+            hosts = {}
+            remaining = n
+            for host in sorted(self._free, key=lambda h: self._free[h], reverse=True):
+                take = min(self._free[host], remaining)
+                if take > 0:
+                    hosts[host] = take
+                    remaining -= take
+                if remaining == 0:
+                    break
+
+        for host, k in hosts.items():
+            self._free[host] -= k
+        self._n_cores_available -= n
+        return hosts
+
+    def free_cores(self, n, hosts=None):
+        if hosts is None or sum(hosts.values()) != n:
+            raise RuntimeError("Trying to free cores that were not allocated")
+        for host, k in hosts.items():
+            if self._free[host] + k > self._nodes[host]:
+                raise RuntimeError("Trying to free more cores then maximum available cores")
+            self._free[host] += k
+        self._n_cores_available += n
+
+
+def _split_top_level(text: str) -> list[str]:
+    """
+    Split `text` on commas that are not inside brackets
+    """
+    parts = []
+    depth = 0
+    current = ""
+    for ch in text:
+        if ch == "[":
+            depth += 1
+        elif ch == "]":
+            depth -= 1
+        if ch == "," and depth == 0:
+            parts.append(current)
+            current = ""
+        else:
+            current += ch
+    if current:
+        parts.append(current)
+    return parts
+
+
+def expand_nodelist(nodelist: str) -> list[str]:
+    """
+    Expand a Slurm compressed host list, i.e. `node[01-03,07],gpu1`
+
+    @param nodelist Compressed host list
+    @return List of host names
+    """
+    hosts = []
+    for item in _split_top_level(nodelist.strip()):
+        m = re.match(r"^([^\[]*)\[([^\]]+)\](.*)$", item)
+        if m is None:
+            hosts.append(item)
+            continue
+        prefix, ranges, suffix = m.groups()
+        for rng in ranges.split(","):
+            if "-" in rng:
+                lo, hi = rng.split("-", 1)
+                width = len(lo)
+                for i in range(int(lo), int(hi) + 1):
+                    hosts.extend(expand_nodelist(f"{prefix}{i:0{width}d}{suffix}"))
+            else:
+                hosts.extend(expand_nodelist(f"{prefix}{rng}{suffix}"))
+    return hosts
+
+
+def expand_cpus_per_node(value: str) -> list[int]:
+    """
+    Expand Slurm's `SLURM_JOB_CPUS_PER_NODE`, i.e. `4(x2),8` -> [4, 4, 8]
+    """
+    counts = []
+    for item in value.split(","):
+        m = re.match(r"^(\d+)(?:\(x(\d+)\))?$", item.strip())
+        if m is None:
+            raise UserException(f"Unable to parse number of cpus per node: '{value}'")
+        counts.extend([int(m.group(1))] * int(m.group(2) or 1))
+    return counts
+
+
+def read_hostfile(path: Path, default_cores: int) -> dict[str, int]:
+    """
+    Read a host file. Supported line formats are `host`, `host slots=N` and `host:N`
+
+    @param path Host file
+    @param default_cores Number of cores used when a line does not specify it
+    """
+    nodes = {}
+    with open(path, "r") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            m = re.match(r"^([^\s:]+)(?::(\d+)|\s+slots=(\d+))?", line)
+            if m is None:
+                continue
+            host = m.group(1)
+            n = m.group(2) or m.group(3)
+            nodes[host] = nodes.get(host, 0) + (int(n) if n else default_cores)
+    return nodes
+
+
+def detect_nodes(hostfile: Path | None = None) -> dict[str, int]:
+    """
+    Determine the nodes of the current allocation
+
+    @param hostfile Optional host file, takes precedence over the environment
+    @return Mapping of host name to number of cores
+    """
+    cfg = config.get()
+    if hostfile is not None:
+        return read_hostfile(hostfile, cfg.num_cores)
+
+    nodelist = os.environ.get("SLURM_JOB_NODELIST")
+    if nodelist:
+        hosts = expand_nodelist(nodelist)
+        cpus = os.environ.get("SLURM_JOB_CPUS_PER_NODE")
+        counts = expand_cpus_per_node(cpus) if cpus else [cfg.num_cores] * len(hosts)
+        if len(counts) != len(hosts):
+            raise UserException("SLURM_JOB_NODELIST and SLURM_JOB_CPUS_PER_NODE do not match")
+        return dict(zip(hosts, counts))
+
+    raise UserException(
+        "Unable to determine the node list of the allocation. "
+        "Set SLURM_JOB_NODELIST or use --hostfile."
+    )
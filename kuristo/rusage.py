@@ -0,0 +1,146 @@
+import os
+import sys
+from dataclasses import dataclass
+
+from kuristo.utils import human_size, human_time
+
+
+@dataclass
+class ResourceUsage:
+    """
+    Resources used by a process and its children
+    """
+
+    # CPU time spent in user mode [s]
+    user_time: float = 0.0
+    # CPU time spent in the kernel [s]
+    system_time: float = 0.0
+    # Peak resident set size [bytes]
+    max_rss: int = 0
+    # Bytes read from storage
+    read_bytes: int = 0
+    # Bytes written to storage
+    write_bytes: int = 0
+    # `max_rss` is only an upper bound of the peak memory (see `from_rusage`)
+    max_rss_upper_bound: bool = False
+
+    @staticmethod
+    def from_rusage(rusage, io: dict, parent_peak_rss: int | None = None) -> "ResourceUsage":
+        """
+        The peak memory of a child includes the memory of the process that started it,
+        because the child is a copy of it until it executes the command. If the peak is not
+        above the peak memory of the parent, it can not be told apart from it and is only
+        an upper bound.
+
+        @param rusage Resource usage returned by `os.wait4`
+        @param io I/O counters from `/proc/<pid>/io` (empty if not available)
+        @param parent_peak_rss Peak memory of the parent when the child was started [bytes]
+        """
+        # Linux reports kilobytes, macOS bytes
+        max_rss = rusage.ru_maxrss if sys.platform == "darwin" else rusage.ru_maxrss * 1024
+        return ResourceUsage(
+            user_time=rusage.ru_utime,
+            system_time=rusage.ru_stime,
+            max_rss=max_rss,
+            read_bytes=io.get("read_bytes", 0),
+            write_bytes=io.get("write_bytes", 0),
+            max_rss_upper_bound=parent_peak_rss is not None and max_rss <= parent_peak_rss,
+        )
+
+    @staticmethod
+    def combine(usages: list["ResourceUsage"]) -> "ResourceUsage | None":
+        """
+        Combine usage of processes that ran one after another
+
+        @return Combined usage or `None` if there is nothing to combine
+        """
+        if not usages:
+            return None
+        # an exact peak wins over an upper bound of the same size
+        peak = max(usages, key=lambda u: (u.max_rss, not u.max_rss_upper_bound))
+        return ResourceUsage(
+            user_time=sum(u.user_time for u in usages),
+            system_time=sum(u.system_time for u in usages),
+            max_rss=peak.max_rss,
+            read_bytes=sum(u.read_bytes for u in usages),
+            write_bytes=sum(u.write_bytes for u in usages),
+            max_rss_upper_bound=peak.max_rss_upper_bound,
+        )
+
+    def to_dict(self) -> dict:
+        d = {
+            "user-time": round(self.user_time, 3),
+            "system-time": round(self.system_time, 3),
+            "max-rss": self.max_rss,
+            "read-bytes": self.read_bytes,
+            "write-bytes": self.write_bytes,
+        }
+        if self.max_rss_upper_bound:
+            d["max-rss-upper-bound"] = True
+        return d
+
+    def __str__(self):
+        peak = human_size(self.max_rss)
+        if self.max_rss_upper_bound:
+            peak = f"at most {peak}"
+        return (
+            f"CPU time: {human_time(self.user_time)} user, {human_time(self.system_time)} system; "
+            f"peak memory: {peak}; "
+            f"I/O: {human_size(self.read_bytes)} read, {human_size(self.write_bytes)} written"
+        )
+
+
+def read_proc_io(pid: int) -> dict:
+    """
+    Read I/O counters of a process (Linux only)
+
+    The counters include children the process waited for. They are readable until the
+    process is reaped.
+
+    @param pid Process ID
+    @return Counters by name, empty if they are not available
+    """
+    try:
+        with open(f"/proc/{pid}/io") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return {}
+    counters = {}
+    for line in lines:
+        name, _, value = line.partition(":")
+        if value.strip().isdigit():
+            counters[name] = int(value)
+    return counters
+
+
+def peak_rss() -> int | None:
+    """
+    Get peak memory of this process (Linux only)
+
+    @return Peak resident set size [bytes] or `None` if it is not available
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def wait_with_usage(pid: int, parent_peak_rss: int | None = None) -> tuple[int, ResourceUsage]:
+    """
+    Wait for a child process to finish and collect the resources it used
+
+    @param pid Process ID of the child
+    @param parent_peak_rss Peak memory of this process when the child was started [bytes]
+    @return Exit status (as returned by `os.wait4`) and resource usage
+    """
+    io = {}
+    if hasattr(os, "waitid"):
+        # wait without reaping the process, so its I/O counters can still be read
+        os.waitid(os.P_PID, pid, os.WEXITED | os.WNOWAIT)
+        io = read_proc_io(pid)
+    _, status, rusage = os.wait4(pid, 0)
+    return status, ResourceUsage.from_rusage(rusage, io, parent_peak_rss)
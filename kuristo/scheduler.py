@@ -16,10 +16,14 @@ from rich.text import Text
 
 import kuristo.config as config
 import kuristo.ui as ui
+from kuristo.compression import BackgroundCompressor
 from kuristo.exceptions import UserException
 from kuristo.job import Job, JobJoiner
+from kuristo.metrics import RunMetrics
+from kuristo.openmetrics import JobSample, RunSnapshot, TextfileExporter
 from kuristo.resources import Resources
-from kuristo.workflow import JobSpec, Workflow
+from kuristo.trace import NullTracer, Tracer
+from kuristo.workflow import JobSpec, Workflow, order_workflows
 
 
 class StepCountColumn(ProgressColumn):
@@ -82,6 +86,9 @@ class Scheduler:
         labels: list[str] | None = None,
         job_nums: set[int] | None = None,
         priority_job_nums: set[int] | None = None,
+        finished_results: list[dict] | None = None,
+        previous_runtime: float = 0.0,
+        on_job_done=None,
     ) -> None:
         """
         @param workflows: [Workflows] List of workflows
@@ -90,6 +97,9 @@ class Scheduler:
         @param labels: Optional list of labels to filter jobs
         @param job_nums: Optional set of job numbers to run (e.g., from --rerun-failed)
         @param priority_job_nums: Optional set of job numbers to run first (e.g., from --failed-first)
+        @param finished_results: Optional results of jobs that already finished (e.g., from --resume)
+        @param previous_runtime: Time the run already ran before it was interrupted [s]
+        @param on_job_done: Optional callback called with every job that finished or was skipped
         @param config: Configuration
         @param job_times_path: File name to store timing report into
         """
@@ -99,12 +109,22 @@ class Scheduler:
         self._lock = threading.Lock()
         self._event = threading.Event()
         self._priority_job_nums = priority_job_nums or set()
+        self._previous_runtime = previous_runtime
+        # part of the metrics contributed by jobs that finished before the run was resumed
+        self._finished_job_seconds = 0.0
+        self._finished_core_seconds = 0.0
+        self._finished_critical_path = 0.0
+        self._finished_chain = {}
 
         self._graph = self._create_graph(workflows)
         if labels:
             self._graph = self._apply_label_filter(self._graph, labels)
         if job_nums:
             self._graph = self._apply_num_filter(self._graph, job_nums)
+        if finished_results:
+            self._graph = self._remove_finished(self._graph, finished_results)
+        self._on_job_done = on_job_done
+        self._compressor = BackgroundCompressor(cfg.log_compress)
 
         self._max_label_len = cfg.console_width
         self._max_num_width = 1
@@ -113,6 +133,10 @@ class Scheduler:
             self._max_num_width = max(self._max_num_width, len(str(job.num)))
 
         self._resources = rcs
+        if cfg.trace_enabled:
+            self._tracer = Tracer(rcs.total_cores)
+        else:
+            self._tracer = NullTracer()
         if cfg.no_ansi:
             self._progress = NullProgress()
         else:
@@ -133,11 +157,24 @@ class Scheduler:
         self._n_failed = 0
         self._n_skipped = 0
         self._total_runtime = 0.0
+        # when jobs became ready to run (waiting only for free cores)
+        self._ready_time = {}
+        self._job_start_time = {}
+        self._queue_wait = 0.0
+        self._run_start_time = 0.0
+        self._metrics = None
 
     @property
     def total_runtime(self):
         return self._total_runtime
 
+    @property
+    def metrics(self) -> RunMetrics | None:
+        """
+        Core utilisation of the run (available after `run_all_jobs`)
+        """
+        return self._metrics
+
     @property
     def jobs(self):
         return self._graph.nodes
@@ -164,6 +201,16 @@ class Scheduler:
         )
 
         start_time = time.perf_counter()
+        self._run_start_time = start_time
+        exporter = None
+        if cfg.metrics_textfile_dir is not None:
+            exporter = TextfileExporter(
+                cfg.metrics_textfile_dir,
+                cfg.metrics_instance or self._out_dir.name,
+                cfg.metrics_interval,
+                self._metrics_snapshot,
+            )
+            exporter.start()
         with self._progress:
             while any(not job.is_processed for job in self._graph.nodes):
                 self._schedule_next_job()
@@ -171,8 +218,13 @@ class Scheduler:
                 self._event.clear()
         for j in self._active_jobs:
             j.wait()
+        self._compressor.shutdown()
         end_time = time.perf_counter()
-        self._total_runtime = end_time - start_time
+        self._tracer.write(self._out_dir)
+        self._total_runtime = self._previous_runtime + end_time - start_time
+        self._metrics = self._compute_metrics(self._total_runtime)
+        if exporter is not None:
+            exporter.stop()
         if cfg.no_ansi:
             self._progress.console.print("")
 
@@ -185,11 +237,14 @@ class Scheduler:
             )
         )
         ui.time(self._total_runtime)
+        ui.metrics(self._metrics)
 
     def _create_graph(self, workflows: list[Workflow]) -> netx.DiGraph:
         graph = netx.DiGraph()
+        job_maps = []
         for wf in workflows:
             job_map = {}
+            job_maps.append(job_map)
             for sp in wf.jobs.values():
                 spec_jobs = create_jobs(sp, self._out_dir, self._event)
                 for job in spec_jobs:
@@ -206,6 +261,17 @@ class Scheduler:
                             f"{wf.file_name}: Job '{job.spec.id}' depends on unknown job '{dep_name}'"
                         )
                     graph.add_edge(job_map[dep_name], job_map[job.id])
+
+        # a workflow starts once the workflows it needs are done
+        _, needs, outside = order_workflows(workflows)
+        ui.needs_outside_selection(outside)
+        sources = [[j for j in m.values() if graph.in_degree(j) == 0] for m in job_maps]
+        sinks = [[j for j in m.values() if graph.out_degree(j) == 0] for m in job_maps]
+        for i, deps in needs.items():
+            for d in deps:
+                for src in sinks[d]:
+                    for dst in sources[i]:
+                        graph.add_edge(src, dst)
         return graph
 
     def _apply_label_filter(self, graph: netx.DiGraph, labels: list[str]) -> netx.DiGraph:
@@ -277,6 +343,42 @@ class Scheduler:
         graph.remove_nodes_from(nodes_to_remove)
         return graph
 
+    def _remove_finished(self, graph: netx.DiGraph, results: list[dict]) -> netx.DiGraph:
+        """
+        Remove jobs that already finished, so only unfinished jobs and their dependants run.
+        Dependants of jobs that were skipped get skipped as well. Used for --resume.
+        Durations of the finished jobs are kept, so the metrics cover the whole run.
+
+        @param results: Results of jobs that finished (e.g., from the run's journal)
+        """
+        by_num = {r["id"]: r for r in results}
+        finished = [job for job in graph.nodes if isinstance(job, Job) and job.num in by_num]
+        for job in finished:
+            if by_num[job.num].get("status") != "skipped":
+                continue
+            for succ in graph.successors(job):
+                if isinstance(succ, Job) and succ.num not in by_num and not succ.is_skipped:
+                    succ.skip("Skipped dependency")
+
+        # chains of finished jobs lead into the jobs that are still to run
+        finished_set = set(finished)
+        finish_time = {}
+        for node in netx.topological_sort(graph):
+            start = max((finish_time[p] for p in graph.predecessors(node)), default=0.0)
+            if node in finished_set:
+                duration = float(by_num[node.num].get("duration", 0.0))
+                self._finished_job_seconds += duration
+                self._finished_core_seconds += duration * node.required_cores
+                finish_time[node] = start + duration
+            else:
+                finish_time[node] = start
+                if start > 0.0:
+                    self._finished_chain[node] = start
+        self._finished_critical_path = max(finish_time.values(), default=0.0)
+
+        graph.remove_nodes_from(finished)
+        return graph
+
     def _get_ready_jobs(self):
         """
         Find jobs whose dependencies are completed and are still waiting.
@@ -288,26 +390,35 @@ class Scheduler:
                 predecessors = list(self._graph.predecessors(job))
                 if all(dep.status == Job.FINISHED for dep in predecessors):
                     ready_jobs.append(job)
+                    if isinstance(job, Job):
+                        self._ready_time.setdefault(job.num, time.perf_counter())
+                        self._tracer.job_ready(job)
         if self._priority_job_nums:
             ready_jobs.sort(key=lambda job: job.num not in self._priority_job_nums)
         return ready_jobs
 
     def _schedule_next_job(self):
+        start = self._tracer.now()
+        n_started = 0
         with self._lock:
             ready_jobs = self._get_ready_jobs()
             for job in ready_jobs:
                 if job.is_skipped:
                     job.skip_process()
+                    self._tracer.job_skipped(job)
+                    self._compressor.submit(job.log_path)
                     ui.status_line(job, "SKIP", self._max_num_width, self._max_label_len)
                     self._n_skipped = self._n_skipped + 1
+                    if self._on_job_done:
+                        self._on_job_done(job)
                     continue
 
                 if isinstance(job, JobJoiner):
                     job.start()
                 else:
                     required = job.required_cores
-                    if self._resources.available_cores >= required:
-                        self._resources.allocate_cores(required)
+                    if self._resources.can_allocate(required, job.multi_host):
+                        job.hosts = self._resources.allocate_cores(required, job.multi_host)
                         self._active_jobs.add(job)
                         job_name = ui.job_name_markup(job.name)
                         task_id = self._progress.add_task(
@@ -315,12 +426,19 @@ class Scheduler:
                             total=job.num_steps,
                         )
                         self._tasks[job.num] = task_id
+                        now = time.perf_counter()
+                        self._queue_wait += now - self._ready_time.pop(job.num, now)
+                        self._job_start_time[job.num] = now
+                        self._tracer.job_started(job, required)
                         job.start()
+                        n_started += 1
                         ui.status_line(job, "STARTING", self._max_num_width, self._max_label_len)
+        self._tracer.scheduler_pass(start, n_started)
         self._progress.refresh()
 
     def _job_completed(self, job):
         assert isinstance(job, Job)
+        self._tracer.job_finished(job)
 
         self._progress.refresh()
         time.sleep(0.25)
@@ -337,8 +455,75 @@ class Scheduler:
             task_id = self._tasks[job.num]
             self._progress.remove_task(task_id)
             del self._tasks[job.num]
-            self._resources.free_cores(job.required_cores)
+            self._resources.free_cores(job.required_cores, job.hosts)
             self._progress.update(self._total_task_id, advance=1)
+            self._compressor.submit(job.log_path)
+            if self._on_job_done:
+                self._on_job_done(job)
+
+    def _compute_metrics(self, runtime: float) -> RunMetrics:
+        """
+        @param runtime Time since the run started (including the time before it was resumed)
+        """
+        now = time.perf_counter()
+
+        def job_time(job):
+            # running jobs count with the time they have run so far
+            if job.status == Job.RUNNING and job.num in self._job_start_time:
+                return now - self._job_start_time[job.num]
+            return job.elapsed_time
+
+        jobs = [job for job in self._graph.nodes if isinstance(job, Job)]
+        # longest chain of dependent jobs, by the time they took
+        finish_time = {}
+        for job in netx.topological_sort(self._graph):
+            start = max((finish_time[dep] for dep in self._graph.predecessors(job)), default=0.0)
+            start = max(start, self._finished_chain.get(job, 0.0))
+            finish_time[job] = start + (job_time(job) if isinstance(job, Job) else 0.0)
+        return RunMetrics(
+            cores=self._resources.total_cores,
+            runtime=runtime,
+            job_seconds=self._finished_job_seconds + sum(job_time(job) for job in jobs),
+            core_seconds=self._finished_core_seconds
+            + sum(job_time(job) * job.required_cores for job in jobs),
+            core_seconds_available=self._resources.total_cores * runtime,
+            queue_wait=self._queue_wait,
+            critical_path=max(self._finished_critical_path, max(finish_time.values(), default=0.0)),
+        )
+
+    def _metrics_snapshot(self) -> RunSnapshot:
+        """
+        Get state of the run for exporting metrics
+        """
+        with self._lock:
+            counts = {"success": 0, "failed": 0, "skipped": 0, "running": 0, "waiting": 0}
+            samples = []
+            for job in self._graph.nodes:
+                if not isinstance(job, Job):
+                    continue
+                if job.status == Job.WAITING:
+                    counts["waiting"] += 1
+                elif job.status == Job.RUNNING:
+                    counts["running"] += 1
+                else:
+                    if job.is_skipped:
+                        status = "skipped"
+                    elif job.return_code == 0:
+                        status = "success"
+                    else:
+                        status = "failed"
+                    counts[status] += 1
+                    samples.append(
+                        JobSample(str(job.spec.file_name), job.name, status, job.elapsed_time)
+                    )
+            finished = self._metrics is not None
+            if finished:
+                metrics = self._metrics
+            else:
+                metrics = self._compute_metrics(
+                    self._previous_runtime + time.perf_counter() - self._run_start_time
+                )
+        return RunSnapshot(self._out_dir.name, counts, metrics, samples, finished)
 
     def _check_for_cycles(self):
         """
@@ -360,7 +545,7 @@ class Scheduler:
         sources = [node for node in self._graph.nodes if self._graph.in_degree(node) == 0]
         for source in sources:
             for job in netx.dfs_tree(self._graph, source=source):
-                if job.required_cores > self._resources.total_cores:
+                if job.required_cores > self._resources.max_job_cores(job.multi_host):
                     job.skip(f"Job too big (requires {job.required_cores} cores)")
 
     def _skip_if_skipped_dependencies(self):
@@ -385,10 +570,12 @@ class Scheduler:
         return 0
 
     def _on_step_start(self, job, step):
+        self._tracer.step_started(job, step)
         self._progress.refresh()
 
     def _on_step_finish(self, job, step):
         assert isinstance(job, Job)
+        self._tracer.step_finished(job, step)
 
         job_task_num = self._tasks[job.num]
         self._progress.update(job_task_num, advance=1)
@@ -0,0 +1,242 @@
+import heapq
+import json
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+
+# Track with scheduler activity
+SCHEDULER_TID = 0
+
+
+def _now() -> int:
+    """
+    Current time in microseconds. Wall clock, so that traces of processes that ran
+    concurrently (i.e. batch tasks) line up.
+    """
+    return time.time_ns() // 1000
+
+
+class Tracer:
+    """
+    Records what happens during a run as Chrome Trace Events
+
+    Each core gets its own track ("core lane") and a job occupies as many lanes as it has
+    cores allocated. Jobs and their steps are drawn on the lanes they occupy, scheduler
+    passes on a separate track and the time jobs wait for free cores as async spans.
+    The result can be viewed in https://ui.perfetto.dev or chrome://tracing.
+    """
+
+    def __init__(self, n_lanes: int):
+        """
+        @param n_lanes Number of cores
+        """
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._free_lanes = list(range(n_lanes))
+        self._job_lanes = {}
+        self._job_start = {}
+        self._step_start = {}
+        self._ready_time = {}
+        self._events = [
+            self._meta("process_name", None, f"kuristo ({socket.gethostname()}:{self._pid})"),
+            self._meta("thread_name", SCHEDULER_TID, "scheduler"),
+        ]
+        self._events += [
+            self._meta("thread_name", lane + 1, f"core {lane}") for lane in range(n_lanes)
+        ]
+
+    @property
+    def events(self):
+        return self._events
+
+    def now(self) -> int:
+        return _now()
+
+    def job_ready(self, job):
+        """
+        Job has all its dependencies satisfied and waits for cores
+        """
+        with self._lock:
+            if job.num not in self._ready_time:
+                self._ready_time[job.num] = _now()
+
+    def job_started(self, job, n_cores: int):
+        with self._lock:
+            now = _now()
+            ready = self._ready_time.get(job.num, now)
+            args = {"job": job.num}
+            self._events.append(self._async("b", job, ready, args))
+            self._events.append(self._async("e", job, now, args))
+            lanes = [
+                heapq.heappop(self._free_lanes) for _ in range(min(n_cores, len(self._free_lanes)))
+            ]
+            self._job_lanes[job.num] = lanes
+            self._job_start[job.num] = now
+
+    def job_finished(self, job):
+        with self._lock:
+            start = self._job_start.pop(job.num, None)
+            lanes = self._job_lanes.pop(job.num, [])
+            if start is None:
+                return
+            args = {"job": job.num, "return-code": job.return_code}
+            for lane in lanes:
+                self._events.append(self._span(job.name, "job", lane + 1, start, _now(), args))
+                heapq.heappush(self._free_lanes, lane)
+
+    def job_skipped(self, job):
+        with self._lock:
+            self._events.append(
+                {
+                    "name": f"skip {job.name}",
+                    "cat": "job",
+                    "ph": "i",
+                    "s": "t",
+                    "ts": _now(),
+                    "pid": self._pid,
+                    "tid": SCHEDULER_TID,
+                    "args": {"job": job.num, "reason": job.skip_reason},
+                }
+            )
+
+    def step_started(self, job, step):
+        with self._lock:
+            self._step_start[(job.num, id(step))] = _now()
+
+    def step_finished(self, job, step):
+        with self._lock:
+            start = self._step_start.pop((job.num, id(step)), None)
+            if start is None:
+                return
+            end = _now()
+            for lane in self._job_lanes.get(job.num, []):
+                self._events.append(
+                    self._span(step.name, "step", lane + 1, start, end, {"job": job.num})
+                )
+
+    def scheduler_pass(self, start: int, n_started: int):
+        """
+        Scheduler looked for jobs to start
+
+        @param start When the pass started
+        @param n_started Number of jobs started
+        """
+        with self._lock:
+            self._events.append(
+                self._span(
+                    "schedule", "scheduler", SCHEDULER_TID, start, _now(), {"started": n_started}
+                )
+            )
+
+    def write(self, run_dir: Path):
+        """
+        Store recorded events in the run directory
+        """
+        path = run_dir / f"trace-{socket.gethostname()}-{self._pid}.jsonl"
+        with self._lock:
+            data = "".join(json.dumps(e) + "\n" for e in self._events)
+        with open(path, "a") as f:
+            f.write(data)
+
+    def _span(self, name, cat, tid, start, end, args):
+        return {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": start,
+            "dur": max(end - start, 0),
+            "pid": self._pid,
+            "tid": tid,
+            "args": args,
+        }
+
+    def _async(self, ph, job, ts, args):
+        return {
+            "name": f"wait {job.name}",
+            "cat": "wait",
+            "ph": ph,
+            "id": job.num,
+            "ts": ts,
+            "pid": self._pid,
+            "tid": SCHEDULER_TID,
+            "args": args,
+        }
+
+    def _meta(self, name, tid, value):
+        event = {"name": name, "ph": "M", "pid": self._pid, "args": {"name": value}}
+        if tid is not None:
+            event["tid"] = tid
+        return event
+
+
+class NullTracer:
+    """
+    Tracer used when tracing is off, records nothing
+    """
+
+    events = []
+
+    def now(self) -> int:
+        return 0
+
+    def job_ready(self, job):
+        pass
+
+    def job_started(self, job, n_cores: int):
+        pass
+
+    def job_finished(self, job):
+        pass
+
+    def job_skipped(self, job):
+        pass
+
+    def step_started(self, job, step):
+        pass
+
+    def step_finished(self, job, step):
+        pass
+
+    def scheduler_pass(self, start: int, n_started: int):
+        pass
+
+    def write(self, run_dir: Path):
+        pass
+
+
+def has_trace(run_dir: Path) -> bool:
+    """
+    Check if a timeline was recorded for a run
+    """
+    return any(run_dir.glob("trace-*.jsonl"))
+
+
+def read_events(run_dir: Path) -> list[dict]:
+    """
+    Read trace events recorded in a run directory
+    """
+    events = []
+    for path in sorted(run_dir.glob("trace-*.jsonl")):
+        with open(path) as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return events
+
+
+def export(run_dir: Path, path: Path) -> int:
+    """
+    Write trace of a run in Chrome Trace Event format
+
+    @param run_dir Run output directory
+    @param path Output file
+    @return Number of exported events
+    """
+    events = read_events(run_dir)
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return len(events)
@@ -5,6 +5,7 @@ from rich.text import Text
 
 import kuristo.config as config
 from kuristo.job import Job, JobJoiner
+from kuristo.metrics import RunMetrics
 from kuristo.utils import human_time
 
 _console_instance = None
@@ -90,6 +91,18 @@ def status_line(job, state, max_id_width, max_label_len):
         consol.print(Text.from_markup(markup))
 
 
+def needs_outside_selection(outside: list[tuple[str, str]]):
+    consol = console()
+
+    for file_name, dep in outside:
+        consol.print(
+            f"{file_name}: Workflow dependency '{dep}' is outside the selected "
+            "locations, not waiting for it",
+            style="yellow",
+            markup=False,
+        )
+
+
 def line(width: int):
     consol = console()
 
@@ -119,6 +132,21 @@ def time(elapsed_time: float):
     consol.print(Text.from_markup(markup))
 
 
+def metrics(metrics: RunMetrics):
+    consol = console()
+
+    consol.print(
+        Text.from_markup(
+            f"[grey46]Cores:[/] {metrics.cores}     "
+            f"[grey46]Utilisation:[/] {metrics.utilisation:.0%}     "
+            f"[grey46]Parallelism:[/] {metrics.parallelism:.1f} "
+            f"[grey46](max {metrics.max_parallelism:.1f})[/]     "
+            f"[grey46]Queue wait:[/] {human_time(metrics.queue_wait)}     "
+            f"[grey46]Critical path:[/] {human_time(metrics.critical_path)}"
+        )
+    )
+
+
 def job_header_line(job_id, width: int):
     consol = console()
 
@@ -1,3 +1,4 @@
+import json
 import os
 import re
 import shlex
@@ -10,7 +11,9 @@ from pathlib import Path
 import yaml
 from jinja2 import Template
 
+import kuristo.compression as compression
 from kuristo.exceptions import UserException
+from kuristo.metrics import RunMetrics
 from kuristo.workflow import JobSpec
 
 RUN_DIR_PATTERN = re.compile(r"\d{8}-\d{6}")
@@ -282,6 +285,57 @@ def minutes_to_hhmmss(minutes: int) -> str:
     return f"{hours:0d}:{mins:02d}:{seconds:02d}"
 
 
+def check_threads_per_proc(value, step_name):
+    """
+    Check number of threads per process of a step
+
+    @param value Number of threads per process (`None` if not specified)
+    @param step_name Name of the step, for the error message
+    @return `value`
+    """
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise UserException(
+            f"Invalid threads-per-proc '{value}' in step '{step_name}'. Use an integer >= 1."
+        )
+    return value
+
+
+def parse_size(value) -> int | None:
+    """
+    Convert size into number of bytes
+
+    @param value Number of bytes or size with a unit (i.e. `512K`, `10M`, `1G`)
+    @return Number of bytes or `None` if `value` is `None`
+    """
+    if value is None:
+        return None
+    # YAML turns `yes`/`true` into a bool, which is an int in Python
+    if isinstance(value, bool):
+        raise UserException(f"Invalid size '{value}'. Use i.e. 512K, 10M or 1G.")
+    if isinstance(value, int):
+        return value
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?)B?\s*", str(value), re.IGNORECASE)
+    if m is None:
+        raise UserException(f"Invalid size '{value}'. Use i.e. 512K, 10M or 1G.")
+    return int(float(m[1]) * 1024 ** "_KMG".index(m[2].upper() or "_"))
+
+
+def step_durations(steps: list[dict]) -> dict[str, float]:
+    """
+    Get durations of steps recorded in a job result
+
+    @param steps Steps of a job result
+    @return Mapping of step name to duration [s], steps with the same name are added up
+    """
+    durations = {}
+    for step in steps:
+        name = step.get("name", "")
+        durations[name] = durations.get(name, 0.0) + float(step.get("duration", 0.0))
+    return durations
+
+
 def human_time(seconds: float) -> str:
     """
     Convert time to human form
@@ -302,11 +356,236 @@ def human_time(seconds: float) -> str:
     return " ".join(parts)
 
 
+def human_size(n_bytes: int) -> str:
+    """
+    Convert number of bytes to human form
+
+    @param n_bytes Number of bytes
+    @return <N> B, <N.N> KiB, <N.N> MiB, ...
+    """
+    size = float(n_bytes)
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024 or unit == "GiB":
+            break
+        size /= 1024
+    if unit == "B":
+        return f"{int(size)} B"
+    return f"{size:.1f} {unit}"
+
+
+# libyaml based dumper is much faster on large reports
+_YamlDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
 def read_report(path):
     with open(path, "r") as f:
         return yaml.safe_load(f)
 
 
+def write_report_yaml(yaml_path: Path, results, total_runtime, metrics: dict | None = None):
+    from kuristo import __version__
+
+    report = {"version": __version__, "results": results, "total-runtime": total_runtime}
+    if metrics is not None:
+        report["metrics"] = metrics
+    with open(yaml_path, "w") as f:
+        yaml.dump(
+            report,
+            f,
+            Dumper=_YamlDumper,
+            sort_keys=False,
+        )
+
+
+def write_result_fragment(
+    run_dir: Path, name: str, results, total_runtime, metrics: dict | None = None
+):
+    """
+    Write results of a part of a run (i.e. a batch task) into its own fragment file.
+    Fragments are written atomically, so readers never see a partial file.
+
+    @param run_dir Run output directory
+    @param name Unique name of the fragment
+    @param results Results to write
+    @param total_runtime Runtime of this part of the run
+    @param metrics Core utilisation of this part of the run
+    """
+    fragments_dir = run_dir / "results"
+    fragments_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = fragments_dir / f".{name}.tmp"
+    write_report_yaml(tmp_path, results, total_runtime, metrics)
+    os.replace(tmp_path, fragments_dir / f"{name}.yaml")
+
+
+def merge_result_fragments(run_dir: Path):
+    """
+    Merge result fragments of a run into its `report.yaml`.
+    The merged report is kept and rebuilt only when the set of fragments changes. Which
+    fragments were merged is recorded in a manifest next to the report; fragment
+    modification times alone can not be relied on, because a fragment keeps the time it
+    was written at when it is moved into place.
+
+    @param run_dir Run output directory
+    """
+    fragments_dir = run_dir / "results"
+    if not fragments_dir.is_dir():
+        return
+    fragments = list(fragments_dir.glob("*.yaml"))
+    if not fragments:
+        return
+
+    manifest = {}
+    for f in fragments:
+        st = f.stat()
+        manifest[f.name] = [st.st_mtime_ns, st.st_size]
+    report_path = run_dir / "report.yaml"
+    manifest_path = run_dir / ".report-fragments.json"
+    if report_path.exists() and _read_json(manifest_path) == manifest:
+        return
+
+    results = []
+    total_runtime = 0.0
+    fragment_metrics = []
+    for f in fragments:
+        fragment = read_report(f) or {}
+        results.extend(fragment.get("results", []))
+        # fragments run concurrently, so the longest one determines the runtime
+        runtime = fragment.get("total-runtime", 0.0)
+        total_runtime = max(total_runtime, runtime)
+        if "metrics" in fragment:
+            fragment_metrics.append(RunMetrics.from_dict(fragment["metrics"], runtime))
+    results.sort(key=lambda r: r["id"])
+    run_metrics = None
+    if fragment_metrics:
+        run_metrics = RunMetrics.merge(fragment_metrics, total_runtime).to_dict()
+
+    tmp_path = run_dir / f".report.{os.getpid()}.tmp"
+    write_report_yaml(tmp_path, results, total_runtime, run_metrics)
+    os.replace(tmp_path, report_path)
+    # the manifest lists what was there before merging, so fragments that show up
+    # while we were merging trigger another merge
+    tmp_path = run_dir / f".report-fragments.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+
+def _read_json(path: Path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_run_info(run_dir: Path, info: dict):
+    """
+    Write information about how a run was started (`run.yaml`)
+
+    @param run_dir Run output directory
+    @param info Locations, labels and number of jobs of the run
+    """
+    with open(run_dir / "run.yaml", "w") as f:
+        yaml.safe_dump(info, f, sort_keys=False)
+
+
+def read_run_info(run_dir: Path) -> dict | None:
+    """
+    Read information about how a run was started
+
+    @param run_dir Run output directory
+    @return Run information or `None` if the run did not record any
+    """
+    try:
+        with open(run_dir / "run.yaml", "r") as f:
+            return yaml.safe_load(f)
+    except FileNotFoundError:
+        return None
+
+
+def append_journal(run_dir: Path, result: dict):
+    """
+    Append a job result to the run's journal. The record is flushed to disk right away,
+    so it survives the run being killed.
+
+    @param run_dir Run output directory
+    @param result Result of a finished job
+    """
+    with open(run_dir / "journal.jsonl", "a") as f:
+        f.write(json.dumps(result) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def truncate_journal(run_dir: Path):
+    """
+    Drop a record that was cut off at the end of the run's journal, so that records
+    appended later start on their own line
+
+    @param run_dir Run output directory
+    """
+    path = run_dir / "journal.jsonl"
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return
+    end = data.rfind(b"\n") + 1
+    if end < len(data):
+        with open(path, "r+b") as f:
+            f.truncate(end)
+
+
+def read_journal(run_dir: Path) -> list[dict]:
+    """
+    Read job results from the run's journal. A record that was cut off (i.e. by the run
+    being killed while writing it) is ignored. If a job is recorded more than once,
+    the last record wins.
+
+    @param run_dir Run output directory
+    @return Results ordered by job ID
+    """
+    results = {}
+    try:
+        with open(run_dir / "journal.jsonl", "r") as f:
+            for line in f:
+                try:
+                    r = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                results[r["id"]] = r
+    except FileNotFoundError:
+        return []
+    return [results[k] for k in sorted(results)]
+
+
+def job_log_path(run_dir: Path, num: int, structured: bool | None = None) -> Path:
+    """
+    Get path to the log file of a job
+
+    @param run_dir Run output directory
+    @param num Job number
+    @param structured Whether the log is structured (JSON Lines). If `None`, the log file
+           that exists (possibly compressed) is returned (text log if there is none).
+    """
+    jsonl_path = run_dir / f"job-{num}.jsonl"
+    log_path = run_dir / f"job-{num}.log"
+    if structured:
+        return jsonl_path
+    if structured is None:
+        found = compression.find(jsonl_path) or compression.find(log_path)
+        if found is not None:
+            return found
+    return log_path
+
+
+def job_log_index_path(log_path: Path) -> Path:
+    """
+    Get path to the index of step offsets of a structured job log
+    """
+    log_path = compression.strip_suffix(log_path)
+    return log_path.with_name(f"{log_path.stem}.index.json")
+
+
 def build_filters(args):
     filters = []
     if args.failed:
@@ -3,6 +3,7 @@ from itertools import product
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Union
 
+import networkx as netx
 import yaml
 from pydantic import BaseModel, Field, PrivateAttr, ValidationError, model_validator
 
@@ -90,8 +91,12 @@ class Step(BaseModel):
     continue_on_error: bool = Field(alias="continue-on-error", default=False)
     # Number of cores
     num_cores: int = Field(alias="num-cores", default=1)
+    # Number of threads each process spawns (i.e. OpenMP threads)
+    threads_per_proc: Optional[int] = Field(alias="threads-per-proc", default=None)
     # Environment for this step
     env: Optional[dict] = Field(default={})
+    # Maximum size of output that is kept (i.e. 10M)
+    max_output: Optional[Union[int, str]] = Field(alias="max-output", default=None)
 
     @property
     def params(self):
@@ -137,6 +142,8 @@ class JobSpec(BaseModel):
     labels: Optional[List[str]] = None
     # Working directory
     _work_dir: str = PrivateAttr("")
+    # Maximum size of output of each step that is kept (i.e. 10M)
+    max_output: Optional[Union[int, str]] = Field(alias="max-output", default=None)
 
     @property
     def id(self):
@@ -237,11 +244,22 @@ class Workflow(BaseModel):
     description: str = ""
     # Job steps
     jobs: Dict[str, JobSpec]
+    # Workflows (names or paths relative to this file) that must finish before this one
+    needs_: Optional[Union[str, List[str]]] = Field(alias="needs", default=None)
 
     _file_name: str = PrivateAttr()
 
     model_config = {"populate_by_name": True}
 
+    @property
+    def needs(self) -> List[str]:
+        if self.needs_ is None:
+            return []
+        elif isinstance(self.needs_, str):
+            return [self.needs_]
+        else:
+            return self.needs_
+
     @property
     def file_name(self):
         """
@@ -298,6 +316,80 @@ def workflow_from_file(file_path: Path) -> Workflow | None:
             return None
 
 
+def resolve_workflow_needs(
+    workflows: list[Workflow],
+) -> tuple[dict[int, list[int]], list[tuple[str, str]]]:
+    """
+    Resolve dependencies between workflows
+
+    A dependency is either a workflow name or a path (relative to the workflow file) to a
+    workflow file or to a directory containing exactly one of the workflow files.
+    A path to a workflow that exists but is not among `workflows` (i.e. outside the scanned
+    locations) is returned separately and not waited for.
+
+    @param workflows: List of workflows
+    @return: Mapping of workflow index to indices of workflows it needs and the
+             (workflow file, dependency) pairs that are outside the selection
+    """
+    by_name = {}
+    by_file = {}
+    by_dir = {}
+    for i, wf in enumerate(workflows):
+        if wf.name:
+            by_name.setdefault(wf.name, []).append(i)
+        path = Path(wf.file_name).resolve()
+        by_file[path] = i
+        by_dir.setdefault(path.parent, []).append(i)
+
+    needs = {}
+    outside = []
+    for i, wf in enumerate(workflows):
+        deps = []
+        for dep in wf.needs:
+            if dep in by_name:
+                candidates = by_name[dep]
+            else:
+                path = (Path(wf.file_name).resolve().parent / dep).resolve()
+                if path in by_file:
+                    candidates = [by_file[path]]
+                else:
+                    candidates = by_dir.get(path, [])
+            if len(candidates) == 0 and path.exists():
+                outside.append((str(wf.file_name), dep))
+                continue
+            if len(candidates) == 0:
+                raise UserException(f"{wf.file_name}: Workflow depends on unknown workflow '{dep}'")
+            if len(candidates) > 1:
+                raise UserException(f"{wf.file_name}: Workflow dependency '{dep}' is ambiguous")
+            deps.append(candidates[0])
+        needs[i] = deps
+    return needs, outside
+
+
+def order_workflows(
+    workflows: list[Workflow],
+) -> tuple[list[int], dict[int, list[int]], list[tuple[str, str]]]:
+    """
+    Order workflows so that every workflow comes after the workflows it needs.
+    Workflows keep their original order where possible.
+
+    @param workflows: List of workflows
+    @return: Workflow indices in dependency order, the resolved dependencies and the
+             dependencies outside the selection
+    """
+    needs, outside = resolve_workflow_needs(workflows)
+    graph = netx.DiGraph()
+    graph.add_nodes_from(needs.keys())
+    for i, deps in needs.items():
+        for d in deps:
+            graph.add_edge(d, i)
+    try:
+        order = list(netx.lexicographical_topological_sort(graph))
+    except netx.NetworkXUnfeasible:
+        raise UserException("Dependencies between workflows form a cycle")
+    return order, needs, outside
+
+
 def get_job_ids_for_labels(workflows: list[Workflow], labels: list[str]) -> set[str]:
     """
     Find all job IDs that match any of the given labels, including their transitive dependencies.
@@ -15,6 +15,7 @@ class DummyStep:
         timeout_minutes=5,
         continue_on_error=False,
         num_cores=1,
+        threads_per_proc=None,
         run=None,
         uses=None,
         params=None,
@@ -25,6 +26,7 @@ class DummyStep:
         self.timeout_minutes = timeout_minutes
         self.continue_on_error = continue_on_error
         self.num_cores = num_cores
+        self.threads_per_proc = threads_per_proc
         self.run = run
         self.uses = uses
         self.params = params or {}
@@ -49,6 +51,7 @@ def test_create_shell_action_when_uses_is_none(dummy_context):
         timeout_minutes=ts.timeout_minutes,
         continue_on_error=False,
         num_cores=1,
+        threads_per_proc=None,
         commands=ts.run,
         env={},
     )
@@ -80,3 +83,30 @@ def test_create_unknown_action_raises(dummy_context):
         with pytest.raises(UserException) as excinfo:
             ActionFactory.create(ts, dummy_context)
     assert "unknown.action" in str(excinfo.value)
+
+
+def test_registered_action_gets_threads_per_proc(dummy_context):
+    ts = DummyStep(uses="custom.action", threads_per_proc=4)
+
+    mock_action_cls = MagicMock()
+    with patch("kuristo.action_factory.get_action", return_value=mock_action_cls):
+        ActionFactory.create(ts, dummy_context)
+
+    assert mock_action_cls.call_args.kwargs["threads_per_proc"] == 4
+
+
+def test_mpi_action_uses_step_threads_per_proc():
+    ts = DummyStep(uses="core/mpi-run", threads_per_proc=2, params={"num-procs": 3, "run": "x"})
+    context = MagicMock(vars={})
+
+    action = ActionFactory.create(ts, context)
+
+    assert action.threads_per_proc == 2
+    assert action.num_cores == 6
+
+
+@pytest.mark.parametrize("value", [0, -1, 1.5, True, "2"])
+def test_invalid_threads_per_proc_raises(dummy_context, value):
+    ts = DummyStep(run="echo hi", threads_per_proc=value)
+    with pytest.raises(UserException, match="Invalid threads-per-proc"):
+        ActionFactory.create(ts, dummy_context)
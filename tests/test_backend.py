@@ -17,3 +17,8 @@ def test_get_backend_none():
 def test_get_backend_invalid():
     with pytest.raises(UserException):
         get_backend("invalid_backend")
+
+
+def test_get_backend_local():
+    backend = get_backend("local")
+    assert backend.name == "local"
@@ -0,0 +1,118 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+from kuristo.batch.backend import ScriptParameters
+from kuristo.batch.local import LocalBackend, run_worker
+
+
+def make_backend(tmp_path, capacity=2):
+    return LocalBackend(queue_dir=tmp_path / "queue", capacity=capacity, spawn=False)
+
+
+def test_local_submit_and_run(tmp_path):
+    backend = make_backend(tmp_path)
+    job1 = backend.enqueue("echo one", 1)
+    job2 = backend.enqueue("exit 3", 1)
+    assert job1 == "1"
+    assert job2 == "2"
+    assert backend.status(job1) == "PENDING"
+    assert backend.is_active(backend.status(job1))
+
+    run_worker(backend.queue_dir, 2)
+
+    assert backend.status(job1) == "COMPLETED"
+    assert backend.status(job2) == "FAILED"
+    assert not backend.is_active(backend.status(job1))
+    assert (backend.queue_dir / "000001" / "output").read_text().strip() == "one"
+
+
+def test_local_array_tasks(tmp_path):
+    backend = make_backend(tmp_path)
+    job_id = backend.enqueue("echo $KURISTO_ARRAY_TASK_ID $KURISTO_NUM_CORES", 1, 3)
+    run_worker(backend.queue_dir, 2)
+
+    assert backend.status(job_id) == "COMPLETED"
+    outputs = sorted((d / "output").read_text().strip() for d in backend.queue_dir.glob("000001_*"))
+    assert outputs == ["0 1", "1 1", "2 1"]
+
+
+def test_local_capacity(tmp_path):
+    backend = make_backend(tmp_path)
+    log = tmp_path / "log"
+    script = f"echo start >> {log}; sleep 0.5; echo end >> {log}"
+    backend.enqueue(script, 2)
+    backend.enqueue(script, 2)
+    run_worker(backend.queue_dir, 2)
+
+    # the second job must not start before the first one finished
+    assert log.read_text().split() == ["start", "end", "start", "end"]
+
+
+def test_local_cancel_pending(tmp_path):
+    backend = make_backend(tmp_path)
+    job_id = backend.enqueue(f"touch {tmp_path / 'ran'}", 1)
+    backend.cancel(job_id)
+    assert backend.status(job_id) == "CANCELLED"
+
+    run_worker(backend.queue_dir, 2)
+    assert backend.status(job_id) == "CANCELLED"
+    assert not (tmp_path / "ran").exists()
+
+
+def test_local_cancel_running(tmp_path):
+    backend = make_backend(tmp_path)
+    job_id = backend.enqueue("sleep 30", 1)
+    worker = threading.Thread(target=run_worker, args=(backend.queue_dir, 2))
+    worker.start()
+    entry = backend.queue_dir / "000001"
+    while not (entry / "pid").exists():
+        time.sleep(0.05)
+    backend.cancel(job_id)
+    worker.join(timeout=10)
+
+    assert not worker.is_alive()
+    assert backend.status(job_id) == "CANCELLED"
+
+
+def test_local_dependencies(tmp_path):
+    backend = make_backend(tmp_path)
+    log = tmp_path / "log"
+    array_id = backend.enqueue(f"sleep 0.3; echo setup $KURISTO_ARRAY_TASK_ID >> {log}", 1, 2)
+    after_id = backend.enqueue(f"echo after >> {log}", 1, needs=[f"{array_id}_1"])
+    failed_id = backend.enqueue("exit 1", 1)
+    never_id = backend.enqueue(f"echo never >> {log}", 1, needs=[failed_id])
+    run_worker(backend.queue_dir, 4)
+
+    assert log.read_text().split()[-1] == "after"
+    assert backend.status(after_id) == "COMPLETED"
+    assert backend.status(never_id) == "CANCELLED"
+    assert "never" not in log.read_text()
+
+
+def test_local_status_unknown(tmp_path):
+    backend = make_backend(tmp_path)
+    assert backend.status("7") == "UNKNOWN"
+
+
+def test_local_render_array_script(tmp_path):
+    backend = make_backend(tmp_path)
+    params = ScriptParameters(
+        run_id="20250101-000000",
+        first_job_num=1,
+        workflow_file=None,
+        name="kuristo-array",
+        work_dir=Path("/tmp/run"),
+        n_cores=4,
+        max_time=30,
+        array_size=5,
+        array_offset=10,
+    )
+    script = backend._render_job_script(params)
+    assert "TASK=$(( 10 + KURISTO_ARRAY_TASK_ID ))" in script
+    assert (
+        f"{sys.executable} -m kuristo --no-ansi batch run 20250101-000000 --task ${{TASK}}"
+        in script
+    )
+    assert "#SBATCH" not in script
@@ -1,3 +1,5 @@
+import os
+import shutil
 import unittest
 from pathlib import Path
 from unittest.mock import MagicMock, patch
@@ -30,6 +32,31 @@ class TestSlurmBackend(unittest.TestCase):
         script_path = Path("test_dir/slurm_job.sh")
         self.assertTrue(script_path.exists())
 
+    @patch("subprocess.run")
+    def test_submit_arrays_keep_their_scripts(self, mock_run):
+        mock_run.return_value = MagicMock(returncode=0, stdout="Submitted batch job 1")
+        scripts = []
+        for i in (1, 2):
+            work_dir = Path("test_dir") / f"array-{i}"
+            work_dir.mkdir(exist_ok=True)
+            self.backend.submit(
+                ScriptParameters(
+                    run_id="1",
+                    first_job_num=0,
+                    workflow_file=None,
+                    name=f"kuristo-array-{i}",
+                    work_dir=work_dir,
+                    n_cores=1,
+                    max_time=5,
+                    array_size=1,
+                    array_offset=i - 1,
+                )
+            )
+            scripts.append(mock_run.call_args.args[0][1])
+
+        self.assertEqual(len(set(scripts)), 2)
+        self.assertIn("TASK=$(( 1 + SLURM_ARRAY_TASK_ID ))", Path(scripts[1]).read_text())
+
     @patch("subprocess.run")
     def test_submit_failure(self, mock_run):
         mock_run.return_value = MagicMock(returncode=1, stderr="Something went wrong")
@@ -58,6 +85,103 @@ class TestSlurmBackend(unittest.TestCase):
         self.assertEqual(status, "UNKNOWN")
 
     def tearDown(self):
-        for file in Path("test_dir").glob("*"):
-            file.unlink()
-        Path("test_dir").rmdir()
+        shutil.rmtree("test_dir")
+
+
+class TestSlurmBackendArray(unittest.TestCase):
+    def setUp(self):
+        self.backend = SlurmBackend()
+
+    def test_render_array_script(self):
+        params = ScriptParameters(
+            run_id="20250101-000000",
+            first_job_num=0,
+            workflow_file=None,
+            name="kuristo-array-1",
+            work_dir=Path("/runs/r"),
+            n_cores=2,
+            max_time=30,
+            array_size=5,
+            array_offset=1000,
+        )
+        script = self.backend._render_job_script(params)
+        self.assertIn("#SBATCH --array=0-4", script)
+        self.assertIn("TASK=$(( 1000 + SLURM_ARRAY_TASK_ID ))", script)
+        self.assertIn("batch run 20250101-000000 --task ${TASK}", script)
+        self.assertNotIn("--dependency", script)
+
+    def test_render_dependencies(self):
+        params = ScriptParameters(
+            run_id="20250101-000000",
+            first_job_num=0,
+            workflow_file=None,
+            name="kuristo-array-2",
+            work_dir=Path("/runs/r"),
+            n_cores=2,
+            max_time=30,
+            array_size=1,
+            array_offset=3,
+            dependencies=["100_0", "100_2"],
+        )
+        script = self.backend._render_job_script(params)
+        self.assertIn("#SBATCH --dependency=afterok:100_0:100_2", script)
+
+    @patch("subprocess.run")
+    def test_status_array_mixed(self, mock_run):
+        mock_run.return_value = MagicMock(returncode=0, stdout="RUNNING\nPENDING\nRUNNING\n")
+        status = self.backend.status("123456")
+        self.assertEqual(status, "RUNNING: 2, PENDING: 1")
+
+
+def make_stub(path, name, output, returncode=0):
+    stub = path / name
+    stub.write_text(f"#!/bin/sh\ncat <<'EOF'\n{output}EOF\nexit {returncode}\n")
+    stub.chmod(0o755)
+
+
+def test_status_many_single_query(tmp_path, monkeypatch):
+    make_stub(tmp_path, "squeue", "100_1 RUNNING\n100_[2-3] PENDING\n103 RUNNING\n")
+    make_stub(tmp_path, "sacct", "101|COMPLETED\n102|CANCELLED by 42\n")
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+    backend = SlurmBackend()
+    statuses = backend.status_many(["100", "101", "102", "103", "104"])
+
+    assert statuses == {
+        "100": "RUNNING: 1, PENDING: 1",
+        "101": "COMPLETED",
+        "102": "CANCELLED",
+        "103": "RUNNING",
+        "104": "COMPLETED",
+    }
+    assert backend.is_active(statuses["100"])
+    assert not backend.is_active(statuses["101"])
+
+
+def test_status_many_squeue_failure(tmp_path, monkeypatch):
+    make_stub(tmp_path, "squeue", "", returncode=1)
+    make_stub(tmp_path, "sacct", "", returncode=1)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+    statuses = SlurmBackend().status_many(["100"])
+
+    assert statuses == {"100": "UNKNOWN"}
+
+
+def test_status_many_no_job_in_queue(tmp_path, monkeypatch):
+    # squeue fails with "Invalid job id specified" when it knows none of the jobs
+    make_stub(tmp_path, "squeue", "", returncode=1)
+    make_stub(tmp_path, "sacct", "100|FAILED\n101|COMPLETED\n")
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+    statuses = SlurmBackend().status_many(["100", "101"])
+
+    assert statuses == {"100": "FAILED", "101": "COMPLETED"}
+
+
+def test_status_job_not_in_queue(tmp_path, monkeypatch):
+    make_stub(tmp_path, "squeue", "", returncode=1)
+    make_stub(tmp_path, "sacct", "100|TIMEOUT\n")
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+    assert SlurmBackend().status("100") == "TIMEOUT"
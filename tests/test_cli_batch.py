@@ -1,15 +1,34 @@
+import os
 from pathlib import Path
 from types import SimpleNamespace
 from unittest.mock import ANY, MagicMock, mock_open, patch
 
+import pytest
+import yaml
+
 from kuristo.batch.backend import ScriptParameters
 from kuristo.cli._batch import (
+    anchor_working_directories,
+    batch_cancel,
+    batch_status,
+    batch_submit,
     build_actions,
+    create_array_params,
+    create_bundle_params,
     create_script_params,
+    load_historical_durations,
+    pack_tasks,
+    query_batch_status,
     read_job_metadata,
+    read_task,
     required_cores,
     write_job_metadata,
+    write_task_list,
 )
+from kuristo.exceptions import UserException
+from kuristo.workflow import workflow_from_file
+
+ASSETS_DIR = Path(__file__).parent / "assets"
 
 
 @patch("kuristo.cli._batch.ActionFactory.create")
@@ -178,3 +197,394 @@ def test_read_metadata():
 
     m.assert_called_once_with(fake_path, "r")
     mock_safe_load.assert_called_once()
+
+
+def make_params(n_cores, max_time, first_job_num, workdir, workflow_file="wf.yaml"):
+    return ScriptParameters(
+        run_id="r",
+        first_job_num=first_job_num,
+        workflow_file=Path(workflow_file),
+        name="job",
+        work_dir=workdir,
+        n_cores=n_cores,
+        max_time=max_time,
+    )
+
+
+@patch("kuristo.cli._batch.config.get")
+def test_create_array_params(mock_config_get):
+    mock_config_get.return_value = MagicMock(batch_partition="normal")
+    tasks = [make_params(2, 10, 0, Path("a")), make_params(8, 5, 3, Path("b"))]
+
+    params = create_array_params("kuristo-array-1", "r", tasks, 10, Path("/run"))
+
+    assert params.array_size == 2
+    assert params.array_offset == 10
+    assert params.n_cores == 8
+    assert params.max_time == 10
+    assert params.workflow_file is None
+    assert params.partition == "normal"
+
+
+def test_task_list_roundtrip(tmp_path):
+    tasks = [
+        [make_params(1, 1, 0, tmp_path / "job-1")],
+        [make_params(1, 1, 4, tmp_path / "job-2"), make_params(1, 1, 6, tmp_path / "job-3", "b")],
+    ]
+    write_task_list(tmp_path, tasks, [1, 16])
+
+    task = read_task(tmp_path, 1)
+    assert task["first-job-num"] == 4
+    assert task["num-cores"] == 16
+    assert task["workdirs"] == [str(tmp_path / "job-2"), str(tmp_path / "job-3")]
+    assert task["workflow-files"] == [str(Path("wf.yaml").resolve()), str(Path("b").resolve())]
+
+    with pytest.raises(UserException):
+        read_task(tmp_path, 2)
+
+
+@patch("kuristo.cli._batch.get_backend")
+@patch("kuristo.cli._batch.config.get")
+def test_batch_submit_array(mock_config_get, mock_get_backend, tmp_path):
+    cfg = MagicMock(
+        log_dir=tmp_path / "out",
+        log_history=5,
+        max_output=None,
+        workflow_filename="ktests.yaml",
+        batch_array=True,
+        batch_max_array_size=1,
+        batch_partition=None,
+    )
+    mock_config_get.return_value = cfg
+    backend = MagicMock()
+    backend.name = "fake"
+    backend.submit.side_effect = ["100", "101"]
+    mock_get_backend.return_value = backend
+
+    args = SimpleNamespace(
+        locations=[str(ASSETS_DIR / "tests1")],
+        partition=None,
+        backend=None,
+        no_array=False,
+        pack=False,
+    )
+    batch_submit(args)
+
+    # 2 non-empty workflow files split into arrays with 1 task each
+    assert backend.submit.call_count == 2
+    sizes = [c.args[0].array_size for c in backend.submit.call_args_list]
+    offsets = [c.args[0].array_offset for c in backend.submit.call_args_list]
+    assert sizes == [1, 1]
+    assert offsets == [0, 1]
+    run_dir = next((tmp_path / "out" / "runs").glob("2*"))
+    # each array keeps its job script and output in its own directory
+    work_dirs = [c.args[0].work_dir for c in backend.submit.call_args_list]
+    assert work_dirs == [run_dir / "array-1", run_dir / "array-2"]
+    assert read_job_metadata(run_dir / "array-2" / "metadata.yaml")["job"]["id"] == "101"
+    assert read_task(run_dir, 1)["workdirs"][0].startswith(str(run_dir / "job-"))
+
+
+def test_pack_tasks_first_fit_decreasing():
+    tasks = [
+        make_params(1, 10, 0, Path("a"), "a"),
+        make_params(2, 30, 0, Path("b"), "b"),
+        make_params(4, 10, 0, Path("c"), "c"),
+        make_params(1, 20, 0, Path("d"), "d"),
+    ]
+    # 4 cores x 30 mins = 120 core-minutes per allocation; `c` needs all 4 cores, so it
+    # can not run next to `b` and both would take 40 mins
+    bundles = pack_tasks(tasks, 4, 30, {})
+
+    names = [[t.workflow_file.name for t in b] for b in bundles]
+    assert names == [["b", "d", "a"], ["c"]]
+
+
+def test_pack_tasks_respects_walltime():
+    tasks = [
+        make_params(4, 30, 0, Path("wide"), "wide"),
+        make_params(1, 60, 0, Path("a"), "a"),
+        make_params(1, 60, 0, Path("b"), "b"),
+    ]
+    # fits by core-minutes (240), but the wide task can not overlap the others: 90 mins
+    bundles = pack_tasks(tasks, 4, 60, {})
+
+    names = sorted(sorted(t.workflow_file.name for t in b) for b in bundles)
+    assert names == [["a", "b"], ["wide"]]
+
+
+def test_pack_tasks_uses_historical_durations():
+    tasks = [make_params(4, 60, 0, Path("a"), "a"), make_params(4, 60, 0, Path("b"), "b")]
+    durations = {str(Path("a").resolve()): 300.0, str(Path("b").resolve()): 600.0}
+
+    bundles = pack_tasks(tasks, 4, 30, durations)
+
+    assert len(bundles) == 1
+
+
+def test_pack_tasks_oversized_gets_own_bundle():
+    tasks = [make_params(8, 10, 0, Path("a"), "a"), make_params(1, 100, 0, Path("b"), "b")]
+    bundles = pack_tasks(tasks, 4, 30, {})
+    assert len(bundles) == 2
+
+    params = create_bundle_params(bundles[0], 4, 30)
+    assert params.n_cores in (8, 1)
+
+
+def test_create_bundle_params():
+    bundle = [make_params(1, 10, 3, Path("a"), "a"), make_params(2, 5, 5, Path("b"), "b")]
+    params = create_bundle_params(bundle, 16, 60)
+    assert params.n_cores == 16
+    assert params.max_time == 60
+    assert params.first_job_num == 3
+
+
+def test_load_historical_durations(tmp_path):
+    runs = tmp_path / "runs"
+    for name, duration in [("20250101-000000", 5.0), ("20250102-000000", 7.0)]:
+        (runs / name).mkdir(parents=True)
+        report = {
+            "results": [
+                {"workflow-file": "/wf/a.yaml", "duration": duration},
+                {"workflow-file": "/wf/a.yaml", "duration": 1.0},
+                {"workflow-file": "/wf/b.yaml", "status": "skipped"},
+            ]
+        }
+        (runs / name / "report.yaml").write_text(yaml.safe_dump(report))
+    os.utime(runs / "20250101-000000", (1, 1))
+
+    durations = load_historical_durations(tmp_path)
+
+    assert durations == {"/wf/a.yaml": 8.0}
+
+
+@patch("kuristo.cli._batch.get_backend")
+@patch("kuristo.cli._batch.config.get")
+def test_batch_submit_pack(mock_config_get, mock_get_backend, tmp_path):
+    cfg = MagicMock(
+        log_dir=tmp_path / "out",
+        log_history=5,
+        max_output=None,
+        workflow_filename="ktests.yaml",
+        batch_max_array_size=1000,
+        batch_partition=None,
+    )
+    mock_config_get.return_value = cfg
+    backend = MagicMock()
+    backend.name = "fake"
+    backend.submit.return_value = "100"
+    mock_get_backend.return_value = backend
+
+    args = SimpleNamespace(
+        locations=[str(ASSETS_DIR / "tests1")],
+        partition=None,
+        backend=None,
+        no_array=True,
+        pack=True,
+        pack_cores=8,
+        pack_walltime=240,
+    )
+    batch_submit(args)
+
+    # both workflow files fit into one allocation
+    backend.submit.assert_called_once()
+    params = backend.submit.call_args.args[0]
+    assert params.array_size == 1
+    assert params.n_cores == 8
+    assert params.max_time == 240
+    run_dir = next((tmp_path / "out" / "runs").glob("2*"))
+    task = read_task(run_dir, 0)
+    assert len(task["workflow-files"]) == 2
+    assert task["first-job-num"] == 0
+    # packed workflow files keep their own working directories
+    assert len(set(task["workdirs"])) == 2
+
+
+@patch("kuristo.cli._batch.get_backend")
+def test_query_batch_status_one_query_per_backend(mock_get_backend):
+    backend = MagicMock()
+    backend.status_many.return_value = {"1": "RUNNING", "2": "COMPLETED"}
+    backend.is_active.side_effect = lambda s: s == "RUNNING"
+    mock_get_backend.return_value = backend
+    metadata = [
+        {"job": {"id": 1, "backend": "slurm"}},
+        {"job": {"id": 2, "backend": "slurm"}},
+    ]
+
+    statuses = query_batch_status(metadata)
+
+    backend.status_many.assert_called_once_with(["1", "2"])
+    assert statuses == [("1", "RUNNING", True), ("2", "COMPLETED", False)]
+
+
+@patch("kuristo.cli._batch.time.sleep")
+@patch("kuristo.cli._batch.query_batch_status")
+@patch("kuristo.cli._batch.config.get")
+def test_batch_status_watch_polls_until_done(mock_config_get, mock_query, mock_sleep, tmp_path):
+    latest = tmp_path / "runs" / "latest"
+    (latest / "array-1").mkdir(parents=True)
+    write_job_metadata("7", "slurm", latest / "array-1")
+    mock_config_get.return_value = MagicMock(log_dir=tmp_path, batch_watch_interval=30)
+    mock_query.side_effect = [[("7", "RUNNING", True)], [("7", "COMPLETED", False)]]
+
+    batch_status(SimpleNamespace(watch=True, interval=5))
+
+    assert mock_query.call_count == 2
+    mock_sleep.assert_called_once_with(5)
+
+
+@patch("kuristo.cli._batch.get_backend")
+@patch("kuristo.cli._batch.config.get")
+def test_batch_cancel_active_jobs(mock_config_get, mock_get_backend, tmp_path):
+    latest = tmp_path / "runs" / "latest"
+    for n in (1, 2):
+        (latest / f"job-{n}").mkdir(parents=True)
+        write_job_metadata(str(n), "local", latest / f"job-{n}")
+    mock_config_get.return_value = MagicMock(log_dir=tmp_path)
+    backend = MagicMock()
+    backend.status_many.side_effect = lambda ids: {
+        job_id: "RUNNING" if job_id == "1" else "COMPLETED" for job_id in ids
+    }
+    backend.is_active.side_effect = lambda status: status == "RUNNING"
+    mock_get_backend.return_value = backend
+
+    batch_cancel(SimpleNamespace())
+
+    backend.status_many.assert_called_once()
+    assert sorted(backend.status_many.call_args.args[0]) == ["1", "2"]
+    backend.status.assert_not_called()
+    backend.cancel.assert_called_once_with("1")
+
+
+def write_dependent_workflows(root):
+    for name, needs in (("app", "needs: [../setup]\n"), ("setup", "")):
+        (root / name).mkdir(parents=True)
+        (root / name / "kuristo.yaml").write_text(
+            f"{needs}jobs:\n  {name}:\n    steps:\n      - run: echo {name}\n"
+        )
+
+
+@patch("kuristo.cli._batch.get_backend")
+@patch("kuristo.cli._batch.config.get")
+def test_batch_submit_dependencies(mock_config_get, mock_get_backend, tmp_path):
+    write_dependent_workflows(tmp_path / "src")
+    mock_config_get.return_value = MagicMock(
+        log_dir=tmp_path / "out",
+        log_history=5,
+        max_output=None,
+        workflow_filename="kuristo.yaml",
+        batch_partition=None,
+    )
+    backend = MagicMock()
+    backend.name = "fake"
+    backend.submit.side_effect = ["100", "101"]
+    mock_get_backend.return_value = backend
+
+    args = SimpleNamespace(
+        locations=[str(tmp_path / "src")], partition=None, backend=None, no_array=True, pack=False
+    )
+    batch_submit(args)
+
+    first, second = [c.args[0] for c in backend.submit.call_args_list]
+    assert first.workflow_file.parent.name == "setup"
+    assert first.dependencies == []
+    assert second.workflow_file.parent.name == "app"
+    assert second.dependencies == ["100"]
+
+
+@patch("kuristo.cli._batch.get_backend")
+@patch("kuristo.cli._batch.config.get")
+def test_batch_submit_array_dependencies(mock_config_get, mock_get_backend, tmp_path):
+    write_dependent_workflows(tmp_path / "src")
+    mock_config_get.return_value = MagicMock(
+        log_dir=tmp_path / "out",
+        log_history=5,
+        max_output=None,
+        workflow_filename="kuristo.yaml",
+        batch_array=True,
+        batch_max_array_size=1000,
+        batch_partition=None,
+    )
+    backend = MagicMock()
+    backend.name = "fake"
+    backend.submit.side_effect = ["100", "101"]
+    mock_get_backend.return_value = backend
+
+    args = SimpleNamespace(
+        locations=[str(tmp_path / "src")], partition=None, backend=None, no_array=False, pack=False
+    )
+    batch_submit(args)
+
+    array, dependent = [c.args[0] for c in backend.submit.call_args_list]
+    assert array.array_size == 1
+    assert dependent.array_size == 1
+    assert dependent.array_offset == 1
+    assert dependent.dependencies == ["100_0"]
+    run_dir = next((tmp_path / "out" / "runs").glob("2*"))
+    assert Path(read_task(run_dir, 1)["workflow-files"][0]).parent.name == "app"
+
+
+@patch("kuristo.cli._batch.get_backend")
+@patch("kuristo.cli._batch.config.get")
+def test_batch_submit_pack_dependencies(mock_config_get, mock_get_backend, tmp_path):
+    write_dependent_workflows(tmp_path / "src")
+    (tmp_path / "src" / "other").mkdir()
+    (tmp_path / "src" / "other" / "kuristo.yaml").write_text(
+        "jobs:\n  other:\n    steps:\n      - run: echo other\n"
+    )
+    mock_config_get.return_value = MagicMock(
+        log_dir=tmp_path / "out",
+        log_history=5,
+        max_output=None,
+        workflow_filename="kuristo.yaml",
+        batch_max_array_size=1000,
+        batch_partition=None,
+    )
+    backend = MagicMock()
+    backend.name = "fake"
+    backend.submit.side_effect = ["100", "101"]
+    mock_get_backend.return_value = backend
+
+    args = SimpleNamespace(
+        locations=[str(tmp_path / "src")],
+        partition=None,
+        backend=None,
+        no_array=False,
+        pack=True,
+        pack_cores=8,
+        pack_walltime=240,
+    )
+    batch_submit(args)
+
+    array, dependent = [c.args[0] for c in backend.submit.call_args_list]
+    assert array.array_size == 2
+    assert dependent.dependencies == ["100_1"]
+    run_dir = next((tmp_path / "out" / "runs").glob("2*"))
+    # `app` waits for a task that holds only `setup`, not for the bundle with `other`
+    files = read_task(run_dir, 1)["workflow-files"]
+    assert [Path(f).parent.name for f in files] == ["setup"]
+    files = read_task(run_dir, 0)["workflow-files"]
+    assert [Path(f).parent.name for f in files] == ["other"]
+
+
+def test_anchor_working_directories(tmp_path):
+    wf_file = tmp_path / "kuristo.yaml"
+    wf_file.write_text(
+        "jobs:\n"
+        "  a:\n"
+        "    defaults:\n"
+        "      run:\n"
+        "        working-directory: data\n"
+        "    steps:\n"
+        "      - run: echo a\n"
+        "        working-directory: sub\n"
+        "      - run: echo b\n"
+        "        working-directory: /abs\n"
+        "      - run: echo c\n"
+    )
+    wf = workflow_from_file(wf_file)
+
+    anchor_working_directories(wf, "/run/job-2")
+
+    spec = wf.jobs["a"]
+    assert spec.defaults.run.working_directory == "/run/job-2/data"
+    assert [s.working_directory for s in spec.steps] == ["/run/job-2/sub", "/abs", None]
@@ -5,8 +5,9 @@ from unittest.mock import MagicMock, patch
 import pytest
 from rich.console import Console
 
-from kuristo.cli._diff import diff
+from kuristo.cli._diff import _load_report, diff
 from kuristo.exceptions import UserException
+from kuristo.utils import write_result_fragment
 
 
 # Helper function to create mock report data
@@ -79,7 +80,7 @@ def test_diff_same_reports(
     mock_console_instance = Console(file=output_buffer, no_color=True)
     mock_console.return_value = mock_console_instance
 
-    args = MagicMock(run1="latest", run2="tagA")
+    args = MagicMock(run1="latest", run2="tagA", perf=False)
     exit_code = diff(args)
 
     assert exit_code == 0
@@ -152,7 +153,7 @@ def test_diff_different_durations(
     mock_console_instance = Console(file=output_buffer, no_color=True)
     mock_console.return_value = mock_console_instance
 
-    args = MagicMock(run1="latest", run2="tagA")
+    args = MagicMock(run1="latest", run2="tagA", perf=False)
     exit_code = diff(args)
 
     assert exit_code == 0
@@ -229,7 +230,7 @@ def test_diff_jobs_in_one_report_only(
     mock_console_instance = Console(file=output_buffer, no_color=True)
     mock_console.return_value = mock_console_instance
 
-    args = MagicMock(run1="latest", run2="tagA")
+    args = MagicMock(run1="latest", run2="tagA", perf=False)
     exit_code = diff(args)
 
     assert exit_code == 0
@@ -279,7 +280,7 @@ def test_diff_report_missing_version(
     report2_data = create_mock_report("0.12.2", [])
     mock_read_report.side_effect = [report1_data, report2_data]
 
-    args = MagicMock(run1="latest", run2="tagA")
+    args = MagicMock(run1="latest", run2="tagA", perf=False)
 
     with pytest.raises(UserException) as excinfo:
         diff(args)
@@ -320,7 +321,7 @@ def test_diff_report_old_version(
     report2_data = create_mock_report("0.12.2", [])
     mock_read_report.side_effect = [report1_data, report2_data]
 
-    args = MagicMock(run1="latest", run2="tagA")
+    args = MagicMock(run1="latest", run2="tagA", perf=False)
 
     with pytest.raises(UserException) as excinfo:
         diff(args)
@@ -359,7 +360,7 @@ def test_diff_report_file_not_found(
     report1_data = create_mock_report("0.12.2", [])
     mock_read_report.return_value = report1_data
 
-    args = MagicMock(run1="latest", run2="tagA")
+    args = MagicMock(run1="latest", run2="tagA", perf=False)
     with pytest.raises(UserException) as excinfo:
         diff(args)
 
@@ -413,3 +414,42 @@ def test_diff_with_tags(
     assert mock_resolve_run_id.call_count == 2
     mock_resolve_run_id.assert_any_call(tmp_path, "tag_latest")
     mock_resolve_run_id.assert_any_call(tmp_path, "tag_v1")
+
+
+@patch("kuristo.cli._diff.ui.console")
+@patch("kuristo.cli._diff._load_report")
+@patch("kuristo.cli._diff.config.get")
+def test_diff_perf_regression(mock_config_get, mock_load_report, mock_console, tmp_path):
+    mock_config_get.return_value = MagicMock(
+        log_dir=tmp_path, perf_threshold=0.2, perf_min_time=1.0
+    )
+    job = {"id": 1, "job-name": "solve", "workflow-file": "wf.yaml", "status": "success"}
+    mock_load_report.side_effect = [
+        create_mock_report("0.12.2", [dict(job, duration=10.0, **{"return-code": 0})]),
+        create_mock_report("0.12.2", [dict(job, duration=35.0, **{"return-code": 0})]),
+    ]
+    output_buffer = io.StringIO()
+    mock_console.return_value = Console(file=output_buffer, no_color=True, width=100)
+
+    args = MagicMock(
+        run1="base", run2="new", perf=True, threshold=None, min_time=None, fail_on_regression=True
+    )
+    exit_code = diff(args)
+
+    assert exit_code == 1
+    output = output_buffer.getvalue()
+    assert "No difference" in output
+    assert "3.50x" in output
+    assert "Regressions: 1" in output
+
+
+def test_load_report_merges_fragments(tmp_path, monkeypatch):
+    monkeypatch.setattr("kuristo.__version__", "1.0.0")
+    run_dir = tmp_path / "runs" / "20250101-000000"
+    run_dir.mkdir(parents=True)
+    result = {"id": 1, "job-name": "a", "workflow-file": "wf.yaml", "status": "success"}
+    write_result_fragment(run_dir, "job-1", [result], 1.0)
+
+    report = _load_report("20250101-000000", tmp_path)
+
+    assert report["results"] == [result]
@@ -0,0 +1,89 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from kuristo.cli._flaky import find_flaky, flaky_job_keys
+from kuristo.cli._run import _get_failed_job_nums
+from kuristo.exceptions import UserException
+from kuristo.utils import write_report_yaml
+
+
+def outcomes(*statuses, spec_hash="abc"):
+    return [(f"2025010{i}-000000", st, spec_hash) for i, st in enumerate(statuses)]
+
+
+def test_find_flaky_scores_flips():
+    jobs = find_flaky(
+        {
+            ("wf.yaml", "stable"): outcomes("success", "success", "success"),
+            ("wf.yaml", "broken"): outcomes("failed", "failed", "failed"),
+            ("wf.yaml", "flaky"): outcomes("success", "failed", "success", "success", "failed"),
+        },
+        min_score=0.0,
+    )
+
+    assert [j.job_name for j in jobs] == ["flaky"]
+    assert jobs[0].n_runs == 5
+    assert jobs[0].n_failed == 2
+    assert jobs[0].n_flips == 3
+    assert jobs[0].score == 0.75
+
+
+def test_find_flaky_ignores_spec_changes():
+    runs = [
+        ("20250103-000000", "success", "new"),
+        ("20250102-000000", "failed", "old"),
+        ("20250101-000000", "failed", "old"),
+    ]
+    assert find_flaky({("wf.yaml", "fixed"): runs}, min_score=0.0) == []
+
+
+def test_find_flaky_min_score():
+    runs = outcomes("failed", "success", "success", "success", "success", "success")
+    assert find_flaky({("wf.yaml", "rare"): runs}, min_score=0.5) == []
+    assert len(find_flaky({("wf.yaml", "rare"): runs}, min_score=0.2)) == 1
+
+
+def result(num, name, status, spec_hash="abc"):
+    return {
+        "id": num,
+        "job-name": name,
+        "workflow-file": "wf.yaml",
+        "status": status,
+        "return-code": 0 if status == "success" else 1,
+        "duration": 1.0,
+        "spec-hash": spec_hash,
+    }
+
+
+def make_runs(log_dir, statuses):
+    for i, (st_flaky, st_broken) in enumerate(statuses):
+        run_dir = log_dir / "runs" / f"2025010{i + 1}-000000"
+        run_dir.mkdir(parents=True)
+        results = [result(1, "flaky", st_flaky), result(2, "broken", st_broken)]
+        write_report_yaml(run_dir / "report.yaml", results, 1.0)
+    (log_dir / "runs" / "latest").symlink_to(run_dir)
+
+
+def test_flaky_job_keys_from_history(tmp_path):
+    make_runs(tmp_path, [("success", "failed"), ("failed", "failed"), ("success", "failed")])
+    assert flaky_job_keys(tmp_path, window=20, min_score=0.1) == {("wf.yaml", "flaky")}
+
+
+@patch("kuristo.cli._run.config.get")
+def test_failed_job_nums_flaky_modes(mock_config_get, tmp_path):
+    mock_config_get.return_value = MagicMock(flaky_window=20, flaky_min_score=0.1)
+    make_runs(tmp_path, [("failed", "failed"), ("success", "failed"), ("failed", "failed")])
+
+    assert _get_failed_job_nums(tmp_path) == ({1, 2}, set())
+    assert _get_failed_job_nums(tmp_path, "last") == ({1, 2}, {1})
+    assert _get_failed_job_nums(tmp_path, "exclude") == ({2}, set())
+
+
+@patch("kuristo.cli._run.config.get")
+def test_failed_job_nums_only_flaky(mock_config_get, tmp_path):
+    mock_config_get.return_value = MagicMock(flaky_window=20, flaky_min_score=0.1)
+    make_runs(tmp_path, [("failed", "success"), ("success", "success"), ("failed", "success")])
+
+    with pytest.raises(UserException, match="known to be flaky"):
+        _get_failed_job_nums(tmp_path, "exclude")
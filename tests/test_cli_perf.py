@@ -0,0 +1,129 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import kuristo.history as history
+from kuristo.cli._perf import find_changes, perf, step_baseline
+from kuristo.utils import write_report_yaml
+
+
+def result(name, duration, status="success", steps=None):
+    r = {
+        "id": 1,
+        "job-name": name,
+        "workflow-file": "wf.yaml",
+        "status": status,
+        "duration": duration,
+    }
+    if steps is not None:
+        r["steps"] = [{"name": n, "duration": d, "return-code": 0} for n, d in steps.items()]
+    return r
+
+
+def test_find_changes_regression_and_improvement():
+    baseline = {
+        ("wf.yaml", "slow"): [10.0],
+        ("wf.yaml", "fast"): [10.0],
+        ("wf.yaml", "same"): [10.0],
+    }
+    results = [result("slow", 30.0), result("fast", 4.0), result("same", 10.5)]
+
+    changes = find_changes(results, baseline, threshold=0.2, min_time=1.0)
+
+    assert [(c.job_name, c.is_regression) for c in changes] == [("slow", True), ("fast", False)]
+    assert changes[0].ratio == 3.0
+
+
+def test_find_changes_ignores_short_jobs_and_failures():
+    baseline = {("wf.yaml", "tiny"): [0.1], ("wf.yaml", "broken"): [10.0]}
+    results = [result("tiny", 0.5), result("broken", 50.0, status="failed")]
+
+    assert find_changes(results, baseline, threshold=0.2, min_time=1.0) == []
+
+
+def test_find_changes_ignores_noise():
+    # baseline varies a lot, so a 30% slower run is within the noise
+    baseline = {("wf.yaml", "noisy"): [10.0, 6.0, 14.0, 8.0, 12.0]}
+    results = [result("noisy", 13.0)]
+
+    assert find_changes(results, baseline, threshold=0.2, min_time=1.0) == []
+
+
+def test_find_changes_attributes_step():
+    before = result("sim", 10.0, steps={"build": 4.0, "solve": 5.0, "exodiff": 1.0})
+    after = result("sim", 20.0, steps={"build": 4.5, "solve": 14.0, "exodiff": 1.5})
+    baseline = {("wf.yaml", "sim"): [10.0]}
+
+    changes = find_changes([after], baseline, 0.2, 1.0, step_baseline([before]))
+    assert changes[0].step == "solve"
+    assert changes[0].step_delta == 9.0
+
+    # an improvement is attributed to the step that sped up the most
+    changes = find_changes([before], {("wf.yaml", "sim"): [20.0]}, 0.2, 1.0, step_baseline([after]))
+    assert changes[0].step == "solve"
+    assert changes[0].step_delta == -9.0
+
+
+def test_find_changes_without_steps():
+    changes = find_changes([result("sim", 20.0)], {("wf.yaml", "sim"): [10.0]}, 0.2, 1.0, {})
+    assert changes[0].step is None
+
+
+def make_run(log_dir, run_id, results):
+    run_dir = log_dir / "runs" / run_id
+    run_dir.mkdir(parents=True)
+    write_report_yaml(run_dir / "report.yaml", results, 1.0)
+    return run_dir
+
+
+def perf_args(**kwargs):
+    args = dict(
+        run_id=None,
+        baseline=None,
+        window=None,
+        threshold=None,
+        min_time=None,
+        fail_on_regression=True,
+    )
+    args.update(kwargs)
+    return SimpleNamespace(**args)
+
+
+@patch("kuristo.cli._perf.ui.console")
+@patch("kuristo.cli._perf.config.get")
+def test_perf_rolling_window(mock_config_get, mock_console, tmp_path):
+    mock_config_get.return_value = MagicMock(
+        log_dir=tmp_path, perf_threshold=0.2, perf_min_time=1.0, perf_window=10
+    )
+    for i, duration in enumerate([10.0, 10.2, 9.8]):
+        make_run(tmp_path, f"2025010{i + 1}-000000", [result("solve", duration)])
+    latest = make_run(tmp_path, "20250104-000000", [result("solve", 30.0)])
+    (tmp_path / "runs" / "latest").symlink_to(latest)
+
+    assert perf(perf_args()) == 1
+    assert perf(perf_args(fail_on_regression=False)) == 0
+
+
+@patch("kuristo.cli._perf.ui.console")
+@patch("kuristo.cli._perf.config.get")
+def test_perf_against_baseline(mock_config_get, mock_console, tmp_path):
+    mock_config_get.return_value = MagicMock(
+        log_dir=tmp_path, perf_threshold=0.2, perf_min_time=1.0, perf_window=10
+    )
+    make_run(tmp_path, "20250101-000000", [result("solve", 10.0)])
+    make_run(tmp_path, "20250102-000000", [result("solve", 30.0)])
+    latest = make_run(tmp_path, "20250103-000000", [result("solve", 10.1)])
+    (tmp_path / "runs" / "latest").symlink_to(latest)
+
+    # the rolling window contains the slow run, but the baseline run does not
+    assert perf(perf_args(baseline="20250101-000000")) == 0
+    assert perf(perf_args(run_id="20250102-000000", baseline="20250101-000000")) == 1
+
+
+def test_recent_step_durations(tmp_path):
+    for i, solve in enumerate([5.0, 6.0]):
+        make_run(tmp_path, f"2025010{i + 1}-000000", [result("sim", 10.0, steps={"solve": solve})])
+    make_run(tmp_path, "20250103-000000", [result("sim", 10.0)])
+    history.index_runs(tmp_path)
+
+    durations = history.recent_step_durations(tmp_path, "20250104-000000", 10)
+    assert durations == {("wf.yaml", "sim"): {"solve": [6.0, 5.0]}}
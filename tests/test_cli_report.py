@@ -0,0 +1,57 @@
+import os
+import xml.etree.ElementTree as ET
+
+from kuristo.cli._report import generate_junit
+from kuristo.cli._run import create_results
+from kuristo.resources import Resources
+from kuristo.scheduler import Scheduler
+from kuristo.workflow import parse_workflow_files
+
+
+def test_results_record_steps(tmp_path):
+    wf = tmp_path / "wf.yaml"
+    wf.write_text(
+        "jobs:\n"
+        "  sim:\n"
+        "    steps:\n"
+        "      - name: build\n"
+        "        run: echo build\n"
+        "      - name: solve\n"
+        "        run: sleep 0.1; exit 3\n"
+        "      - name: check\n"
+        "        run: echo check\n"
+    )
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    scheduler = Scheduler(parse_workflow_files([wf]), Resources(), out_dir)
+    scheduler.run_all_jobs()
+
+    [result] = create_results(scheduler.jobs)
+    steps = result["steps"]
+    assert [(s["name"], s["return-code"]) for s in steps] == [("build", 0), ("solve", 3)]
+    assert steps[0]["end"] <= steps[1]["start"]
+    assert steps[1]["duration"] >= 0.1
+    assert steps[1]["end"] <= result["duration"]
+
+
+def test_junit_steps(tmp_path):
+    results = [
+        {
+            "id": 1,
+            "job-name": "sim",
+            "status": "failed",
+            "return-code": 3,
+            "duration": 2.0,
+            "steps": [
+                {"name": "build", "duration": 0.5, "return-code": 0},
+                {"name": "solve", "duration": 1.5, "return-code": 3},
+            ],
+        }
+    ]
+    xml_path = tmp_path / "report.xml"
+    generate_junit(results, xml_path, os.stat(tmp_path))
+
+    testcase = ET.parse(xml_path).find("testsuite/testcase")
+    properties = {p.get("name"): p.get("value") for p in testcase.iter("property")}
+    assert properties == {"step:build": "0.500", "step:solve": "1.500"}
+    assert testcase.find("failure").get("message") == "Step 'solve' completed with exit code 3"
@@ -1,3 +1,6 @@
+import json
+import threading
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
 from unittest.mock import MagicMock, patch
@@ -7,14 +10,21 @@ from rich.text import Text
 
 from kuristo.cli._show import (
     display_job_log,
+    follow_job_log,
+    iter_sections,
+    parse_json_line,
     parse_log_line,
     parse_sections,
+    parse_timestamp,
+    read_step_section,
     render_section,
     render_sections,
     render_title,
     show,
 )
 from kuristo.exceptions import UserException
+from kuristo.job import Job
+from kuristo.utils import append_journal, write_result_fragment
 
 
 def test_parse_log_line_valid():
@@ -301,22 +311,48 @@ def test_render_sections_calls_correct_renderers(
 
 
 @patch("kuristo.cli._show.render_sections")
-@patch("kuristo.cli._show.parse_log_line")
-def test_display_job_log_parses_and_renders(mock_parse_log_line, mock_render_sections, tmp_path):
+def test_display_job_log_parses_and_renders(mock_render_sections, tmp_path):
     log_file = tmp_path / "job-1.log"
-    log_file.write_text("")
-
-    mock_parse_log_line.side_effect = [
-        ("2025-07-26 13:00:00", "INFO", "Something"),
-        None,  # simulate one invalid line
-    ]
+    log_file.write_text(
+        "2025-07-26 13:00:00,000 - JOB_START    - Job A\n"
+        "2025-07-26 13:00:01,000 - TASK_START   - > Step\n"
+        "not a log line\n"
+        "2025-07-26 13:00:02,000 - OUTPUT       - hello\n"
+        "2025-07-26 13:00:03,000 - TASK_END     - exit code 0\n"
+        "2025-07-26 13:00:05,000 - JOB_END      - Done\n"
+    )
+    rendered = []
+    mock_render_sections.side_effect = lambda sections, filters: rendered.extend(sections)
 
     display_job_log(log_file)
 
     mock_render_sections.assert_called_once()
-    sections_arg = mock_render_sections.call_args[0][0]
-    assert isinstance(sections_arg, list)
-    assert len(sections_arg) >= 0  # parse_sections() could return empty
+    title, step = rendered
+    # the title is rendered first, so its end time must be known before the log is read
+    assert title["end_time"] == datetime(2025, 7, 26, 13, 0, 5)
+    assert step["lines"] == [("OUTPUT", "hello")]
+    assert step["return_code"] == 0
+
+
+def test_parse_timestamp_matches_strptime():
+    s = "2025-12-31 23:59:58,007"
+    assert parse_timestamp(s) == datetime.strptime(s, "%Y-%m-%d %H:%M:%S,%f")
+    assert parse_timestamp("2025-13-31 23:59:58,007") is None
+
+
+def test_iter_sections_yields_completed_sections_early():
+    lines = iter(
+        [
+            (ts(0), "TASK_START", "> First"),
+            (ts(1), "TASK_END", "exit code 0"),
+            (ts(2), "TASK_START", "> Second"),
+            (ts(3), "INFO", "Line"),
+        ]
+    )
+    sections = iter_sections(lines)
+    assert next(sections)["title"] == "First"
+    # the first section was produced without reading past the start of the second one
+    assert next(lines) == (ts(3), "INFO", "Line")
 
 
 def test_display_job_log_missing_file():
@@ -330,6 +366,8 @@ def test_show_uses_correct_log_path(mock_cfg_get, mock_display_job_log):
     args = MagicMock()
     args.run_id = None
     args.job = 42
+    args.step = None
+    args.follow = False
 
     mock_cfg = MagicMock()
     mock_cfg.log_dir = Path("/some/logs")
@@ -339,3 +377,164 @@ def test_show_uses_correct_log_path(mock_cfg_get, mock_display_job_log):
 
     expected_path = Path("/some/logs/runs/latest/job-42.log")
     mock_display_job_log.assert_called_once_with(expected_path)
+
+
+def write_job_log(log_path, structured):
+    logger = Job.Logger(f"show-{log_path.name}", log_path, structured)
+    logger.job_start("Job A")
+    for i in range(1, 4):
+        logger.task_start(f"Step {i}")
+        logger.script_line(f"echo {i}")
+        logger.log(f"output {i}")
+        logger.task_end(i - 1)
+    logger.job_end()
+
+
+def test_parse_json_line():
+    line = '{"time":"2025-07-26 13:00:00,123","tag":"OUTPUT","msg":"a - b"}'
+    assert parse_json_line(line) == (datetime(2025, 7, 26, 13, 0, 0, 123000), "OUTPUT", "a - b")
+    assert parse_json_line('{"time":"2025-07-26 13:00:00,1') is None
+
+
+@pytest.mark.parametrize("structured", [True, False])
+def test_read_step_section(tmp_path, structured):
+    log_path = tmp_path / ("job-1.jsonl" if structured else "job-1.log")
+    write_job_log(log_path, structured)
+    assert (tmp_path / "job-1.index.json").exists() == structured
+
+    sec = read_step_section(log_path, 2)
+    assert sec["title"] == "Step 2"
+    assert sec["lines"] == [("SCRIPT", "> echo 2"), ("INFO", "output 2")]
+    assert sec["return_code"] == 1
+    assert read_step_section(log_path, 4) is None
+
+
+def test_read_step_section_reads_only_indexed_range(tmp_path):
+    log_path = tmp_path / "job-1.jsonl"
+    write_job_log(log_path, True)
+    # damage everything outside of the second step
+    index = json.loads((tmp_path / "job-1.index.json").read_text())["steps"][1]
+    data = log_path.read_bytes()
+    log_path.write_bytes(b"x" * index["start"] + data[index["start"] : index["end"]] + b"x" * 100)
+
+    assert read_step_section(log_path, 2)["title"] == "Step 2"
+
+
+@patch("kuristo.cli._show.render_record")
+def test_follow_job_log(mock_render_record, tmp_path):
+    log_path = tmp_path / "job-1.log"
+    log_path.write_text("2025-07-26 13:00:00,000 - JOB_START    - Job A\n")
+
+    def write_rest():
+        time.sleep(0.1)
+        with open(log_path, "a") as f:
+            f.write("2025-07-26 13:00:01,000 - INFO         - part")
+            f.flush()
+            time.sleep(0.1)
+            f.write("ial line\n2025-07-26 13:00:02,000 - JOB_END      - Done\n")
+
+    writer = threading.Thread(target=write_rest)
+    writer.start()
+    follow_job_log(tmp_path, 1, poll_interval=0.01)
+    writer.join()
+
+    assert [c.args for c in mock_render_record.call_args_list] == [
+        ("JOB_START", "Job A"),
+        ("INFO", "partial line"),
+    ]
+
+
+@patch("kuristo.cli._show.ui.console")
+@patch("kuristo.cli._show.render_record")
+def test_follow_job_log_waits_for_structured_log(mock_render_record, mock_console, tmp_path):
+    def start_job():
+        time.sleep(0.1)
+        with open(tmp_path / "job-1.jsonl", "w") as f:
+            f.write('{"time":"2025-07-26 13:00:00,000","tag":"JOB_START","msg":"Job A"}\n')
+            f.write('{"time":"2025-07-26 13:00:01,000","tag":"JOB_END","msg":"Done"}\n')
+
+    writer = threading.Thread(target=start_job)
+    writer.start()
+    follow_job_log(tmp_path, 1, poll_interval=0.01)
+    writer.join()
+
+    assert [c.args for c in mock_render_record.call_args_list] == [("JOB_START", "Job A")]
+
+
+@patch("kuristo.cli._show.render_record")
+def test_follow_job_log_stops_when_run_ends(mock_render_record, tmp_path):
+    log_path = tmp_path / "job-1.log"
+    log_path.write_text("2025-07-26 13:00:00,000 - JOB_START    - Job A\n")
+
+    def kill_run():
+        time.sleep(0.1)
+        with open(log_path, "a") as f:
+            f.write("2025-07-26 13:00:01,000 - INFO         - last words")
+        # the run was interrupted, the job never finished its log
+        (tmp_path / "report.yaml").write_text("results: []\n")
+
+    writer = threading.Thread(target=kill_run)
+    writer.start()
+    follow_job_log(tmp_path, 1, poll_interval=0.01)
+    writer.join()
+
+    assert [c.args for c in mock_render_record.call_args_list] == [
+        ("JOB_START", "Job A"),
+        ("INFO", "last words"),
+    ]
+
+
+def test_follow_job_log_missing_after_run(tmp_path):
+    (tmp_path / "report.yaml").write_text("results: []\n")
+    with pytest.raises(UserException, match="Log file not found"):
+        follow_job_log(tmp_path, 1, poll_interval=0.01)
+
+
+@patch("kuristo.cli._show.ui.console")
+def test_follow_job_log_job_ended_without_log(mock_console, tmp_path):
+    def skip_job():
+        time.sleep(0.1)
+        append_journal(tmp_path, {"id": 1, "job-name": "a", "status": "skipped"})
+
+    writer = threading.Thread(target=skip_job)
+    writer.start()
+    with pytest.raises(UserException, match="ended without writing a log"):
+        follow_job_log(tmp_path, 1, poll_interval=0.01)
+    writer.join()
+
+
+@patch("kuristo.cli._show.ui.console")
+@patch("kuristo.cli._show.render_record")
+def test_follow_job_log_stops_when_task_fragment_written(
+    mock_render_record, mock_console, tmp_path
+):
+    log_path = tmp_path / "job-2.log"
+    log_path.write_text("2025-07-26 13:00:00,000 - JOB_START    - Job B\n")
+    # journal records of other jobs are read once, not on every poll
+    append_journal(tmp_path, {"id": 1, "job-name": "a", "status": "success"})
+
+    def kill_task():
+        time.sleep(0.1)
+        # the batch task was killed after its scheduler wrote the results
+        write_result_fragment(tmp_path, "job-1", [{"id": 2, "status": "failed"}], 1.0)
+
+    writer = threading.Thread(target=kill_task)
+    writer.start()
+    follow_job_log(tmp_path, 2, poll_interval=0.01)
+    writer.join()
+
+    assert [c.args for c in mock_render_record.call_args_list] == [("JOB_START", "Job B")]
+
+
+@patch("kuristo.cli._show.ui.console")
+@patch("kuristo.cli._show.render_record")
+def test_follow_job_log_stops_when_run_is_idle(mock_render_record, mock_console, tmp_path):
+    log_path = tmp_path / "job-1.log"
+    log_path.write_text("2025-07-26 13:00:00,000 - JOB_START    - Job A\n")
+
+    # the run was killed without leaving a journal record or a report
+    follow_job_log(tmp_path, 1, poll_interval=0.01, idle_timeout=0.1)
+
+    assert [c.args for c in mock_render_record.call_args_list] == [("JOB_START", "Job A")]
+    text = mock_console.return_value.print.call_args.args[0]
+    assert "does not seem to be running anymore" in str(text)
@@ -4,6 +4,7 @@ import pytest
 
 from kuristo.cli._status import print_report, status, summarize
 from kuristo.exceptions import UserException
+from kuristo.utils import append_journal, write_report_yaml, write_run_info
 
 
 def test_summarize_counts_correctly():
@@ -83,6 +84,27 @@ def test_print_report_outputs_filtered(
     mock_RunStats.assert_called_once_with(0, 1, 0)
 
 
+@patch("kuristo.cli._status.ui.status_line")
+@patch("kuristo.cli._status.ui.metrics")
+@patch("kuristo.cli._status.config.get")
+def test_print_report_shows_metrics(mock_config_get, mock_metrics, mock_status_line):
+    mock_config_get.return_value = MagicMock(console_width=20)
+
+    print_report({"results": [], "total-runtime": 2.0}, [])
+    mock_metrics.assert_not_called()
+
+    report = {
+        "results": [],
+        "total-runtime": 2.0,
+        "metrics": {"cores": 2, "core-seconds": 3.0, "core-seconds-available": 4.0},
+    }
+    print_report(report, [])
+    metrics = mock_metrics.call_args.args[0]
+    assert metrics.cores == 2
+    assert metrics.runtime == 2.0
+    assert metrics.utilisation == 0.75
+
+
 @patch("kuristo.cli._status.print_report")
 @patch("kuristo.cli._status.utils.read_report")
 @patch("kuristo.cli._status.config.get")
@@ -113,6 +135,33 @@ def test_status_reads_report_and_calls_print(
     mock_print_report.assert_called_once_with(expected_report, expected_filters)
 
 
+@patch("kuristo.cli._status.print_report")
+@patch("kuristo.cli._status.config.get")
+def test_status_shows_metrics_stored_in_history(mock_cfg_get, mock_print_report, tmp_path):
+    run_dir = tmp_path / "runs" / "20250101-000000"
+    run_dir.mkdir(parents=True)
+    (tmp_path / "runs" / "latest").symlink_to(run_dir)
+    metrics = {"cores": 2, "core-seconds": 3.0, "core-seconds-available": 4.0}
+    write_report_yaml(run_dir / "report.yaml", [], 2.0, metrics)
+
+    mock_cfg = MagicMock()
+    mock_cfg.log_dir = tmp_path
+    mock_cfg_get.return_value = mock_cfg
+
+    args = MagicMock()
+    args.run_id = None
+    args.failed = False
+    args.skipped = False
+    args.passed = False
+
+    # the first call stores the report in the history, the second one reads it from there
+    status(args)
+    status(args)
+
+    report = mock_print_report.call_args.args[0]
+    assert report["metrics"] == metrics
+
+
 @patch("kuristo.cli._status.config.get")
 def test_status_missing_report_raises(mock_cfg_get, tmp_path):
     mock_cfg = MagicMock()
@@ -124,3 +173,33 @@ def test_status_missing_report_raises(mock_cfg_get, tmp_path):
 
     with pytest.raises(UserException, match="No report found"):
         status(args)
+
+
+@patch("kuristo.cli._status.ui.console")
+@patch("kuristo.cli._status.print_report")
+@patch("kuristo.cli._status.config.get")
+def test_status_shows_progress_of_unfinished_run(
+    mock_cfg_get, mock_print_report, mock_console, tmp_path
+):
+    run_dir = tmp_path / "runs" / "20250101-000000"
+    run_dir.mkdir(parents=True)
+    (tmp_path / "runs" / "latest").symlink_to(run_dir)
+    write_run_info(run_dir, {"locations": ["."], "labels": None, "num-jobs": 3})
+    append_journal(run_dir, {"id": 1, "job-name": "a", "status": "success"})
+
+    mock_cfg = MagicMock()
+    mock_cfg.log_dir = tmp_path
+    mock_cfg_get.return_value = mock_cfg
+
+    args = MagicMock()
+    args.run_id = None
+    args.failed = False
+    args.skipped = False
+    args.passed = False
+
+    status(args)
+
+    report = mock_print_report.call_args.args[0]
+    assert report["results"] == [{"id": 1, "job-name": "a", "status": "success"}]
+    message = mock_console.return_value.print.call_args.args[0]
+    assert "1 of 3 jobs finished" in message
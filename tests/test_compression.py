@@ -0,0 +1,87 @@
+import pytest
+
+from kuristo.cli._show import find_job_end_time, read_step_section
+from kuristo.compression import (
+    BackgroundCompressor,
+    check_method,
+    compress_file,
+    find,
+    open_text,
+    strip_suffix,
+)
+from kuristo.exceptions import UserException
+from kuristo.job import Job
+from kuristo.utils import job_log_index_path, job_log_path
+
+
+def test_compress_gzip(tmp_path):
+    path = tmp_path / "job-1.log"
+    path.write_text("line 1\nline 2\n")
+
+    compressed = compress_file(path, "gzip")
+
+    assert compressed == tmp_path / "job-1.log.gz"
+    assert not path.exists()
+    assert find(path) == compressed
+    assert strip_suffix(compressed) == path
+    with open_text(compressed) as f:
+        assert f.read() == "line 1\nline 2\n"
+
+
+def test_find_missing(tmp_path):
+    assert find(tmp_path / "job-1.log") is None
+
+
+def test_check_method():
+    check_method("none")
+    check_method("gzip")
+    with pytest.raises(UserException, match="Unknown compression method 'lzma'"):
+        check_method("lzma")
+
+
+def test_background_compressor(tmp_path):
+    paths = [tmp_path / f"job-{i}.log" for i in range(5)]
+    for p in paths:
+        p.write_text("output\n" * 1000)
+
+    compressor = BackgroundCompressor("gzip")
+    for p in paths:
+        compressor.submit(p)
+    compressor.shutdown()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"job-{i}.log.gz" for i in range(5)]
+
+
+def test_background_compressor_disabled(tmp_path):
+    path = tmp_path / "job-1.log"
+    path.write_text("output\n")
+    compressor = BackgroundCompressor("none")
+    compressor.submit(path)
+    compressor.shutdown()
+    assert path.exists()
+
+
+def test_job_log_path_compressed(tmp_path):
+    assert job_log_path(tmp_path, 1) == tmp_path / "job-1.log"
+    (tmp_path / "job-1.jsonl.gz").touch()
+    assert job_log_path(tmp_path, 1) == tmp_path / "job-1.jsonl.gz"
+    assert job_log_index_path(tmp_path / "job-1.jsonl.gz") == tmp_path / "job-1.index.json"
+
+
+def test_read_compressed_structured_log(tmp_path):
+    log_path = tmp_path / "job-1.jsonl"
+    logger = Job.Logger("compressed", log_path, structured=True)
+    logger.job_start("Job A")
+    for i in range(1, 3):
+        logger.task_start(f"Step {i}")
+        logger.log(f"output {i}")
+        logger.task_end(0)
+    logger.job_end()
+    logger.close()
+
+    compressed = compress_file(log_path, "gzip")
+
+    assert find_job_end_time(compressed) is not None
+    sec = read_step_section(compressed, 2)
+    assert sec["title"] == "Step 2"
+    assert sec["lines"] == [("INFO", "output 2")]
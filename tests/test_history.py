@@ -0,0 +1,151 @@
+import shutil
+import sqlite3
+from unittest.mock import patch
+
+import kuristo.history as history
+from kuristo.utils import write_report_yaml
+
+
+def make_run(log_dir, run_id, results, total_runtime=1.5):
+    run_dir = log_dir / "runs" / run_id
+    run_dir.mkdir(parents=True)
+    write_report_yaml(run_dir / "report.yaml", results, total_runtime)
+    return run_dir
+
+
+RESULTS = [
+    {
+        "id": 1,
+        "job-name": "a",
+        "workflow-file": "wf.yaml",
+        "return-code": 0,
+        "status": "success",
+        "duration": 2.0,
+    },
+    {"id": 2, "job-name": "b", "workflow-file": "wf.yaml", "status": "skipped", "reason": "x"},
+]
+
+
+def test_load_run_summary(tmp_path):
+    run_dir = make_run(tmp_path, "20250101-000000", RESULTS)
+
+    summary = history.load_run(tmp_path, run_dir)
+
+    assert summary["n_jobs"] == 2
+    assert summary["n_success"] == 1
+    assert summary["n_skipped"] == 1
+    assert summary["total_runtime"] == 1.5
+
+
+def test_load_report_is_cached(tmp_path):
+    run_dir = make_run(tmp_path, "20250101-000000", RESULTS)
+    history.index_run(tmp_path, run_dir)
+
+    with patch("kuristo.history.utils.read_report") as mock_read_report:
+        report = history.load_report(tmp_path, run_dir)
+
+    mock_read_report.assert_not_called()
+    assert report["results"] == RESULTS
+    assert report["total-runtime"] == 1.5
+
+
+def test_load_report_keeps_metrics(tmp_path):
+    run_dir = tmp_path / "runs" / "20250101-000000"
+    run_dir.mkdir(parents=True)
+    metrics = {"cores": 2, "core-seconds": 3.0, "core-seconds-available": 4.0}
+    write_report_yaml(run_dir / "report.yaml", RESULTS, 1.5, metrics)
+    history.index_run(tmp_path, run_dir)
+
+    report = history.load_report(tmp_path, run_dir)
+
+    assert report["metrics"] == metrics
+
+
+def test_connect_migrates_old_database(tmp_path):
+    run_dir = tmp_path / "runs" / "20250101-000000"
+    run_dir.mkdir(parents=True)
+    write_report_yaml(run_dir / "report.yaml", RESULTS, 1.5, {"cores": 2})
+    db = sqlite3.connect(tmp_path / "history.db")
+    db.executescript(
+        history.SCHEMA.replace(
+            "report_mtime_ns INTEGER,\n    metrics TEXT", "report_mtime_ns INTEGER"
+        )
+    )
+    mtime_ns = (run_dir / "report.yaml").stat().st_mtime_ns
+    db.execute(
+        "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (run_dir.name, "0.1", 1.5, 2, 1, 0, 1, mtime_ns),
+    )
+    db.commit()
+    db.close()
+
+    report = history.load_report(tmp_path, run_dir)
+
+    assert report["metrics"] == {"cores": 2}
+
+
+def test_load_report_refreshes_changed_report(tmp_path):
+    run_dir = make_run(tmp_path, "20250101-000000", RESULTS)
+    history.index_run(tmp_path, run_dir)
+    write_report_yaml(run_dir / "report.yaml", RESULTS[:1], 3.0)
+
+    report = history.load_report(tmp_path, run_dir)
+    assert report["results"] == RESULTS[:1]
+    assert history.load_run(tmp_path, run_dir)["n_jobs"] == 1
+
+
+def test_load_report_missing(tmp_path):
+    run_dir = tmp_path / "runs" / "20250101-000000"
+    run_dir.mkdir(parents=True)
+    assert history.load_report(tmp_path, run_dir) is None
+
+
+def test_job_history_survives_pruning(tmp_path):
+    for i, duration in enumerate([1.0, 2.0, 3.0]):
+        results = [dict(RESULTS[0], duration=duration)]
+        run_dir = make_run(tmp_path, f"2025010{i + 1}-000000", results)
+        history.index_run(tmp_path, run_dir)
+        shutil.rmtree(run_dir)
+
+    jobs = history.job_history(tmp_path, "wf.yaml", "a", limit=2)
+    assert [j["run-id"] for j in jobs] == ["20250103-000000", "20250102-000000"]
+    assert [j["duration"] for j in jobs] == [3.0, 2.0]
+
+
+def read_only_connect(connect):
+    """
+    Make `sqlite3.connect` fail unless the database is opened read-only
+    """
+
+    def wrapper(database, *args, **kwargs):
+        if not kwargs.get("uri"):
+            raise sqlite3.OperationalError("unable to open database file")
+        return connect(database, *args, **kwargs)
+
+    return wrapper
+
+
+def test_index_runs_read_only_history(tmp_path):
+    make_run(tmp_path, "20250101-000000", RESULTS)
+    history.index_runs(tmp_path)
+    make_run(tmp_path, "20250102-000000", RESULTS)
+
+    with patch("kuristo.history.sqlite3.connect", read_only_connect(sqlite3.connect)):
+        history.index_runs(tmp_path)
+        outcomes = history.job_outcomes(tmp_path, 10)
+        report = history.load_report(tmp_path, tmp_path / "runs" / "20250102-000000")
+
+    # the history stays as it was, runs not in it are read from their report
+    assert outcomes[("wf.yaml", "a")] == [("20250101-000000", "success", None)]
+    assert report["results"] == RESULTS
+
+
+def test_load_report_without_history(tmp_path):
+    run_dir = make_run(tmp_path, "20250101-000000", RESULTS)
+
+    with patch("kuristo.history.sqlite3.connect", read_only_connect(sqlite3.connect)):
+        history.index_runs(tmp_path)
+        report = history.load_report(tmp_path, run_dir)
+
+    assert report["results"] == RESULTS
+    assert not (tmp_path / "history.db").exists()
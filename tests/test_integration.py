@@ -149,3 +149,18 @@ def test_convergence():
     assert "Failed: 0" in result.stdout
     assert "Skipped: 0" in result.stdout
     assert "Total: 2" in result.stdout
+
+
+def test_zero_max_output_is_rejected(tmp_path):
+    (tmp_path / "kuristo.yaml").write_text(
+        "jobs:\n  a:\n    steps:\n      - run: echo hi\n        max-output: 0\n"
+    )
+    result = subprocess.run(
+        ["kuristo", "--no-ansi", "run", "."],
+        capture_output=True,
+        text=True,
+        cwd=tmp_path,
+    )
+
+    assert result.returncode != 0
+    assert "Invalid max-output '0'" in result.stdout
@@ -0,0 +1,49 @@
+import logging
+import os
+
+from kuristo.cli._show import parse_log_line
+from kuristo.job import Job
+
+
+def open_fds():
+    return len(os.listdir("/proc/self/fd"))
+
+
+def test_logger_writes_parsable_records(tmp_path):
+    log_path = tmp_path / "job-1.log"
+    logger = Job.Logger(1, log_path)
+    assert not log_path.exists()
+
+    logger.job_start("Job A")
+    logger.log_lines(["one", "two"])
+    logger.task_end(0)
+    logger.close()
+
+    records = [parse_log_line(line)[1:] for line in log_path.read_text().splitlines()]
+    assert records == [
+        ("JOB_START", "Job A"),
+        ("INFO", "one"),
+        ("INFO", "two"),
+        ("TASK_END", "* Process completed with exit code 0"),
+    ]
+
+
+def test_logger_drops_records_after_close(tmp_path):
+    log_path = tmp_path / "job-1.log"
+    logger = Job.Logger(1, log_path)
+    logger.log("before")
+    logger.close()
+    logger.log("after")
+    assert "after" not in log_path.read_text()
+
+
+def test_loggers_do_not_leak(tmp_path):
+    n_loggers = len(logging.root.manager.loggerDict)
+    n_fds = open_fds()
+    for i in range(200):
+        logger = Job.Logger(i, tmp_path / f"job-{i}.log")
+        logger.log("line")
+        logger.close()
+
+    assert len(logging.root.manager.loggerDict) == n_loggers
+    assert open_fds() == n_fds
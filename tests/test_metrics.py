@@ -0,0 +1,79 @@
+import pytest
+
+from kuristo.metrics import RunMetrics
+from kuristo.resources import Resources
+from kuristo.scheduler import Scheduler
+from kuristo.workflow import parse_workflow_files
+
+
+def make_metrics(**kwargs):
+    values = {
+        "cores": 4,
+        "runtime": 10.0,
+        "job_seconds": 20.0,
+        "core_seconds": 30.0,
+        "core_seconds_available": 40.0,
+        "queue_wait": 5.0,
+        "critical_path": 8.0,
+    }
+    values.update(kwargs)
+    return RunMetrics(**values)
+
+
+def test_derived_metrics():
+    m = make_metrics()
+    assert m.utilisation == 0.75
+    assert m.parallelism == 2.0
+    assert m.max_parallelism == 2.5
+
+
+def test_derived_metrics_of_empty_run():
+    m = make_metrics(runtime=0.0, core_seconds_available=0.0, critical_path=0.0)
+    assert m.utilisation == 0.0
+    assert m.parallelism == 0.0
+    assert m.max_parallelism == 0.0
+
+
+def test_dict_roundtrip():
+    m = make_metrics()
+    assert RunMetrics.from_dict(m.to_dict(), m.runtime) == m
+
+
+def test_merge():
+    m = RunMetrics.merge([make_metrics(), make_metrics(critical_path=9.0, runtime=6.0)], 10.0)
+    assert m.cores == 8
+    assert m.runtime == 10.0
+    assert m.core_seconds == 60.0
+    assert m.core_seconds_available == 80.0
+    assert m.queue_wait == 10.0
+    assert m.critical_path == 9.0
+
+
+def test_scheduler_metrics(tmp_path):
+    wf = tmp_path / "wf.yaml"
+    wf.write_text(
+        "jobs:\n"
+        "  one:\n"
+        "    steps:\n"
+        "      - run: sleep 0.2\n"
+        "  two:\n"
+        "    needs: [one]\n"
+        "    steps:\n"
+        "      - run: sleep 0.2\n"
+        "  three:\n"
+        "    steps:\n"
+        "      - run: echo three\n"
+    )
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    scheduler = Scheduler(parse_workflow_files([wf]), Resources(), out_dir)
+    scheduler.run_all_jobs()
+
+    m = scheduler.metrics
+    jobs = {job.name: job for job in scheduler.jobs}
+    assert m.cores == Resources().total_cores
+    assert m.runtime == scheduler.total_runtime
+    assert m.job_seconds == pytest.approx(sum(j.elapsed_time for j in jobs.values()))
+    assert m.critical_path == pytest.approx(jobs["one"].elapsed_time + jobs["two"].elapsed_time)
+    assert 0.0 < m.utilisation <= 1.0
+    assert m.queue_wait >= 0.0
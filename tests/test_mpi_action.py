@@ -1,7 +1,10 @@
 from unittest.mock import MagicMock, patch
 
+import pytest
+
 from kuristo.actions.mpi_action import MPIAction
 from kuristo.context import Context
+from kuristo.exceptions import UserException
 
 
 class DummyMPIAction(MPIAction):
@@ -37,3 +40,65 @@ def test_create_command_uses_config_and_sub_command(mock_get):
 
     assert result == "mpirun -np 4 my_mpi_program"
     mock_get.assert_called_once()
+
+
+def test_num_cores_counts_threads():
+    ctx = make_context()
+    action = DummyMPIAction(name="mpi_test", context=ctx, **{"num-procs": 4, "threads-per-proc": 2})
+    assert action.num_cores == 8
+    assert action.threads_per_proc == 2
+
+
+@patch("kuristo.actions.mpi_action.config.get")
+def test_create_command_with_threads(mock_get):
+    ctx = make_context()
+    mock_get.return_value = MagicMock(mpi_launcher="mpirun", mpi_thread_flags=None)
+    action = DummyMPIAction(name="mpi_test", context=ctx, **{"num-procs": 4, "threads-per-proc": 2})
+
+    result = action.create_command()
+
+    assert result == "mpirun -np 4 --map-by slot:PE=2 --bind-to core my_mpi_program"
+
+
+@patch("kuristo.actions.mpi_action.config.get")
+def test_create_command_with_threads_srun(mock_get):
+    ctx = make_context()
+    mock_get.return_value = MagicMock(mpi_launcher="/usr/bin/srun", mpi_thread_flags=None)
+    action = DummyMPIAction(name="mpi_test", context=ctx, **{"num-procs": 2, "threads-per-proc": 3})
+
+    result = action.create_command()
+
+    assert result == "/usr/bin/srun -np 2 --cpus-per-task=3 my_mpi_program"
+
+
+@patch("kuristo.actions.mpi_action.config.get")
+def test_create_command_with_threads_custom_flags(mock_get):
+    ctx = make_context()
+    mock_get.return_value = MagicMock(
+        mpi_launcher="mpiexec", mpi_thread_flags="-bind-to core:{threads}"
+    )
+    action = DummyMPIAction(name="mpi_test", context=ctx, **{"num-procs": 2, "threads-per-proc": 4})
+
+    result = action.create_command()
+
+    assert result == "mpiexec -np 2 -bind-to core:4 my_mpi_program"
+
+
+@patch("kuristo.actions.mpi_action.config.get")
+def test_create_command_on_hosts(mock_get):
+    ctx = make_context()
+    ctx.hosts = {"n1": 4, "n2": 4}
+    mock_get.return_value = MagicMock(
+        mpi_launcher="mpirun", mpi_host_flags=None, mpi_thread_flags=None
+    )
+    action = DummyMPIAction(name="mpi_test", context=ctx, **{"num-procs": 4, "threads-per-proc": 2})
+
+    assert action.command == (
+        "mpirun -np 4 --host n1:2,n2:2 --map-by slot:PE=2 --bind-to core my_mpi_program"
+    )
+
+
+@pytest.mark.parametrize("value", ["2", 0, -1])
+def test_invalid_threads_per_proc_raises(value):
+    with pytest.raises(UserException, match="Invalid threads-per-proc"):
+        DummyMPIAction(name="mpi_test", context=make_context(), **{"threads-per-proc": value})
@@ -0,0 +1,118 @@
+import time
+
+import kuristo.config as config
+from kuristo.metrics import RunMetrics
+from kuristo.openmetrics import (
+    JobSample,
+    RunSnapshot,
+    TextfileExporter,
+    format_metrics,
+    textfile_name,
+    write_textfile,
+)
+from kuristo.resources import Resources
+from kuristo.scheduler import Scheduler
+from kuristo.workflow import parse_workflow_files
+
+
+def make_snapshot(**kwargs):
+    values = {
+        "run_id": "20250101-000000",
+        "counts": {"success": 1, "failed": 1, "skipped": 0, "running": 0, "waiting": 0},
+        "metrics": RunMetrics(4, 10.0, 20.0, 30.0, 40.0, 5.0, 8.0),
+        "jobs": [
+            JobSample("tests/wf.yaml", "solve", "success", 12.5),
+            JobSample("tests/wf.yaml", 'say "hi"', "failed", 0.25),
+        ],
+        "finished": True,
+    }
+    values.update(kwargs)
+    return RunSnapshot(**values)
+
+
+def test_format_metrics():
+    lines = format_metrics(make_snapshot()).splitlines()
+
+    assert 'kuristo_run_info{run_id="20250101-000000"} 1' in lines
+    assert "kuristo_run_finished 1" in lines
+    assert 'kuristo_jobs{status="failed"} 1' in lines
+    assert "kuristo_core_utilisation_ratio 0.75" in lines
+    assert "kuristo_queue_wait_seconds 5.0" in lines
+    assert (
+        'kuristo_job_duration_seconds{workflow="tests/wf.yaml",job="solve",status="success"} 12.5'
+        in lines
+    )
+    assert 'job="say \\"hi\\""' in lines[-2]
+    assert lines[-1] == "# EOF"
+
+
+def test_format_metrics_declares_every_family_once():
+    lines = format_metrics(make_snapshot()).splitlines()
+    types = [line.split()[2] for line in lines if line.startswith("# TYPE ")]
+    assert len(types) == len(set(types))
+
+
+def test_write_textfile(tmp_path):
+    write_textfile(tmp_path / "prom", "run-1", "one\n")
+    write_textfile(tmp_path / "prom", "run-1", "two\n")
+    assert [p.name for p in (tmp_path / "prom").iterdir()] == ["kuristo-run-1.prom"]
+    assert (tmp_path / "prom" / "kuristo-run-1.prom").read_text() == "two\n"
+
+
+def test_write_textfile_per_instance(tmp_path):
+    # concurrent runs do not overwrite each other's metrics
+    write_textfile(tmp_path, "20250101-000000", "one\n")
+    write_textfile(tmp_path, "20250101-000001", "two\n")
+    assert (tmp_path / "kuristo-20250101-000000.prom").read_text() == "one\n"
+    assert (tmp_path / "kuristo-20250101-000001.prom").read_text() == "two\n"
+
+
+def test_textfile_name_sanitizes_instance():
+    assert textfile_name("ci/main node") == "kuristo-ci_main_node.prom"
+
+
+def test_exporter_exports_periodically(tmp_path):
+    snapshots = []
+
+    def snapshot():
+        snapshots.append(len(snapshots))
+        return make_snapshot(finished=False)
+
+    exporter = TextfileExporter(tmp_path, "run", 0.01, snapshot)
+    exporter.start()
+    deadline = time.monotonic() + 5
+    while len(snapshots) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    exporter.stop()
+
+    assert len(snapshots) >= 3
+    assert "kuristo_run_finished 0" in (tmp_path / "kuristo-run.prom").read_text()
+
+
+def test_scheduler_exports_metrics(tmp_path, monkeypatch):
+    monkeypatch.setattr(config.get(), "metrics_textfile_dir", tmp_path / "prom")
+    wf = tmp_path / "wf.yaml"
+    wf.write_text("jobs:\n  one:\n    steps:\n      - run: echo one\n")
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    scheduler = Scheduler(parse_workflow_files([wf]), Resources(), out_dir)
+    scheduler.run_all_jobs()
+
+    # the file is named after the run
+    text = (tmp_path / "prom" / "kuristo-out.prom").read_text()
+    assert "kuristo_run_finished 1" in text
+    assert 'kuristo_jobs{status="success"} 1' in text
+    assert 'job="one",status="success"' in text
+
+
+def test_scheduler_exports_metrics_with_instance_label(tmp_path, monkeypatch):
+    monkeypatch.setattr(config.get(), "metrics_textfile_dir", tmp_path / "prom")
+    monkeypatch.setattr(config.get(), "metrics_instance", "nightly")
+    wf = tmp_path / "wf.yaml"
+    wf.write_text("jobs:\n  one:\n    steps:\n      - run: echo one\n")
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    scheduler = Scheduler(parse_workflow_files([wf]), Resources(), out_dir)
+    scheduler.run_all_jobs()
+
+    assert [p.name for p in (tmp_path / "prom").iterdir()] == ["kuristo-nightly.prom"]
@@ -3,7 +3,7 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 
-from kuristo.actions.process_action import ProcessAction
+from kuristo.actions.process_action import BoundedOutput, ProcessAction
 
 
 # Minimal context stub
@@ -24,33 +24,28 @@ def action_instance():
     return TrivialProcessAction("test", DummyContext())
 
 
-def test_successful_run(action_instance):
-    mock_popen = MagicMock()
-    mock_popen.communicate.return_value = (b"output", None)
-    mock_popen.returncode = 0
-    with patch("subprocess.Popen", return_value=mock_popen):
-        exit_code = action_instance.run()
-        assert exit_code == 0
-    assert action_instance.output == "output"
+def test_successful_run():
+    class Printer(ProcessAction):
+        def create_command(self):
+            return "printf output"
 
+    action = Printer("test", DummyContext())
+    assert action.run() == 0
+    assert action.output == "output"
 
-def test_timeout_handling(action_instance):
-    mock_popen = MagicMock()
-    # First call raises TimeoutExpired, second call returns bytes
-    mock_popen.communicate.side_effect = [
-        subprocess.TimeoutExpired(cmd="cmd", timeout=1),
-        (b"", b""),
-    ]
-    with patch("subprocess.Popen", return_value=mock_popen):
-        exit_code = action_instance.run()
-        assert exit_code == 124
-    assert action_instance.output.endswith("Step timed out")
+
+def test_timeout_handling():
+    class Sleeper(ProcessAction):
+        def create_command(self):
+            return ["sleep", "30"]
+
+    action = Sleeper("test", DummyContext(), timeout_minutes=0.01)
+    assert action.run() == 124
+    assert action.output.endswith("Step timed out")
 
 
 def test_subprocess_error_handling(action_instance):
-    mock_popen = MagicMock()
-    mock_popen.communicate.side_effect = subprocess.SubprocessError()
-    with patch("subprocess.Popen", return_value=mock_popen):
+    with patch.object(ProcessAction, "_read_output", side_effect=subprocess.SubprocessError()):
         exit_code = action_instance.run()
         assert exit_code == -1
     assert action_instance.output == ""
@@ -61,3 +56,149 @@ def test_terminate_kills_process(action_instance):
     action_instance._process = mock_process
     action_instance.terminate()
     mock_process.kill.assert_called_once()
+
+
+def test_threads_set_omp_num_threads():
+    action = TrivialProcessAction("test", DummyContext(), threads_per_proc=3)
+    mock_popen = MagicMock()
+    mock_popen.returncode = 0
+    with (
+        patch("subprocess.Popen", return_value=mock_popen) as popen,
+        patch.object(ProcessAction, "_read_output", return_value=(b"", False)),
+    ):
+        action.run()
+    assert popen.call_args.kwargs["env"]["OMP_NUM_THREADS"] == "3"
+
+
+def test_step_env_overrides_omp_num_threads():
+    action = TrivialProcessAction(
+        "test", DummyContext(), threads_per_proc=3, env={"OMP_NUM_THREADS": "1"}
+    )
+    mock_popen = MagicMock()
+    mock_popen.returncode = 0
+    with (
+        patch("subprocess.Popen", return_value=mock_popen) as popen,
+        patch.object(ProcessAction, "_read_output", return_value=(b"", False)),
+    ):
+        action.run()
+    assert popen.call_args.kwargs["env"]["OMP_NUM_THREADS"] == "1"
+
+
+def test_remote_command_uses_fake_launcher():
+    # fake launcher simulates the remote node locally
+    ctx = DummyContext()
+    ctx.hosts = {"node7": 2}
+    cfg = MagicMock(remote_launcher="env KURISTO_HOST={host} KURISTO_CORES={cores}")
+
+    class EchoHost(ProcessAction):
+        def create_command(self):
+            return 'echo "$KURISTO_HOST:$KURISTO_CORES"'
+
+    action = EchoHost("test", ctx)
+    with patch("kuristo.actions.process_action.config.get", return_value=cfg):
+        exit_code = action.run()
+    assert exit_code == 0
+    assert action.output.strip() == "node7:2"
+
+
+def test_remote_command_list():
+    ctx = DummyContext()
+    ctx.hosts = {"node1": 1}
+    cfg = MagicMock(remote_launcher="srun -w {host}")
+    action = TrivialProcessAction("test", ctx)
+    with patch("kuristo.actions.process_action.config.get", return_value=cfg):
+        assert action.create_remote_command(["echo", "x"], ctx.hosts) == [
+            "srun",
+            "-w",
+            "node1",
+            "echo",
+            "x",
+        ]
+
+
+def test_output_listener_receives_lines_while_running():
+    class Printer(ProcessAction):
+        def create_command(self):
+            return "echo one; echo two"
+
+    action = Printer("test", DummyContext())
+    lines = []
+    action.output_listener = lines.append
+    assert action.run() == 0
+    assert lines == ["one", "two"]
+    assert action.output_streamed
+    assert action.output == "one\ntwo\n"
+
+
+def test_output_listener_timeout():
+    class Sleeper(ProcessAction):
+        def create_command(self):
+            return ["sh", "-c", "echo before; exec sleep 30"]
+
+    action = Sleeper("test", DummyContext(), timeout_minutes=0.01)
+    lines = []
+    action.output_listener = lines.append
+    assert action.run() == 124
+    assert lines == ["before", "Step timed out"]
+    assert action.output.endswith("Step timed out")
+
+
+def test_bounded_output_keeps_head_and_tail():
+    out = BoundedOutput(10)
+    for chunk in [b"abc", b"defgh", b"ijklmnop", b"qrstuvwxyz"]:
+        out.write(chunk)
+    assert out.dropped == 16
+    assert out.getvalue() == b"abcde\n... 16 bytes of output dropped ...\nvwxyz"
+
+
+def test_bounded_output_tiny_limit():
+    out = BoundedOutput(1)
+    out.write(b"hello")
+    out.write(b"world")
+    assert out.dropped == 9
+    assert out.getvalue() == b"h\n... 9 bytes of output dropped ...\n"
+
+
+def test_bounded_output_unlimited():
+    out = BoundedOutput(None)
+    out.write(b"a" * 1000)
+    assert out.dropped == 0
+    assert out.getvalue() == b"a" * 1000
+
+
+def test_max_output_limits_output_and_log():
+    class Spammer(ProcessAction):
+        def create_command(self):
+            return "echo first; for i in $(seq 1000); do echo line $i; done; echo last"
+
+    ctx = DummyContext()
+    action = Spammer("test", ctx, id="spam")
+    action.max_output = 200
+    lines = []
+    action.output_listener = lines.append
+    assert action.run() == 0
+
+    assert action.output_dropped > 0
+    assert action.output.startswith("first\n")
+    assert action.output.endswith("last\n")
+    assert len(action.output) < 300
+    # the kept tail is what checks of the step's output see
+    assert ctx.vars["steps"]["spam"]["output"] == action.output
+    assert lines[0] == "first"
+    assert f"... {action.output_dropped} bytes of output dropped ..." in lines
+    assert lines[-1] == "last"
+
+
+def test_resource_usage():
+    class Writer(ProcessAction):
+        def create_command(self):
+            return "head -c 1000000 /dev/zero | wc -c"
+
+    action = Writer("test", DummyContext())
+    assert action.resource_usage is None
+    assert action.run() == 0
+    usage = action.resource_usage
+    assert usage is not None
+    assert usage.user_time >= 0.0
+    assert usage.system_time >= 0.0
+    assert usage.max_rss > 0
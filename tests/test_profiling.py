@@ -0,0 +1,44 @@
+import pstats
+import subprocess
+import sys
+import time
+from unittest.mock import patch
+
+from kuristo.cli import build_parser, expand_profile_arg
+from kuristo.profiling import PROFILE_FILE, Profiler, waiting_time
+
+
+def test_expand_profile_arg():
+    assert expand_profile_arg(["--profile", "run", "."]) == [
+        f"--profile={PROFILE_FILE}",
+        "run",
+        ".",
+    ]
+    assert expand_profile_arg(["--profile=x.prof", "run"]) == ["--profile=x.prof", "run"]
+
+
+def test_parse_profile_arg():
+    parser = build_parser()
+    args = parser.parse_args(expand_profile_arg(["--profile", "status"]))
+    assert args.profile == PROFILE_FILE
+    assert args.command == "status"
+    assert parser.parse_args(["--profile=x.prof", "status"]).profile == "x.prof"
+    assert parser.parse_args(["status"]).profile is None
+
+
+@patch("kuristo.profiling.print_summary")
+def test_profiler_separates_waiting(mock_print_summary, tmp_path):
+    path = tmp_path / "kuristo.prof"
+    with Profiler(path) as profiler:
+        subprocess.run([sys.executable, "-c", "sum(range(10**6))"], check=True)
+        time.sleep(0.2)
+
+    summary = profiler.summary
+    assert summary.wall_time >= 0.2
+    assert summary.main_waiting >= 0.2
+    assert summary.main_busy < summary.main_waiting
+    assert summary.children_cpu > 0.0
+    mock_print_summary.assert_called_once_with(summary, path)
+
+    stats = pstats.Stats(str(path))
+    assert waiting_time(stats) == summary.main_waiting
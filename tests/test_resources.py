@@ -2,7 +2,17 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 
-from kuristo.resources import Resources
+from kuristo.exceptions import UserException
+from kuristo.resources import (
+    NodeResources,
+    Resources,
+    detect_nodes,
+    expand_cpus_per_node,
+    expand_nodelist,
+    read_hostfile,
+)
+from kuristo.scheduler import Scheduler
+from kuristo.workflow import parse_workflow_files
 
 
 @pytest.fixture
@@ -19,6 +29,12 @@ def test_initialization_and_properties(mock_config):
     assert res.total_cores == 8
 
 
+def test_initialization_with_core_count(mock_config):
+    res = Resources(4)
+    assert res.available_cores == 4
+    assert res.total_cores == 4
+
+
 def test_allocate_within_limits(mock_config):
     res = Resources()
     res.allocate_cores(3)
@@ -44,3 +60,110 @@ def test_free_more_than_maximum_raises(mock_config):
     with pytest.raises(RuntimeError) as excinfo:
         res.free_cores(1)
     assert "free more cores" in str(excinfo.value)
+
+
+def test_node_resources_best_fit():
+    res = NodeResources({"n1": 4, "n2": 2})
+    assert res.total_cores == 6
+    assert res.allocate_cores(2) == {"n2": 2}
+    assert res.allocate_cores(3) == {"n1": 3}
+    assert res.available_cores == 1
+
+
+def test_node_resources_spans_nodes():
+    res = NodeResources({"n1": 4, "n2": 4})
+    res.allocate_cores(1)
+    hosts = res.allocate_cores(6, multi_host=True)
+    assert hosts == {"n2": 4, "n1": 2}
+    assert res.available_cores == 1
+    res.free_cores(6, hosts)
+    assert res.available_cores == 7
+
+
+def test_node_resources_single_host_jobs_stay_on_one_node():
+    res = NodeResources({"n1": 4, "n2": 4})
+    assert res.max_job_cores() == 4
+    assert res.max_job_cores(multi_host=True) == 8
+    res.allocate_cores(1)
+    assert not res.can_allocate(6)
+    assert res.can_allocate(6, multi_host=True)
+    assert res.can_allocate(4)
+    with pytest.raises(RuntimeError):
+        res.allocate_cores(6)
+
+
+def test_only_mpi_jobs_span_nodes(tmp_path):
+    wf = tmp_path / "kuristo.yaml"
+    wf.write_text(
+        "jobs:\n"
+        "  shell:\n"
+        "    steps:\n"
+        "      - run: echo shell\n"
+        "        num-cores: 4\n"
+        "  mpi:\n"
+        "    steps:\n"
+        "      - uses: core/mpi-run\n"
+        "        with:\n"
+        "          num-procs: 4\n"
+        "          run: echo mpi\n"
+    )
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    scheduler = Scheduler(parse_workflow_files([wf]), NodeResources({"n1": 2, "n2": 2}), out_dir)
+    scheduler.check()
+
+    jobs = {job.name: job for job in scheduler.jobs}
+    assert jobs["shell"].is_skipped
+    assert jobs["mpi"].required_cores == 4
+    assert jobs["mpi"].multi_host
+    assert not jobs["mpi"].is_skipped
+
+
+def test_node_resources_free_unallocated_raises():
+    res = NodeResources({"n1": 4})
+    with pytest.raises(RuntimeError):
+        res.free_cores(1, {"n1": 1})
+    with pytest.raises(RuntimeError):
+        res.free_cores(1)
+
+
+def test_node_resources_empty_raises():
+    with pytest.raises(UserException):
+        NodeResources({})
+
+
+@pytest.mark.parametrize(
+    "nodelist, expected",
+    [
+        ("node1", ["node1"]),
+        ("node[01-03,07]", ["node01", "node02", "node03", "node07"]),
+        ("a[1-2],b3", ["a1", "a2", "b3"]),
+        ("rack[1-2]-n[1-2]", ["rack1-n1", "rack1-n2", "rack2-n1", "rack2-n2"]),
+    ],
+)
+def test_expand_nodelist(nodelist, expected):
+    assert expand_nodelist(nodelist) == expected
+
+
+def test_expand_cpus_per_node():
+    assert expand_cpus_per_node("4(x2),8") == [4, 4, 8]
+    with pytest.raises(UserException):
+        expand_cpus_per_node("four")
+
+
+def test_read_hostfile(tmp_path):
+    hostfile = tmp_path / "hosts"
+    hostfile.write_text("# comment\nn1 slots=4\nn2:2\n\nn3\n")
+    assert read_hostfile(hostfile, 8) == {"n1": 4, "n2": 2, "n3": 8}
+
+
+def test_detect_nodes_from_slurm(mock_config, monkeypatch):
+    monkeypatch.setenv("SLURM_JOB_NODELIST", "n[1-2]")
+    monkeypatch.setenv("SLURM_JOB_CPUS_PER_NODE", "4(x2)")
+    assert detect_nodes() == {"n1": 4, "n2": 4}
+
+
+def test_detect_nodes_without_allocation(mock_config, monkeypatch):
+    monkeypatch.delenv("SLURM_JOB_NODELIST", raising=False)
+    with pytest.raises(UserException):
+        detect_nodes()
@@ -0,0 +1,134 @@
+import json
+import subprocess
+
+import yaml
+
+WORKFLOW = """
+jobs:
+  a:
+    steps:
+      - run: echo a >> ran.txt
+  b:
+    needs: a
+    steps:
+      - run: echo b >> ran.txt
+  c:
+    steps:
+      - run: echo c >> ran.txt
+"""
+
+
+def run_kuristo(cwd, *args):
+    return subprocess.run(
+        ["kuristo", "--no-ansi", "run", *args], capture_output=True, text=True, cwd=cwd
+    )
+
+
+def test_resume_runs_only_unfinished_jobs(test_workspace):
+    (test_workspace / "kuristo.yaml").write_text(WORKFLOW)
+    result = run_kuristo(test_workspace, ".")
+    assert result.returncode == 0
+
+    runs_dir = test_workspace / ".kuristo-out" / "runs"
+    run_dir = next(d for d in runs_dir.iterdir() if d.name != "latest")
+    journal = run_dir / "journal.jsonl"
+    records = [json.loads(line) for line in journal.read_text().splitlines()]
+    assert sorted(r["job-name"] for r in records) == ["a", "b", "c"]
+
+    # pretend the run was killed after job `a` finished
+    (run_dir / "report.yaml").unlink()
+    journal.write_text(
+        "".join(json.dumps(r) + "\n" for r in records if r["job-name"] == "a") + '{"id": 2, "job'
+    )
+    (test_workspace / "ran.txt").unlink()
+
+    result = run_kuristo(test_workspace, "--resume", run_dir.name)
+    assert result.returncode == 0
+    assert sorted((test_workspace / "ran.txt").read_text().split()) == ["b", "c"]
+    report = yaml.safe_load((run_dir / "report.yaml").read_text())
+    results = report["results"]
+    assert sorted(r["job-name"] for r in results) == ["a", "b", "c"]
+    assert {r["workflow-file"] for r in results} == {"kuristo.yaml"}
+
+
+def test_resume_finished_run(test_workspace):
+    (test_workspace / "kuristo.yaml").write_text(WORKFLOW)
+    run_kuristo(test_workspace, ".")
+    runs_dir = test_workspace / ".kuristo-out" / "runs"
+    run_dir = next(d for d in runs_dir.iterdir() if d.name != "latest")
+
+    result = run_kuristo(test_workspace, "--resume", run_dir.name)
+    assert result.returncode != 0
+    assert "already finished" in result.stdout
+
+
+SKIP_WORKFLOW = """
+jobs:
+  a:
+    skip: "not here"
+    steps:
+      - run: echo a >> ran.txt
+  b:
+    needs: a
+    steps:
+      - run: echo b >> ran.txt
+  c:
+    steps:
+      - run: echo c >> ran.txt
+"""
+
+
+def test_resume_keeps_dependants_of_skipped_jobs_skipped(test_workspace):
+    (test_workspace / "kuristo.yaml").write_text(SKIP_WORKFLOW)
+    run_kuristo(test_workspace, ".")
+    runs_dir = test_workspace / ".kuristo-out" / "runs"
+    run_dir = next(d for d in runs_dir.iterdir() if d.name != "latest")
+    journal = run_dir / "journal.jsonl"
+    records = [json.loads(line) for line in journal.read_text().splitlines()]
+
+    # pretend the run was killed after job `a` was skipped
+    (run_dir / "report.yaml").unlink()
+    journal.write_text("".join(json.dumps(r) + "\n" for r in records if r["job-name"] == "a"))
+    (test_workspace / "ran.txt").unlink()
+
+    run_kuristo(test_workspace, "--resume", run_dir.name)
+    assert (test_workspace / "ran.txt").read_text().split() == ["c"]
+    report = yaml.safe_load((run_dir / "report.yaml").read_text())
+    status = {r["job-name"]: r["status"] for r in report["results"]}
+    assert status == {"a": "skipped", "b": "skipped", "c": "success"}
+
+
+SLOW_WORKFLOW = """
+jobs:
+  a:
+    steps:
+      - run: sleep 0.5
+  b:
+    needs: a
+    steps:
+      - run: sleep 0.2
+"""
+
+
+def test_resume_reports_whole_run(test_workspace):
+    (test_workspace / "kuristo.yaml").write_text(SLOW_WORKFLOW)
+    run_kuristo(test_workspace, ".")
+    runs_dir = test_workspace / ".kuristo-out" / "runs"
+    run_dir = next(d for d in runs_dir.iterdir() if d.name != "latest")
+    journal = run_dir / "journal.jsonl"
+    records = [json.loads(line) for line in journal.read_text().splitlines()]
+
+    # pretend the run was killed after job `a` finished
+    (run_dir / "report.yaml").unlink()
+    journal.write_text("".join(json.dumps(r) + "\n" for r in records if r["job-name"] == "a"))
+
+    result = run_kuristo(test_workspace, "--resume", run_dir.name)
+    assert result.returncode == 0
+    report = yaml.safe_load((run_dir / "report.yaml").read_text())
+    duration = {r["job-name"]: r["duration"] for r in report["results"]}
+    # totals include job `a` that ran before the run was interrupted
+    total = duration["a"] + duration["b"]
+    assert report["metrics"]["job-seconds"] >= total - 0.01
+    assert report["metrics"]["critical-path"] >= total - 0.01
+    assert report["total-runtime"] >= total - 0.01
+    assert report["metrics"]["core-seconds-available"] >= total - 0.01
@@ -0,0 +1,85 @@
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from kuristo.rusage import ResourceUsage, peak_rss, read_proc_io, wait_with_usage
+from kuristo.utils import human_size
+
+
+def test_combine():
+    usage = ResourceUsage.combine(
+        [
+            ResourceUsage(1.0, 0.5, 100, 10, 20),
+            ResourceUsage(2.0, 0.25, 300, 1, 2),
+        ]
+    )
+    assert usage == ResourceUsage(3.0, 0.75, 300, 11, 22)
+    assert ResourceUsage.combine([]) is None
+
+
+def test_to_dict():
+    usage = ResourceUsage(1.23456, 0.5, 2048, 0, 4096)
+    assert usage.to_dict() == {
+        "user-time": 1.235,
+        "system-time": 0.5,
+        "max-rss": 2048,
+        "read-bytes": 0,
+        "write-bytes": 4096,
+    }
+    assert str(usage) == (
+        "CPU time: 1.23s user, 0.50s system; peak memory: 2.0 KiB; I/O: 0 B read, 4.0 KiB written"
+    )
+
+
+def test_max_rss_upper_bound():
+    rusage = SimpleNamespace(ru_utime=1.0, ru_stime=0.5, ru_maxrss=1000)
+    max_rss = ResourceUsage.from_rusage(rusage, {}).max_rss
+
+    assert not ResourceUsage.from_rusage(rusage, {}).max_rss_upper_bound
+    assert not ResourceUsage.from_rusage(rusage, {}, max_rss - 1).max_rss_upper_bound
+    usage = ResourceUsage.from_rusage(rusage, {}, max_rss)
+    assert usage.max_rss_upper_bound
+    assert usage.to_dict()["max-rss-upper-bound"] is True
+    assert f"peak memory: at most {human_size(max_rss)};" in str(usage)
+
+
+def test_combine_prefers_exact_peak():
+    bound = ResourceUsage(1.0, 0.5, 300, 0, 0, max_rss_upper_bound=True)
+    exact = ResourceUsage(1.0, 0.5, 300, 0, 0)
+    assert not ResourceUsage.combine([bound, exact]).max_rss_upper_bound
+    assert ResourceUsage.combine([bound, ResourceUsage(1.0, 0.5, 100, 0, 0)]).max_rss_upper_bound
+
+
+def test_read_proc_io_missing():
+    assert read_proc_io(-1) == {}
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Linux only")
+def test_wait_with_usage(tmp_path):
+    path = tmp_path / "data"
+    cmd = f"head -c 1000000 /dev/zero > {path} && sync"
+    proc = subprocess.Popen(cmd, shell=True)
+
+    status, usage = wait_with_usage(proc.pid)
+
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert usage.max_rss > 0
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="needs /proc/<pid>/status")
+def test_wait_with_usage_small_child_is_upper_bound():
+    proc = subprocess.Popen(["true"])
+
+    _, usage = wait_with_usage(proc.pid, peak_rss())
+
+    assert usage.max_rss_upper_bound
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/io"), reason="needs /proc/<pid>/io")
+def test_read_proc_io():
+    counters = read_proc_io(os.getpid())
+    assert "read_bytes" in counters
+    assert "write_bytes" in counters
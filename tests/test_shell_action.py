@@ -31,3 +31,13 @@ def test_create_command_no_context_raises():
     action = ShellAction("test", None, commands="echo hi")
     result = action.create_command()
     assert "echo hi" in result
+
+
+def test_num_cores_counts_threads():
+    action = ShellAction("test", None, commands="echo hi", num_cores=2, threads_per_proc=4)
+    assert action.num_cores == 8
+
+
+def test_num_cores_without_threads():
+    action = ShellAction("test", None, commands="echo hi", num_cores=2)
+    assert action.num_cores == 2
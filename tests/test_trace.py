@@ -0,0 +1,127 @@
+import json
+import subprocess
+from types import SimpleNamespace
+
+import pytest
+
+import kuristo.config as config
+from kuristo.cli._trace import write_trace
+from kuristo.exceptions import UserException
+from kuristo.resources import Resources
+from kuristo.scheduler import Scheduler
+from kuristo.trace import Tracer, export, read_events
+from kuristo.workflow import parse_workflow_files
+
+
+def make_job(num, name):
+    return SimpleNamespace(num=num, name=name, return_code=0, skip_reason=None)
+
+
+def spans(events, cat):
+    return [e for e in events if e["ph"] == "X" and e.get("cat") == cat]
+
+
+def test_tracer_assigns_core_lanes():
+    tracer = Tracer(4)
+    a, b, c = make_job(1, "a"), make_job(2, "b"), make_job(3, "c")
+    tracer.job_ready(a)
+    tracer.job_started(a, 2)
+    tracer.job_started(b, 2)
+    tracer.job_finished(a)
+    tracer.job_started(c, 1)
+    tracer.job_finished(b)
+    tracer.job_finished(c)
+
+    lanes = {}
+    for e in spans(tracer.events, "job"):
+        lanes.setdefault(e["name"], []).append(e["tid"])
+    assert lanes == {"a": [1, 2], "b": [3, 4], "c": [1]}
+    waits = [e for e in tracer.events if e.get("cat") == "wait"]
+    assert [e["ph"] for e in waits] == ["b", "e", "b", "e", "b", "e"]
+
+
+def test_tracer_steps_on_job_lanes():
+    tracer = Tracer(2)
+    job = make_job(1, "a")
+    step = SimpleNamespace(name="build")
+    tracer.job_started(job, 2)
+    tracer.step_started(job, step)
+    tracer.step_finished(job, step)
+    tracer.job_finished(job)
+
+    steps = spans(tracer.events, "step")
+    assert [e["tid"] for e in steps] == [1, 2]
+    assert all(e["name"] == "build" for e in steps)
+
+
+def test_export_merges_recordings(tmp_path):
+    for n in (1, 2):
+        tracer = Tracer(n)
+        tracer._pid = n
+        tracer.scheduler_pass(tracer.now(), 0)
+        tracer.write(tmp_path)
+    (tmp_path / "trace-host-3.jsonl").write_text("{broken\n")
+
+    n_events = export(tmp_path, tmp_path / "trace.json")
+
+    assert n_events == len(read_events(tmp_path))
+    data = json.loads((tmp_path / "trace.json").read_text())
+    assert len(spans(data["traceEvents"], "scheduler")) == 2
+
+
+def test_scheduler_records_trace(tmp_path, monkeypatch):
+    monkeypatch.setattr(config.get(), "trace_enabled", True)
+    wf = tmp_path / "wf.yaml"
+    wf.write_text(
+        "jobs:\n"
+        "  one:\n"
+        "    steps:\n"
+        "      - run: echo one\n"
+        "  two:\n"
+        "    needs: [one]\n"
+        "    steps:\n"
+        "      - name: greet\n"
+        "        run: echo two\n"
+    )
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    scheduler = Scheduler(parse_workflow_files([wf]), Resources(), out_dir)
+    scheduler.run_all_jobs()
+
+    events = read_events(out_dir)
+    assert sorted(e["name"] for e in spans(events, "job")) == ["one", "two"]
+    assert "greet" in [e["name"] for e in spans(events, "step")]
+    assert spans(events, "scheduler")
+
+
+def test_scheduler_does_not_trace_by_default(tmp_path):
+    wf = tmp_path / "wf.yaml"
+    wf.write_text("jobs:\n  one:\n    steps:\n      - run: echo one\n")
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    scheduler = Scheduler(parse_workflow_files([wf]), Resources(), out_dir)
+    scheduler.run_all_jobs()
+
+    assert list(out_dir.glob("trace-*")) == []
+
+
+def test_write_trace_without_recording(tmp_path):
+    with pytest.raises(UserException, match="Tracing is off by default"):
+        write_trace(tmp_path, tmp_path / "trace.json")
+    assert not (tmp_path / "trace.json").exists()
+
+
+def test_run_with_trace_option(test_workspace):
+    (test_workspace / "kuristo.yaml").write_text(
+        "jobs:\n  one:\n    steps:\n      - run: echo one\n"
+    )
+    result = subprocess.run(
+        ["kuristo", "--no-ansi", "run", "--trace", "trace.json", "."],
+        capture_output=True,
+        text=True,
+        cwd=test_workspace,
+    )
+    assert result.returncode == 0
+
+    data = json.loads((test_workspace / "trace.json").read_text())
+    assert [e["name"] for e in spans(data["traceEvents"], "job")] == ["one"]
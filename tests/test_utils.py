@@ -1,8 +1,22 @@
+import os
 from unittest.mock import MagicMock
 
 import pytest
 
-from kuristo.utils import build_filters, human_time, interpolate_str, minutes_to_hhmmss
+from kuristo.exceptions import UserException
+from kuristo.utils import (
+    append_journal,
+    build_filters,
+    human_size,
+    human_time,
+    interpolate_str,
+    merge_result_fragments,
+    minutes_to_hhmmss,
+    parse_size,
+    read_journal,
+    read_report,
+    write_result_fragment,
+)
 
 
 def test_interpolate_str_vars():
@@ -41,9 +55,112 @@ def test_human_time():
     assert human_time(3765.2) == "1h 2m 45.20s"
 
 
+def test_human_size():
+    assert human_size(0) == "0 B"
+    assert human_size(1023) == "1023 B"
+    assert human_size(1536) == "1.5 KiB"
+    assert human_size(10 * 1024**2) == "10.0 MiB"
+    assert human_size(3 * 1024**4) == "3072.0 GiB"
+
+
 def test_build_filters():
     args = MagicMock()
     args.passed = True
     args.skipped = True
     args.failed = True
     assert build_filters(args) == ["failed", "skipped", "success"]
+
+
+def test_merge_result_fragments(tmp_path):
+    write_result_fragment(tmp_path, "job-2", [{"id": 3}, {"id": 4}], 2.0)
+    write_result_fragment(tmp_path, "job-0", [{"id": 1}, {"id": 2}], 5.0)
+
+    merge_result_fragments(tmp_path)
+
+    report = read_report(tmp_path / "report.yaml")
+    assert [r["id"] for r in report["results"]] == [1, 2, 3, 4]
+    assert report["total-runtime"] == 5.0
+    assert sorted(p.name for p in (tmp_path / "results").iterdir()) == [
+        "job-0.yaml",
+        "job-2.yaml",
+    ]
+
+
+def test_merge_result_fragments_metrics(tmp_path):
+    metrics = {"cores": 4, "core-seconds": 6.0, "core-seconds-available": 8.0}
+    write_result_fragment(tmp_path, "job-0", [{"id": 1}], 2.0, metrics)
+    write_result_fragment(tmp_path, "job-1", [{"id": 2}], 1.0, metrics)
+
+    merge_result_fragments(tmp_path)
+
+    merged = read_report(tmp_path / "report.yaml")["metrics"]
+    assert merged["cores"] == 8
+    assert merged["core-seconds"] == 12.0
+    assert merged["utilisation"] == 0.75
+
+
+def test_merge_result_fragments_is_cached(tmp_path):
+    write_result_fragment(tmp_path, "job-0", [{"id": 1}], 1.0)
+    merge_result_fragments(tmp_path)
+    report_path = tmp_path / "report.yaml"
+    mtime = report_path.stat().st_mtime_ns
+
+    merge_result_fragments(tmp_path)
+    assert report_path.stat().st_mtime_ns == mtime
+
+    # a new fragment triggers a new merge
+    write_result_fragment(tmp_path, "job-1", [{"id": 2}], 1.0)
+    fragment = tmp_path / "results" / "job-1.yaml"
+    os.utime(fragment, ns=(mtime + 1, mtime + 1))
+    merge_result_fragments(tmp_path)
+    assert [r["id"] for r in read_report(report_path)["results"]] == [1, 2]
+
+
+def test_merge_result_fragments_sees_late_fragment_with_old_mtime(tmp_path):
+    # a fragment written before the merge, but moved into place only after it
+    write_result_fragment(tmp_path / "late", "job-1", [{"id": 2}], 1.0)
+    write_result_fragment(tmp_path, "job-0", [{"id": 1}], 1.0)
+    merge_result_fragments(tmp_path)
+
+    os.replace(tmp_path / "late" / "results" / "job-1.yaml", tmp_path / "results" / "job-1.yaml")
+    merge_result_fragments(tmp_path)
+
+    report = read_report(tmp_path / "report.yaml")
+    assert [r["id"] for r in report["results"]] == [1, 2]
+
+
+def test_merge_result_fragments_without_fragments(tmp_path):
+    merge_result_fragments(tmp_path)
+    assert not (tmp_path / "report.yaml").exists()
+
+
+def test_journal_roundtrip(tmp_path):
+    append_journal(tmp_path, {"id": 2, "status": "failed"})
+    append_journal(tmp_path, {"id": 1, "status": "success"})
+    append_journal(tmp_path, {"id": 2, "status": "success"})
+    # record cut off by a killed run
+    with open(tmp_path / "journal.jsonl", "a") as f:
+        f.write('{"id": 3, "sta')
+
+    assert read_journal(tmp_path) == [
+        {"id": 1, "status": "success"},
+        {"id": 2, "status": "success"},
+    ]
+
+
+def test_read_journal_missing(tmp_path):
+    assert read_journal(tmp_path) == []
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [(None, None), (100, 100), ("100", 100), ("4K", 4096), ("1.5m", 1572864), ("2GB", 2 << 30)],
+)
+def test_parse_size(value, expected):
+    assert parse_size(value) == expected
+
+
+@pytest.mark.parametrize("value", ["lots", True, False])
+def test_parse_size_invalid(value):
+    with pytest.raises(UserException, match="Invalid size"):
+        parse_size(value)
@@ -0,0 +1,81 @@
+import pytest
+
+from kuristo.exceptions import UserException
+from kuristo.resources import Resources
+from kuristo.scheduler import Scheduler
+from kuristo.workflow import order_workflows, parse_workflow_files, resolve_workflow_needs
+
+
+def write_workflow(path, name=None, needs=None, jobs=("a",)):
+    lines = []
+    if name:
+        lines.append(f"name: {name}")
+    if needs:
+        lines.append(f"needs: [{', '.join(needs)}]")
+    lines.append("jobs:")
+    for job in jobs:
+        lines += [f"  {job}:", "    steps:", "      - run: echo hi"]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+def test_resolve_by_name_and_path(tmp_path):
+    files = [
+        write_workflow(tmp_path / "app" / "kuristo.yaml", needs=["mesh", "../build"]),
+        write_workflow(tmp_path / "mesh" / "kuristo.yaml", name="mesh"),
+        write_workflow(tmp_path / "build" / "kuristo.yaml"),
+    ]
+    needs, outside = resolve_workflow_needs(parse_workflow_files(files))
+    assert needs == {0: [1, 2], 1: [], 2: []}
+    assert outside == []
+
+
+def test_resolve_unknown(tmp_path):
+    files = [write_workflow(tmp_path / "kuristo.yaml", needs=["missing"])]
+    with pytest.raises(UserException, match="unknown workflow 'missing'"):
+        resolve_workflow_needs(parse_workflow_files(files))
+
+
+def test_resolve_outside_selection(tmp_path):
+    write_workflow(tmp_path / "setup" / "kuristo.yaml")
+    files = [write_workflow(tmp_path / "app" / "kuristo.yaml", needs=["../setup"])]
+    needs, outside = resolve_workflow_needs(parse_workflow_files(files))
+    assert needs == {0: []}
+    assert outside == [(str(files[0]), "../setup")]
+
+
+def test_order_workflows(tmp_path):
+    files = [
+        write_workflow(tmp_path / "c.yaml", needs=["b.yaml"]),
+        write_workflow(tmp_path / "b.yaml", needs=["a.yaml"]),
+        write_workflow(tmp_path / "a.yaml"),
+        write_workflow(tmp_path / "d.yaml"),
+    ]
+    order, needs, _ = order_workflows(parse_workflow_files(files))
+    assert order == [2, 1, 0, 3]
+    assert needs[0] == [1]
+
+
+def test_order_workflows_cycle(tmp_path):
+    files = [
+        write_workflow(tmp_path / "a.yaml", needs=["b.yaml"]),
+        write_workflow(tmp_path / "b.yaml", needs=["a.yaml"]),
+    ]
+    with pytest.raises(UserException, match="cycle"):
+        order_workflows(parse_workflow_files(files))
+
+
+def test_scheduler_connects_workflows(tmp_path):
+    files = [
+        write_workflow(tmp_path / "app.yaml", needs=["setup"], jobs=("run1", "run2")),
+        write_workflow(tmp_path / "setup.yaml", name="setup", jobs=("mesh",)),
+    ]
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    scheduler = Scheduler(parse_workflow_files(files), Resources(), out_dir)
+
+    graph = scheduler._graph
+    mesh = next(j for j in graph.nodes if j.spec.id == "mesh")
+    successors = sorted(j.spec.id for j in graph.successors(mesh))
+    assert successors == ["run1", "run2"]